@@ -0,0 +1,55 @@
+"""
+Telemetry archive write rate, and the cost of a time range query and a
+column scan over the last "day" of a week long archive.
+
+    python benchmarks/bench_archive.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from circuitroomba.series6 import archive  # noqa: E402
+
+PACKET_IDS = (7, 3, 43, 44)
+RECORDS = 1000000
+DAY = RECORDS // 7
+
+
+def bench(path):
+    values = (0, 0, 16000, -200, 25, 2000, 2696, 0, 0)
+    started = time.perf_counter()
+    with archive.ArchiveWriter(path, PACKET_IDS) as writer:
+        append = writer.append
+        for i in range(RECORDS):
+            append(i * 0.015, values)
+    elapsed = time.perf_counter() - started
+    print(
+        "write: %.2f us per record, %.1f MB"
+        % (elapsed / RECORDS * 1e6, os.path.getsize(path) / 1e6)
+    )
+
+    started = time.perf_counter()
+    with archive.Archive(path) as telemetry:
+        opened = time.perf_counter()
+        day = (RECORDS - DAY) * 0.015
+        first, last = telemetry.span(day)
+        found = time.perf_counter()
+        charge = telemetry.column(25, day)
+        scanned = time.perf_counter()
+
+    print("open: %.1f ms" % ((opened - started) * 1e3))
+    print("find: %.1f us" % ((found - opened) * 1e6))
+    print("column: %s values in %.1f ms" % (len(charge), (scanned - found) * 1e3))
+
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    try:
+        bench(os.path.join(directory, "telemetry.cra"))
+    finally:
+        shutil.rmtree(directory)
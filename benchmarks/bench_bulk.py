@@ -0,0 +1,49 @@
+"""
+Decoding throughput for a captured stream log, frame by frame with
+StreamParser and vectorised with bulk.BulkDecoder (requires numpy). The log
+is generated by the simulator with some frames corrupted or cut short.
+
+    python benchmarks/bench_bulk.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from circuitroomba.series6 import bulk, simulator  # noqa: E402
+from circuitroomba.series6 import stream, transport  # noqa: E402
+
+PACKET_IDS = (7, 19, 20, 22, 25, 43, 44)
+FRAMES = 200000
+
+
+def capture():
+    robot = simulator.SimulatedRoomba(transport.LoopbackTransport())
+    rng = random.Random(1)
+    data = bytearray()
+    for i in range(FRAMES):
+        robot.set_sensor(22, rng.randrange(65536))
+        robot.set_sensor(43, rng.randrange(-32768, 32768))
+        frame = bytearray(robot.stream_frame(PACKET_IDS))
+        if rng.random() < 0.01:
+            frame[rng.randrange(len(frame))] ^= 0x55
+        if rng.random() < 0.01:
+            frame = frame[: rng.randrange(len(frame))]
+        data += frame
+    return bytes(data)
+
+
+def bench(name, decode, data):
+    started = time.perf_counter()
+    frames = decode(data)
+    elapsed = time.perf_counter() - started
+    print("%s: %s frames, %.1f MB/s" % (name, frames, len(data) / elapsed / 1000000))
+
+
+if __name__ == "__main__":
+    data = capture()
+    bench("parser", lambda data: stream.StreamParser(PACKET_IDS).parse(data), data)
+    bench("bulk", lambda data: len(bulk.BulkDecoder(PACKET_IDS).decode(data)), data)
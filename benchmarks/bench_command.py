@@ -0,0 +1,75 @@
+"""
+Measure the command path against a mocked busio.UART and the in memory
+loopback transport.
+
+Counts UART writes per command and reports the mean latency of
+OpenInterface.command so changes to packet framing can be compared.
+
+    python benchmarks/bench_command.py
+"""
+
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from circuitroomba.series6 import interface, opcode, transport  # noqa: E402
+
+ITERATIONS = 100000
+
+
+class CountingUART:
+    def __init__(self, *args, **kwargs):
+        self.writes = 0
+        self.bytes_written = 0
+
+    def write(self, packet):
+        self.writes += 1
+        self.bytes_written += len(packet)
+        return len(packet)
+
+
+def busio_interface():
+    busio = mock.MagicMock()
+    busio.UART = CountingUART
+    with mock.patch.dict("sys.modules", busio=busio, digitalio=mock.MagicMock()):
+        oi = interface.OpenInterface(mock.Mock(), mock.Mock(), mock.Mock())
+    return oi, oi._transport._uart
+
+
+def loopback_interface():
+    link = transport.LoopbackTransport()
+    return interface.OpenInterface(transport=link), link
+
+
+def run(label, sequence, factory=busio_interface):
+    oi, uart = factory()
+    oi.command(opcode.START)
+    writes = uart.writes
+    written = len(uart.tx) if factory is loopback_interface else uart.bytes_written
+
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        for new_command, data in sequence:
+            oi.command(new_command, data)
+    elapsed = time.perf_counter() - started
+
+    if factory is loopback_interface:
+        written = len(uart.tx) - written
+    else:
+        written = uart.bytes_written - written
+
+    sent = ITERATIONS * len(sequence)
+    print(
+        "%-16s %8.2f us/command  %.2f writes/command  %.2f bytes/command"
+        % (label, elapsed / sent * 1e6, (uart.writes - writes) / sent, written / sent)
+    )
+
+
+if __name__ == "__main__":
+    run("no data", [(opcode.SAFE, None)])
+    run("one data byte", [(opcode.BAUD, 11)])
+    run("mixed", [(opcode.SAFE, None), (opcode.BAUD, 11), (opcode.CLEAN, None)])
+    run("loopback", [(opcode.SAFE, None), (opcode.BAUD, 11)], loopback_interface)
@@ -0,0 +1,91 @@
+"""
+Compare command validation using the original dict of dicts lookups in spec
+with the compiled dispatch tables in opcode.
+
+Only opcode and spec are imported so the benchmark also runs on constrained
+runtimes such as the MicroPython unix port, which is the closest stand in for
+a CircuitPython board on a host:
+
+    python benchmarks/bench_dispatch.py
+    micropython benchmarks/bench_dispatch.py
+"""
+
+import sys
+import time
+
+try:
+    import os
+
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+except (ImportError, AttributeError, NameError):
+    # MicroPython has no os.path, run it from the repository root instead.
+    sys.path.insert(0, "src")
+
+from circuitroomba.series6 import opcode, spec  # noqa: E402
+
+ITERATIONS = 20000
+
+try:
+    clock = time.perf_counter
+except AttributeError:
+
+    def clock():
+        return time.ticks_us() / 1000000
+
+
+SEQUENCE = (
+    (opcode.SAFE, None),
+    (opcode.BAUD, 11),
+    (opcode.FULL, None),
+    (opcode.CLEAN, None),
+)
+
+
+def legacy(buffer):
+    mode = "passive"
+    for i in range(ITERATIONS):
+        for new_command, data in SEQUENCE:
+            command_struct = spec.commands[new_command]
+            if new_command not in spec.mode_commands[mode]:
+                raise RuntimeError
+            bdata = bytes([data or 0])
+            if data and len(bdata) != command_struct["data_bytes"]:
+                raise RuntimeError
+            if command_struct["new_mode"]:
+                mode = command_struct["new_mode"]
+
+
+def compiled(buffer):
+    data_lengths = opcode.data_lengths
+    legal_modes = opcode.legal_modes
+    next_modes = opcode.next_modes
+    mode = opcode.MODE_PASSIVE
+    for i in range(ITERATIONS):
+        for new_command, data in SEQUENCE:
+            op = new_command[0]
+            if not legal_modes[op] & (1 << mode):
+                raise RuntimeError
+            buffer[0] = op
+            if data is None:
+                size = 0
+            else:
+                buffer[1] = data
+                size = 1
+            if size != data_lengths[op]:
+                raise RuntimeError
+            if next_modes[op] != opcode.NO_CHANGE:
+                mode = next_modes[op]
+
+
+def run(label, function):
+    buffer = bytearray(2)
+    started = clock()
+    function(buffer)
+    elapsed = clock() - started
+    print("%-10s %10d commands/s" % (label, ITERATIONS * len(SEQUENCE) / elapsed))
+
+
+if __name__ == "__main__":
+    print(sys.implementation.name)
+    run("legacy", legacy)
+    run("compiled", compiled)
@@ -0,0 +1,115 @@
+"""
+Startup time and heap used by each import path, measured in a fresh
+interpreter per path so earlier imports are not counted.
+
+    python benchmarks/bench_import.py
+
+On CircuitPython or the MicroPython unix port, which have no subprocess,
+measure one path per run from the repository root instead:
+
+    micropython benchmarks/bench_import.py circuitroomba.series6.roomba
+"""
+
+import sys
+import time
+
+try:
+    import os
+
+    SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+except (ImportError, AttributeError, NameError):
+    SRC = "src"
+
+PATHS = (
+    # the package itself and the import machinery, subtract from the others
+    ("package", "import circuitroomba.series6"),
+    ("opcode", "import circuitroomba.series6.opcode"),
+    ("interface", "import circuitroomba.series6.interface"),
+    ("roomba", "import circuitroomba.series6.roomba"),
+    (
+        "roomba + commands",
+        "from circuitroomba.series6 import roomba, transport\n"
+        "bot = roomba.Commands(transport=transport.LoopbackTransport())\n"
+        "bot.start()",
+    ),
+    (
+        "roomba + trace",
+        "from circuitroomba.series6 import roomba, transport\n"
+        "bot = roomba.Commands(transport=transport.LoopbackTransport(), trace=True)",
+    ),
+    (
+        "roomba + stream",
+        "from circuitroomba.series6 import roomba, transport\n"
+        "bot = roomba.Commands(transport=transport.LoopbackTransport())\n"
+        "bot.start()\n"
+        "bot.stream([7, 25])",
+    ),
+    ("compiler", "import circuitroomba.series6.compiler"),
+    ("aio", "import circuitroomba.series6.aio"),
+    ("simulator", "import circuitroomba.series6.simulator"),
+)
+
+
+def measure(code):
+    """
+    Run code and return (seconds, bytes allocated, modules loaded).
+    """
+    sys.path.insert(0, SRC)
+    before = set(sys.modules)
+
+    try:
+        import tracemalloc
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        exec(code, {})
+        elapsed = time.perf_counter() - started
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    except ImportError:
+        import gc
+
+        gc.collect()
+        free = gc.mem_free()
+        started = time.ticks_us()
+        exec(code, {})
+        elapsed = time.ticks_diff(time.ticks_us(), started) / 1000000
+        gc.collect()
+        allocated = free - gc.mem_free()
+
+    loaded = sorted(
+        name
+        for name in set(sys.modules) - before
+        if name.startswith("circuitroomba.series6.")
+    )
+    return elapsed, allocated, loaded
+
+
+def main():
+    import subprocess
+
+    print("%-18s %10s %10s  modules" % ("path", "ms", "KiB"))
+    for label, code in PATHS:
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", code],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        elapsed, allocated = float(output[0]), int(output[1])
+        modules = " ".join(name.rsplit(".", 1)[1] for name in output[2:])
+        print(
+            "%-18s %10.2f %10.1f  %s"
+            % (label, elapsed * 1000, allocated / 1024, modules)
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        elapsed, allocated, loaded = measure(sys.argv[2])
+        print(elapsed, allocated, " ".join(loaded))
+    elif len(sys.argv) > 1:
+        elapsed, allocated, loaded = measure("import " + sys.argv[1])
+        print("%.2f ms %.1f KiB %s" % (elapsed * 1000, allocated / 1024, loaded))
+    else:
+        main()
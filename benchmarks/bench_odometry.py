@@ -0,0 +1,55 @@
+"""
+Pose integration cost per encoder reading, one update() call at a time as
+the stream callback does it, and vectorised with PoseEstimator.batch() for
+reprocessing recorded sessions (requires numpy).
+
+    python benchmarks/bench_odometry.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from circuitroomba.series6 import odometry  # noqa: E402
+
+# An hour of readings at the 15ms stream rate.
+READINGS = 240000
+
+
+def readings():
+    left = [(i * 37) % 65536 - 32768 for i in range(READINGS)]
+    right = [(i * 41) % 65536 - 32768 for i in range(READINGS)]
+    return left, right
+
+
+def bench_update(left, right):
+    pose = odometry.PoseEstimator()
+    update = pose.update
+    started = time.perf_counter()
+    for i in range(READINGS):
+        update(left[i], right[i])
+    elapsed = time.perf_counter() - started
+    print("update: %.2f us per reading" % (elapsed / READINGS * 1e6))
+
+
+def bench_batch(left, right):
+    try:
+        import numpy
+    except ImportError:
+        print("batch: numpy is not installed")
+        return
+
+    left = numpy.array(left)
+    right = numpy.array(right)
+    pose = odometry.PoseEstimator()
+    started = time.perf_counter()
+    pose.batch(left, right)
+    elapsed = time.perf_counter() - started
+    print("batch: %.3f us per reading" % (elapsed / READINGS * 1e6))
+
+
+if __name__ == "__main__":
+    bench_update(*readings())
+    bench_batch(*readings())
@@ -0,0 +1,52 @@
+"""
+Records an hour of simulated sensor stream through a RecordingTransport, then
+times replaying the trace through the stream decoder at full speed.
+
+    python benchmarks/bench_replay.py
+"""
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from circuitroomba.series6 import recorder, roomba  # noqa: E402
+from circuitroomba.series6 import simulator, transport  # noqa: E402
+
+STREAM_SECONDS = 3600
+
+
+def record():
+    file = io.BytesIO()
+    trace = recorder.Recorder(file)
+    link = transport.LoopbackTransport()
+    robot = simulator.SimulatedRoomba(link)
+    bot = roomba.Commands(transport=recorder.RecordingTransport(link, trace))
+    bot.start()
+    bot.safe()
+    bot.stream([7, 19, 20, 43, 44], lambda frame: None)
+
+    started = time.perf_counter()
+    robot.advance(STREAM_SECONDS, lambda now: bot.tick())
+    elapsed = time.perf_counter() - started
+    trace.close()
+    print(
+        "record: %s records, %s bytes in %.2f s"
+        % (trace.records, len(file.getvalue()), elapsed)
+    )
+    return file.getvalue()
+
+
+def replay(data):
+    session = recorder.Replay(data)
+    started = time.perf_counter()
+    for frame in session.run():
+        pass
+    elapsed = time.perf_counter() - started
+    print("replay: %s frames in %.2f s" % (session.frames, elapsed))
+
+
+if __name__ == "__main__":
+    replay(record())
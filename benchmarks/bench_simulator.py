@@ -0,0 +1,104 @@
+"""
+Throughput and latency of the command and sensor paths against the simulated
+Roomba, no hardware required, for one robot and for a fleet.
+
+Reports commands per second, the round trip time of an uncached sensor read
+and how long it takes to parse an hour of stream frames on virtual time.
+
+    python benchmarks/bench_simulator.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from circuitroomba.series6 import fleet, opcode, roomba  # noqa: E402
+from circuitroomba.series6 import simulator, transport  # noqa: E402
+
+ITERATIONS = 20000
+STREAM_SECONDS = 3600
+FLEET_SIZE = 48
+
+
+def connect():
+    link = transport.LoopbackTransport()
+    robot = simulator.SimulatedRoomba(link)
+    bot = roomba.Commands(transport=link, brc_pin=robot.brc)
+    bot.start()
+    return bot, robot
+
+
+def bench_commands():
+    bot, robot = connect()
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        bot.safe()
+        bot.full()
+    elapsed = time.perf_counter() - started
+    print(
+        "commands: %.0f per second, %s handled by the robot"
+        % (2 * ITERATIONS / elapsed, robot.commands_received)
+    )
+
+
+def bench_sensors():
+    bot, robot = connect()
+    query = bot.query
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        query.invalidate()
+        bot.sensors(6)
+    elapsed = time.perf_counter() - started
+    print("sensor read: %.1f us per round trip" % (elapsed / ITERATIONS * 1e6))
+
+
+def bench_stream():
+    bot, robot = connect()
+    frames = []
+    # passive mode would fall asleep after five minutes
+    bot.safe()
+    bot.stream([7, 19, 20, 43, 44], frames.append)
+    started = time.perf_counter()
+    robot.advance(STREAM_SECONDS, lambda now: bot.tick())
+    elapsed = time.perf_counter() - started
+    print(
+        "stream: %s frames (%s virtual seconds) in %.2f s"
+        % (len(frames), STREAM_SECONDS, elapsed)
+    )
+
+
+def bench_fleet():
+    bots = []
+    robots = []
+    for i in range(FLEET_SIZE):
+        bot, robot = connect()
+        bots.append(bot)
+        robots.append(robot)
+    group = fleet.Fleet(bots)
+
+    started = time.perf_counter()
+    for i in range(ITERATIONS // FLEET_SIZE):
+        group.broadcast(opcode.SAFE)
+    elapsed = time.perf_counter() - started
+    print(
+        "fleet broadcast: %.1f us for %s robots"
+        % (elapsed / (ITERATIONS // FLEET_SIZE) * 1e6, FLEET_SIZE)
+    )
+
+    group.stream([7, 19, 20])
+    started = time.perf_counter()
+    for i in range(200):
+        for robot in robots:
+            robot.advance(0.015)
+        group.poll()
+    elapsed = time.perf_counter() - started
+    print("fleet feed: %s frames in %.2f s" % (group.frames, elapsed))
+
+
+if __name__ == "__main__":
+    bench_commands()
+    bench_sensors()
+    bench_stream()
+    bench_fleet()
@@ -0,0 +1,64 @@
+"""
+Per instance memory and attribute access cost of the interface classes, for
+fleets holding hundreds of interfaces.
+
+Transports are created up front so only the interface state is counted.
+
+    python benchmarks/bench_state.py
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from circuitroomba.series6 import interface, roomba, transport  # noqa: E402
+
+INSTANCES = 500
+ITERATIONS = 1000000
+
+
+def instance_size(factory):
+    links = [transport.LoopbackTransport(size=16) for i in range(INSTANCES)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    robots = [factory(transport=link) for link in links]
+    size = (tracemalloc.get_traced_memory()[0] - before) / INSTANCES
+    tracemalloc.stop()
+    return size, robots
+
+
+def attribute_access(robot):
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        robot._mode
+        robot._baud_rate
+        robot._batch
+    return (time.perf_counter() - started) / (3 * ITERATIONS) * 1e9
+
+
+def command_path(robot):
+    robot.start()
+    robot.safe()
+    started = time.perf_counter()
+    for i in range(ITERATIONS // 10):
+        robot.drive(100, 200)
+    return (time.perf_counter() - started) / (ITERATIONS // 10) * 1e6
+
+
+if __name__ == "__main__":
+    for label, factory in (
+        ("OpenInterface", interface.OpenInterface),
+        ("Commands", roomba.Commands),
+    ):
+        size, robots = instance_size(factory)
+        print(
+            "%-14s %7.0f bytes per instance, %5.1f ns per attribute read, "
+            "slots: %s"
+            % (label, size, attribute_access(robots[0]), hasattr(factory, "__slots__"))
+        )
+
+    size, robots = instance_size(roomba.Commands)
+    print("drive command: %.2f us" % command_path(robots[0]))
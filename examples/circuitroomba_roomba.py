@@ -52,14 +52,17 @@ c = 0
 bot.wake_up()
 
 while True:
-    bot.start()
-    bot.safe()
-    bot.clean()
+    # send the start sequence to the Roomba as one packet
+    with bot.batch():
+        bot.start()
+        bot.safe()
+        bot.clean()
 
     time.sleep(2)
 
-    bot.power()
-    bot.stop()
+    with bot.batch():
+        bot.power()
+        bot.stop()
 
     c += 1
 
@@ -21,6 +21,7 @@ setup(
     author_email="alexander@unexpectedeof.net",
     license="MIT",
     install_requires=["Adafruit-Blinka"],
+    extras_require={"numpy": ["numpy"]},
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
@@ -0,0 +1,236 @@
+import asyncio
+import time
+from . import sensors
+from .opcode import (
+    START,
+    STOP,
+    RESET,
+    BAUD,
+    SAFE,
+    FULL,
+    CLEAN,
+    MAX_CLEAN,
+    SPOT,
+    FORCE_SEEKING_DOCK,
+    POWER,
+    QUERY,
+    baud_codes,
+)
+from .interface import STREAM_PERIOD, OpenInterface
+
+
+class AsyncSerial:
+    """
+    Awaitable reads and writes over a transport from the transport module.
+    Reads poll in_waiting and yield to the event loop between polls so one
+    loop can service many serial ports.
+    """
+
+    __slots__ = ("_uart", "poll_interval")
+
+    def __init__(self, uart, poll_interval=0.001):
+        self._uart = uart
+        self.poll_interval = poll_interval
+
+    async def write(self, packet):
+        written = self._uart.write(packet)
+        await asyncio.sleep(0)
+        return written
+
+    async def read(self, nbytes, timeout=1):
+        """
+        Read exactly nbytes, raising RuntimeError if they do not arrive within
+        timeout seconds.
+        """
+        buffer = bytearray(nbytes)
+        view = memoryview(buffer)
+        received = 0
+        deadline = time.monotonic() + timeout
+
+        while received < nbytes:
+            waiting = self._uart.in_waiting
+            if waiting:
+                count = self._uart.readinto(
+                    view[received : received + min(waiting, nbytes - received)]
+                )
+                received += count or 0
+            elif time.monotonic() > deadline:
+                raise RuntimeError(
+                    "Timed out waiting for %s bytes from the Roomba, received %s."
+                    % (nbytes, received)
+                )
+            else:
+                await asyncio.sleep(self.poll_interval)
+
+        return bytes(buffer)
+
+
+class AsyncOpenInterface(OpenInterface):
+    """
+    OpenInterface with awaitable commands, timing and sensor reads so a single
+    event loop can drive several Roombas alongside other tasks.
+
+    Validation, framing, mode tracking and tracing are shared with
+    OpenInterface, only the I/O and delays are awaited. The inherited
+    synchronous layers such as query and the send queue still work, but
+    block the event loop while they wait for the Roomba.
+    """
+
+    __slots__ = ("_serial",)
+
+    def __init__(
+        self,
+        tx_pin=None,
+        rx_pin=None,
+        brc_pin=None,
+        baud_rate=115200,
+        trace=False,
+        trace_depth=10,
+        transport=None,
+        poll_interval=0.001,
+    ):
+        super().__init__(
+            tx_pin, rx_pin, brc_pin, baud_rate, trace, trace_depth, transport
+        )
+        self._serial = AsyncSerial(self._transport, poll_interval)
+
+    async def command(self, new_command, data=None):
+        """
+        Awaitable version of OpenInterface.command. The command goes through
+        the same batch, send queue and instruments, then the event loop gets
+        a turn.
+        """
+        self._command(new_command, data)
+        await asyncio.sleep(0)
+
+    async def command_many(self, sequence):
+        """
+        Awaitable version of OpenInterface.command_many.
+        """
+        super().command_many(sequence)
+        await asyncio.sleep(0)
+
+    async def sensors(self, packet_id, timeout=1):
+        """
+        Request a sensor packet with QUERY and await the response. Single
+        packets decode to an int, group packets to a dict of packet id to value.
+        An active sensor stream is paused while the response is read.
+        """
+        size = sensors.packet_size(packet_id)
+        streaming = self._pause_stream()
+        try:
+            if streaming:
+                await asyncio.sleep(STREAM_PERIOD)
+            self._clear_input()
+            await self.command(QUERY, packet_id)
+            data = await self._serial.read(size, timeout)
+        finally:
+            if streaming:
+                self._resume_stream()
+        return sensors.decode(packet_id, data)
+
+    async def _brc_set_baud_rate(self, baud_rate=19200):
+        """
+        Awaitable version of OpenInterface._brc_set_baud_rate.
+        """
+        if self._brc_pin is None:
+            raise RuntimeError(
+                "No BRC pin to pulse, use the BAUD command to change the baud rate."
+            )
+
+        for i in range(3):
+            self._brc_pin.value = False
+            await asyncio.sleep(0.25)
+            self._brc_pin.value = True
+            await asyncio.sleep(0.25)
+
+        self.baud_rate = baud_rate
+
+    async def wake_up(self, attempts=4, timeout=0.05):
+        """
+        Awaitable version of OpenInterface.wake_up.
+        """
+        steps = self._wake_steps(attempts)
+        answer = None
+        try:
+            while True:
+                wait = steps.send(answer)
+                answer = None
+                if wait is None:
+                    answer = await self._read_answer(timeout)
+                else:
+                    await asyncio.sleep(wait)
+        except StopIteration as done:
+            return done.value
+
+    async def _read_answer(self, timeout):
+        """
+        Awaitable version of OpenInterface._read_answer.
+        """
+        try:
+            data = await self._serial.read(1, timeout)
+        except RuntimeError:
+            return None
+        return data[0]
+
+
+class AsyncCommands(AsyncOpenInterface):
+    """
+    Awaitable counterpart of roomba.Commands. See Commands for details on each
+    command.
+
+    >>> bot = aio.AsyncCommands(board.TX, board.RX, board.A1)
+    >>> await bot.wake_up()
+    >>> await bot.start()
+    >>> await bot.clean()
+    """
+
+    __slots__ = ()
+
+    async def set_baud_rate_19200(self):
+        await self._brc_set_baud_rate()
+
+    async def start(self):
+        await self.command(START)
+
+    async def reset(self):
+        await self.command(RESET)
+
+    async def stop(self):
+        await self.command(STOP)
+
+    async def baud(self, baud_rate_code=None):
+        """
+        Change the baud rate and wait the 100ms the OI requires before the
+        next command without blocking the event loop.
+        """
+        if baud_rate_code in baud_codes.keys():
+            await self.command(BAUD, baud_rate_code)
+            self.baud_rate = baud_codes[baud_rate_code]
+            await asyncio.sleep(0.1)
+        else:
+            raise RuntimeError(
+                "Invalid baud rate code. Please refer to page 9 of the"
+                "Roomba Open Interface Spec."
+            )
+
+    async def safe(self):
+        await self.command(SAFE)
+
+    async def full(self):
+        await self.command(FULL)
+
+    async def clean(self):
+        await self.command(CLEAN)
+
+    async def max(self):
+        await self.command(MAX_CLEAN)
+
+    async def spot(self):
+        await self.command(SPOT)
+
+    async def seek_dock(self):
+        await self.command(FORCE_SEEKING_DOCK)
+
+    async def power(self):
+        await self.command(POWER)
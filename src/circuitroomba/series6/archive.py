@@ -0,0 +1,355 @@
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from . import sensors
+
+# Archive files start with the magic and format version, the index stride
+# and the requested packet ids. Every record after the header is the frame
+# timestamp followed by the packet data bytes exactly as the Roomba sends
+# them, both big endian, so records are fixed width.
+MAGIC = b"CRTA\x01"
+HEADER = struct.Struct(">HB")
+TIMESTAMP = struct.Struct(">d")
+
+# Sparse index entry, (timestamp, record number) of every stride-th record,
+# kept in a file next to the archive.
+INDEX_ENTRY = struct.Struct(">dQ")
+INDEX_SUFFIX = ".idx"
+INDEX_STRIDE = 256
+
+
+def _read_header(file):
+    magic = file.read(len(MAGIC))
+    if magic != MAGIC:
+        raise RuntimeError(
+            "Not a circuitroomba telemetry archive, or an unsupported version."
+        )
+    stride, count = HEADER.unpack(file.read(HEADER.size))
+    return stride, tuple(file.read(count))
+
+
+def _record_struct(layout):
+    return struct.Struct(">d" + layout.format[1:])
+
+
+class ArchiveWriter:
+    """
+    Appends decoded sensor frames to a telemetry archive.
+
+    The record layout is compiled from the packet sizes in sensors for the
+    requested packet ids. Timestamps must not go backwards, the time index
+    relies on records being in order. Appending to an existing archive
+    requires the same packet ids. Use the writer as a stream callback to
+    archive a live session:
+
+    >>> writer = ArchiveWriter("telemetry.cra", [7, 22, 25])
+    >>> bot.stream([7, 22, 25], writer)
+    """
+
+    def __init__(self, path, packet_ids, stride=INDEX_STRIDE):
+        self.path = path
+        self.packet_ids = tuple(packet_ids)
+        self.layout = sensors.layout(self.packet_ids)
+        self._record = _record_struct(self.layout)
+        self._buffer = bytearray(self._record.size)
+        self.last_timestamp = None
+
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as file:
+                stride, packet_ids = _read_header(file)
+                header_size = file.tell()
+                if packet_ids != self.packet_ids:
+                    raise RuntimeError(
+                        "Archive %s holds packets %s, not %s."
+                        % (path, packet_ids, self.packet_ids)
+                    )
+                size = os.path.getsize(path) - header_size
+                self.count = size // self._record.size
+                if self.count:
+                    file.seek(header_size + (self.count - 1) * self._record.size)
+                    (self.last_timestamp,) = TIMESTAMP.unpack(file.read(TIMESTAMP.size))
+            self._file = open(path, "r+b")
+            self._file.seek(header_size + self.count * self._record.size)
+            # Drop a partly written last record.
+            self._file.truncate()
+        else:
+            self.count = 0
+            header_size = 0
+            self._file = open(path, "wb")
+            self._file.write(MAGIC)
+            self._file.write(HEADER.pack(stride, len(self.packet_ids)))
+            self._file.write(bytes(self.packet_ids))
+
+        self.stride = stride
+        index_path = path + INDEX_SUFFIX
+        entries = (self.count + stride - 1) // stride
+        index_size = entries * INDEX_ENTRY.size
+        if os.path.exists(index_path) and os.path.getsize(index_path) >= index_size:
+            self._index = open(index_path, "r+b")
+            # Drop entries for records that were not written completely.
+            self._index.truncate(index_size)
+            self._index.seek(0, os.SEEK_END)
+        else:
+            # A lost or short index is rebuilt from the records, appending to
+            # it would leave the records before the gap unindexed.
+            self._index = open(index_path, "wb")
+            self._rebuild_index(header_size, entries)
+
+    def __call__(self, frame):
+        self.append(frame.timestamp, frame.values)
+
+    def _rebuild_index(self, header_size, entries):
+        with open(self.path, "rb") as file:
+            for entry in range(entries):
+                record = entry * self.stride
+                file.seek(header_size + record * self._record.size)
+                (timestamp,) = TIMESTAMP.unpack(file.read(TIMESTAMP.size))
+                self._index.write(INDEX_ENTRY.pack(timestamp, record))
+
+    def append(self, timestamp, values):
+        """
+        Add a record. values are ordered as layout.fields.
+        """
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            raise RuntimeError(
+                "Timestamp %s is before the last record at %s."
+                % (timestamp, self.last_timestamp)
+            )
+
+        self._record.pack_into(self._buffer, 0, timestamp, *values)
+        self._file.write(self._buffer)
+
+        if not self.count % self.stride:
+            self._index.write(INDEX_ENTRY.pack(timestamp, self.count))
+
+        self.count += 1
+        self.last_timestamp = timestamp
+
+    def flush(self):
+        self._file.flush()
+        self._index.flush()
+
+    def close(self):
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Archive:
+    """
+    Read only, memory mapped view of a telemetry archive.
+
+    Record timestamps are whatever the writer was given. Frames from a
+    StreamParser are stamped with time.monotonic(), which only compares with
+    other readings of the same clock since boot, so ranges are best taken
+    relative to the archive's own timestamps.
+
+    Time range lookups bisect the sparse index, which is small enough to
+    keep in memory, then binary search at most one stride of records, so
+    queries and column scans only fault in the pages holding the records
+    they return. Records appended after the archive was opened are not seen.
+
+    >>> with Archive("telemetry.cra") as archive:
+    ...     last = archive.timestamp(len(archive) - 1)
+    ...     charge = archive.column(25, start=last - 3600)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.stride, self.packet_ids = _read_header(file)
+            self._offset = file.tell()
+
+        self.layout = sensors.layout(self.packet_ids)
+        self._record = _record_struct(self.layout)
+        self.record_size = self._record.size
+        self.count = (os.path.getsize(path) - self._offset) // self.record_size
+
+        self._fields = {}
+        offset = TIMESTAMP.size
+        for field in self.layout.fields:
+            self._fields[field] = (offset, ">" + sensors.field_format(field))
+            offset += sensors.packets[field][1]
+
+        self._file = open(path, "rb")
+        self._map = None
+        if self.count:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._index_times = []
+        self._index_records = []
+        self._load_index()
+
+    def __len__(self):
+        return self.count
+
+    def timestamp(self, record):
+        """
+        Timestamp of a record number.
+        """
+        return TIMESTAMP.unpack_from(
+            self._map, self._offset + record * self.record_size
+        )[0]
+
+    def find(self, timestamp):
+        """
+        Number of the first record at or after timestamp, count if none.
+        """
+        if timestamp is None or not self.count:
+            return 0
+
+        block = bisect_left(self._index_times, timestamp) - 1
+        if block < 0:
+            return 0
+
+        low = self._index_records[block]
+        if block + 1 < len(self._index_records):
+            high = self._index_records[block + 1]
+        else:
+            high = self.count
+
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamp(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def span(self, start=None, end=None):
+        """
+        Record numbers [first, last) with start <= timestamp < end. Either
+        bound can be None for an open range.
+        """
+        first = self.find(start)
+        last = self.count if end is None else self.find(end)
+        return first, max(first, last)
+
+    def records(self, start=None, end=None):
+        """
+        Yield (timestamp, values) for each record in the time range, values
+        ordered as layout.fields.
+        """
+        first, last = self.span(start, end)
+        unpack_from = self._record.unpack_from
+        offset = self._offset + first * self.record_size
+        for record in range(first, last):
+            values = unpack_from(self._map, offset)
+            yield values[0], values[1:]
+            offset += self.record_size
+
+    def timestamps(self, start=None, end=None):
+        """
+        array of the record timestamps in the time range.
+        """
+        return self._scan(0, ">d", "d", start, end)
+
+    def column(self, packet_id, start=None, end=None):
+        """
+        array of one single packet's values in the time range, reading only
+        that field of each record.
+        """
+        if packet_id not in self._fields:
+            raise RuntimeError(
+                "Packet %s is not in this archive, it holds %s."
+                % (packet_id, self.layout.fields)
+            )
+        offset, fmt = self._fields[packet_id]
+        return self._scan(offset, fmt, "l", start, end)
+
+    def to_numpy(self, start=None, end=None):
+        """
+        Structured NumPy array of the time range with a timestamp column and
+        one column per single packet, named as in sensors.packets. Requires
+        numpy.
+        """
+        import numpy
+
+        names = ["timestamp"]
+        formats = [">f8"]
+        offsets = [0]
+        for field in self.layout.fields:
+            name, size, signed = sensors.packets[field]
+            if name in names:
+                # requested twice, directly and in a group
+                continue
+            names.append(name)
+            formats.append(">%s%s" % ("i" if signed else "u", size))
+            offsets.append(self._fields[field][0])
+        dtype = numpy.dtype(
+            {
+                "names": names,
+                "formats": formats,
+                "offsets": offsets,
+                "itemsize": self.record_size,
+            }
+        )
+
+        first, last = self.span(start, end)
+        if first == last:
+            return numpy.zeros(0, dtype=dtype.newbyteorder("="))
+
+        view = numpy.frombuffer(
+            self._map,
+            dtype=dtype,
+            count=last - first,
+            offset=self._offset + first * self.record_size,
+        )
+        values = view.astype(dtype.newbyteorder("="))
+        del view
+        return values
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _scan(self, offset, fmt, typecode, start, end):
+        first, last = self.span(start, end)
+        values = array(typecode)
+        unpack_from = struct.Struct(fmt).unpack_from
+        position = self._offset + first * self.record_size + offset
+        for record in range(first, last):
+            values.append(unpack_from(self._map, position)[0])
+            position += self.record_size
+        return values
+
+    def _load_index(self):
+        try:
+            with open(self.path + INDEX_SUFFIX, "rb") as file:
+                data = file.read()
+        except OSError:
+            data = b""
+
+        for i in range(0, len(data) - INDEX_ENTRY.size + 1, INDEX_ENTRY.size):
+            timestamp, record = INDEX_ENTRY.unpack_from(data, i)
+            # Only trust entries for every stride-th record from the start.
+            if record >= self.count or record != len(self._index_records) * self.stride:
+                break
+            self._index_times.append(timestamp)
+            self._index_records.append(record)
+
+        # Index the records written after the index file, for example if it
+        # was lost, by sampling every stride-th record.
+        if self._index_records:
+            record = self._index_records[-1] + self.stride
+        else:
+            record = 0
+        while record < self.count:
+            self._index_times.append(self.timestamp(record))
+            self._index_records.append(record)
+            record += self.stride
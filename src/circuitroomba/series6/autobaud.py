@@ -0,0 +1,197 @@
+import time
+from .interface import STREAM_PERIOD
+from .opcode import (
+    BAUD,
+    DO_STREAM,
+    MODE_OFF,
+    QUERY,
+    START,
+    baud_codes,
+)
+
+# The OI mode packet is one byte and its value is always known to the host,
+# which makes it a cheap probe.
+PROBE_PACKET = 35
+
+# The OI needs 100ms after BAUD before it accepts commands at the new rate.
+BAUD_DELAY = 0.1
+
+
+class AutoBaud:
+    """
+    Finds and keeps the fastest baud rate the link carries reliably.
+
+    negotiate() walks the candidate baud codes from fastest to slowest. At
+    each rate it sends a handful of QUERY requests for the OI mode packet and
+    counts the responses that are missing or wrong. The first rate with no
+    more than max_errors is kept. If the robot did not hear a BAUD switch
+    over a bad link, detect() finds the rate it is actually using before
+    carrying on.
+
+    poll() watches the checksum failures of the sensor stream and steps down
+    to the next slower rate when the error rate over a window of frames
+    passes max_error_rate. The stream is paused while the slower rates are
+    probed. Call it from the main loop next to tick().
+
+    sleep is used for the quiet period after BAUD, pass the advance method of
+    a SimulatedRoomba to run on virtual time.
+
+    >>> tuner = AutoBaud(bot)
+    >>> tuner.negotiate()
+    57600
+    """
+
+    def __init__(
+        self,
+        interface,
+        probes=8,
+        max_errors=0,
+        timeout=0.05,
+        window=200,
+        max_error_rate=0.05,
+        sleep=time.sleep,
+    ):
+        self._interface = interface
+        self._sleep = sleep
+        self.probes = probes
+        self.max_errors = max_errors
+        self.timeout = timeout
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.fallbacks = 0
+        self._response = bytearray(1)
+        self._frames_seen = 0
+        self._errors_seen = 0
+
+    def probe(self, count=None):
+        """
+        Query the OI mode count times at the current rate and return how many
+        responses were missing or not a valid mode.
+        """
+        interface = self._interface
+        if count is None:
+            count = self.probes
+
+        errors = 0
+        for i in range(count):
+            interface._transport.reset_input_buffer()
+            interface._command(QUERY, PROBE_PACKET)
+            try:
+                interface._read_into(self._response, self.timeout)
+            except RuntimeError:
+                errors += 1
+                continue
+            if self._response[0] > 3:
+                errors += 1
+        return errors
+
+    def detect(self, candidates=None):
+        """
+        Find the rate the robot is currently listening at by probing each
+        candidate baud code. The local side of the link is left at the rate
+        found and the robot's mode is not changed, unless the OI is off: it
+        ignores QUERY then, so START is sent first at each rate. Raises
+        RuntimeError if the robot answers at none of them.
+        """
+        interface = self._interface
+        # START at the wrong rate still moves the tracked mode to passive.
+        off = interface._mode == MODE_OFF
+        for code in _fastest_first(candidates):
+            interface.baud_rate = baud_codes[code]
+            if off:
+                interface._command(START)
+            # Any valid response proves the rate, noise only loses some.
+            if self.probe() < self.probes:
+                return interface.baud_rate
+
+        raise RuntimeError(
+            "The Roomba did not answer at any of the candidate baud rates."
+        )
+
+    def negotiate(self, candidates=None):
+        """
+        Switch to the fastest candidate baud code that passes the error check
+        and return its rate. Candidates default to every code in baud_codes.
+        """
+        interface = self._interface
+        previous = _code_for(interface.baud_rate)
+
+        for code in _fastest_first(candidates):
+            if baud_codes[code] != interface.baud_rate:
+                self._switch(code)
+            if self.probe() <= self.max_errors:
+                self._reset_window()
+                return interface.baud_rate
+
+            # The robot may not have heard the switch over a bad link.
+            if previous is not None and previous != code:
+                self.detect((previous, code))
+            previous = _code_for(interface.baud_rate)
+
+        raise RuntimeError(
+            "No candidate baud rate passed the error check, %s errors allowed "
+            "in %s probes." % (self.max_errors, self.probes)
+        )
+
+    def poll(self):
+        """
+        Fall back to a slower rate when stream checksum failures climb.
+        Returns the new rate after a fallback, otherwise None.
+        """
+        parser = self._interface._stream
+        if parser is None:
+            return None
+
+        frames = parser.frames - self._frames_seen
+        errors = parser.checksum_errors - self._errors_seen
+        if frames + errors < self.window:
+            return None
+
+        self._reset_window()
+        if errors <= self.max_error_rate * (frames + errors):
+            return None
+
+        current = self._interface.baud_rate
+        slower = [code for code in baud_codes if baud_codes[code] < current]
+        if not slower:
+            return None
+
+        self.fallbacks += 1
+        # Stream frames arriving during the probes would be read as answers.
+        self._interface._command(DO_STREAM, 0)
+        self._sleep(STREAM_PERIOD)
+        try:
+            rate = self.negotiate(slower)
+        finally:
+            self._interface._command(DO_STREAM, 1)
+            parser.reset()
+            self._reset_window()
+        return rate
+
+    def _switch(self, code):
+        interface = self._interface
+        interface._command(BAUD, code)
+        if interface._queue is None:
+            interface.baud_rate = baud_codes[code]
+        else:
+            interface._queue.drain()
+        self._sleep(BAUD_DELAY)
+
+    def _reset_window(self):
+        parser = self._interface._stream
+        if parser is not None:
+            self._frames_seen = parser.frames
+            self._errors_seen = parser.checksum_errors
+
+
+def _fastest_first(candidates):
+    if candidates is None:
+        candidates = baud_codes
+    return sorted(candidates, key=lambda code: baud_codes[code], reverse=True)
+
+
+def _code_for(rate):
+    for code in baud_codes:
+        if baud_codes[code] == rate:
+            return code
+    return None
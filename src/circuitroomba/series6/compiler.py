@@ -0,0 +1,325 @@
+import time
+from .opcode import (
+    DIGIT_LEDS_ASCII,
+    DIGIT_LEDS_RAW,
+    LEDS,
+    NO_CHANGE,
+    PLAY,
+    SCHEDULING_LEDS,
+    SONG,
+    VARIABLE,
+    data_lengths,
+    legal_modes,
+    mode_names,
+)
+
+# The OI stores up to 16 notes in each of four song slots.
+SONG_SLOTS = 4
+SONG_NOTES = 16
+
+# Note durations are sent in 1/64ths of a second.
+TICKS_PER_SECOND = 64
+
+# Bits of the LEDs command
+DEBRIS = 0x01
+SPOT = 0x02
+DOCK = 0x04
+CHECK_ROBOT = 0x08
+
+# Bits of the Scheduling LEDs command, weekdays are bit 0 Sunday to bit 6
+# Saturday in the first data byte.
+COLON = 0x01
+PM = 0x02
+AM = 0x04
+CLOCK = 0x08
+SCHEDULE = 0x10
+
+_note_offsets = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+
+# Compiled display programs keyed by their arguments, see _cached.
+_cache = {}
+CACHE_SIZE = 32
+
+
+class Program:
+    """
+    A sequence of commands compiled once into a ready to send packet.
+
+    The data lengths are checked and the packet is built when the program is
+    created. The modes every command is legal in are folded into a single
+    mask, so sending is one mode check and one write with no encoding.
+
+    >>> alert = Program([(LEDS, b"\\x08\\xff\\xff"), (PLAY, 0)])
+    >>> alert.send(bot)
+    """
+
+    def __init__(self, sequence):
+        packet = bytearray()
+        index = []
+        modes = 0xFF
+
+        for new_command, data in sequence:
+            op = new_command[0] if isinstance(new_command, bytes) else new_command
+            if isinstance(data, int):
+                data = bytes([data])
+            elif data is None:
+                data = b""
+
+            expected = data_lengths[op]
+            if expected != VARIABLE and expected != len(data):
+                raise RuntimeError(
+                    "Correct amount of data bytes not provided for command.\n"
+                    "Expected %s \n"
+                    "Recieved %s.\n"
+                    "Refer to command %s in Roomba Open Interface Spec for data "
+                    "byte information" % (expected, len(data), bytes([op]))
+                )
+
+            index.append((op, len(packet), len(data) + 1))
+            packet.append(op)
+            packet += data
+            modes &= legal_modes[op]
+
+        self.packet = bytes(packet)
+        self.commands = tuple(index)
+        self.modes = modes
+
+    def __len__(self):
+        return len(self.packet)
+
+    def send(self, interface):
+        """
+        Write the program with a single write after checking the current mode
+        allows every command in it. Goes through the batch or send queue when
+        one is in use so ordering and pacing still apply.
+        """
+        mode = interface._mode
+        if not self.modes & (1 << mode):
+            raise RuntimeError(
+                "Illegal command in current mode.\n"
+                "Cannot send this program in %s mode.\n"
+                "Refer to the Roomba 600 Interface Spec for more information.\n"
+                % mode_names[mode]
+            )
+
+        if interface._batch is not None or interface._queue is not None:
+            packet = self.packet
+            for op, start, size in self.commands:
+                interface._command(op, packet[start + 1 : start + size])
+            return
+
+        # A setpoint still waiting for the UART was issued first.
+        if interface._setpoint_size:
+            interface._flush_setpoint(interface._tx_idle_at)
+        if interface._instruments is not None:
+            interface._instruments.commands += len(self.commands)
+
+        interface._write(self.packet)
+        if interface.trace:
+            view = memoryview(self.packet)
+            for op, start, size in self.commands:
+                interface._history.append(op, NO_CHANGE, view[start:], size)
+
+
+class Melody:
+    """
+    A melody of any length compiled into SONG and PLAY programs.
+
+    Notes are (note, seconds) pairs where note is a MIDI number or a name
+    such as "C4", "F#5" or "R" for a rest. The melody is cut into chunks of
+    16 notes that rotate through the four song slots. steps holds
+    (offset, Program) pairs: the first loads up to four chunks and plays the
+    first, each later one plays the next chunk and reloads the slot that has
+    just finished with the chunk after the loaded ones.
+
+    Compile alert tunes once and keep the Melody around, playing it again
+    costs one write per step.
+
+    >>> tune = Melody([("C5", 0.25), ("E5", 0.25), ("G5", 0.5)])
+    >>> tune.play(bot)
+    """
+
+    def __init__(self, notes):
+        notes = [(note_number(note), _ticks(seconds)) for note, seconds in notes]
+        if not notes:
+            raise RuntimeError("A melody needs at least one note.")
+
+        chunks = [
+            notes[start : start + SONG_NOTES]
+            for start in range(0, len(notes), SONG_NOTES)
+        ]
+
+        steps = []
+        offset = 0
+        for i, chunk in enumerate(chunks):
+            sequence = []
+            if i == 0:
+                for j in range(min(SONG_SLOTS, len(chunks))):
+                    sequence.append(_song(j, chunks[j]))
+            elif i + SONG_SLOTS - 1 < len(chunks):
+                # the slot of the previous chunk is free again
+                reload = i + SONG_SLOTS - 1
+                sequence.append(_song(reload % SONG_SLOTS, chunks[reload]))
+            sequence.append((PLAY, i % SONG_SLOTS))
+            steps.append((offset, Program(sequence)))
+            offset += sum(ticks for note, ticks in chunk) / TICKS_PER_SECOND
+
+        self.steps = tuple(steps)
+        self.duration = offset
+
+    def play(self, interface, sleep=time.sleep):
+        """
+        Play the whole melody, sleeping between steps.
+        """
+        elapsed = 0
+        for offset, program in self.steps:
+            if offset > elapsed:
+                sleep(offset - elapsed)
+                elapsed = offset
+            program.send(interface)
+
+    def start(self, interface, now=None):
+        """
+        Start playing without blocking. Call poll() on the returned Playback
+        from the main loop.
+        """
+        playback = Playback(self, interface, now)
+        playback.poll(playback.started)
+        return playback
+
+
+class Playback:
+    """
+    Non blocking playback of a Melody, poll() sends the steps that are due.
+    """
+
+    def __init__(self, melody, interface, now=None):
+        self.melody = melody
+        self._interface = interface
+        self.started = time.monotonic() if now is None else now
+        self._next = 0
+
+    @property
+    def playing(self):
+        return self._next < len(self.melody.steps)
+
+    def poll(self, now=None):
+        """
+        Send every step that is due. Returns True while steps are left.
+        """
+        if now is None:
+            now = time.monotonic()
+        steps = self.melody.steps
+        while self._next < len(steps) and now >= self.started + steps[self._next][0]:
+            steps[self._next][1].send(self._interface)
+            self._next += 1
+        return self.playing
+
+
+def note_number(note):
+    """
+    MIDI note number for a note name such as "A4" or "C#5", ints are
+    returned unchanged. "R" is a rest.
+    """
+    if isinstance(note, int):
+        return note
+
+    name = note.upper()
+    if name == "R":
+        return 0
+
+    offset = _note_offsets[name[0]]
+    octave = name[1:]
+    if octave.startswith("#"):
+        offset += 1
+        octave = octave[1:]
+    elif octave.startswith("B") and len(octave) > 1:
+        offset -= 1
+        octave = octave[1:]
+    return 12 * (int(octave) + 1) + offset
+
+
+def leds(debris=False, spot=False, dock=False, check_robot=False, color=0, intensity=0):
+    """
+    Program for the LEDs command. color is 0 for green to 255 for red, and
+    intensity 0 for off to 255 for full brightness of the power LED.
+    """
+    key = (LEDS, debris, spot, dock, check_robot, color, intensity)
+    program = _cache.get(key)
+    if program is None:
+        bits = (
+            (DEBRIS if debris else 0)
+            | (SPOT if spot else 0)
+            | (DOCK if dock else 0)
+            | (CHECK_ROBOT if check_robot else 0)
+        )
+        program = _cached(key, [(LEDS, bytes([bits, color, intensity]))])
+    return program
+
+
+def digits(text):
+    """
+    Program for the Digit LEDs ASCII command, up to four printable characters
+    shown left to right.
+    """
+    key = (DIGIT_LEDS_ASCII, text)
+    program = _cache.get(key)
+    if program is None:
+        if len(text) > 4:
+            raise RuntimeError("The display shows up to 4 characters, got %r." % text)
+        data = bytes(text + " " * (4 - len(text)), "ascii")
+        for code in data:
+            if not 32 <= code <= 126:
+                raise RuntimeError("Character %r cannot be displayed." % chr(code))
+        program = _cached(key, [(DIGIT_LEDS_ASCII, data)])
+    return program
+
+
+def digits_raw(segments):
+    """
+    Program for the Digit LEDs Raw command, four segment bit masks left to
+    right.
+    """
+    key = (DIGIT_LEDS_RAW, tuple(segments))
+    program = _cache.get(key)
+    if program is None:
+        program = _cached(key, [(DIGIT_LEDS_RAW, bytes(segments))])
+    return program
+
+
+def scheduling_leds(weekdays=0, flags=0):
+    """
+    Program for the Scheduling LEDs command. weekdays has bit 0 for Sunday to
+    bit 6 for Saturday, flags combines COLON, PM, AM, CLOCK and SCHEDULE.
+    """
+    key = (SCHEDULING_LEDS, weekdays, flags)
+    program = _cache.get(key)
+    if program is None:
+        program = _cached(key, [(SCHEDULING_LEDS, bytes([weekdays, flags]))])
+    return program
+
+
+def _cached(key, sequence):
+    if len(_cache) >= CACHE_SIZE:
+        _cache.clear()
+    program = Program(sequence)
+    _cache[key] = program
+    return program
+
+
+def _song(slot, notes):
+    data = bytearray([slot, len(notes)])
+    for note, ticks in notes:
+        data.append(note)
+        data.append(ticks)
+    return (SONG, data)
+
+
+def _ticks(seconds):
+    ticks = int(seconds * TICKS_PER_SECOND + 0.5)
+    if not 0 <= ticks <= 255:
+        raise RuntimeError(
+            "Note duration %s is out of range, notes last up to 255/64 seconds."
+            % seconds
+        )
+    return ticks
@@ -0,0 +1,202 @@
+import time
+from .interface import MAX_PACKET_SIZE
+from .opcode import STREAM
+
+try:
+    import selectors
+except ImportError:
+    selectors = None
+
+
+class Fleet:
+    """
+    Drives several robots from one loop without a thread per robot.
+
+    Commands are broadcast by framing the packet once and writing the same
+    bytes to every robot, so fan-out costs one transport write per robot.
+    Each robot still validates the command against its own mode. Robots in a
+    mode where the command is illegal are skipped and returned, nothing is
+    raised for them.
+
+    Sensor streams from every robot are merged into one feed of
+    (index, frame) pairs. When every transport exposes fileno(), as
+    SerialTransport does, poll() waits on a selector, otherwise the
+    transports are polled through in_waiting.
+
+    >>> fleet = Fleet([bot_a, bot_b, bot_c])
+    >>> fleet.broadcast(FORCE_SEEKING_DOCK)
+    >>> fleet.stream([7, 25], callback)
+    >>> while True:
+    ...     fleet.poll(0.015)
+    """
+
+    def __init__(self, robots=(), callback=None):
+        self.robots = []
+        self.callback = callback
+        self.frames = 0
+        self._packet = bytearray(MAX_PACKET_SIZE)
+        self._selector = None
+        for robot in robots:
+            self.add(robot)
+
+    def add(self, robot):
+        """
+        Add a robot to the fleet and return its index in the merged feed.
+        """
+        self.robots.append(robot)
+        self._selector = None
+        return len(self.robots) - 1
+
+    def __len__(self):
+        return len(self.robots)
+
+    def __getitem__(self, index):
+        return self.robots[index]
+
+    def broadcast(self, new_command, data=None):
+        """
+        Send one command to every robot. The packet is framed once and the
+        same bytes are written to each transport, or put in the batch or send
+        queue of robots using one. Returns the list of robots that skipped the
+        command because it is illegal in their mode.
+        """
+        if not self.robots:
+            return []
+
+        skipped = []
+        legal = []
+        op = None
+        for robot in self.robots:
+            try:
+                op = robot._validate(new_command, robot._mode)
+            except RuntimeError:
+                skipped.append(robot)
+            else:
+                legal.append(robot)
+
+        if not legal:
+            return skipped
+
+        # Frame with the first robot to reuse its data length checks, then
+        # copy the packet so every write shares one buffer.
+        size = legal[0]._frame(op, data)
+        packet = self._packet
+        packet[:size] = legal[0]._tx_view[:size]
+        view = memoryview(packet)[:size]
+
+        for robot in legal:
+            if robot._batch is not None or robot._queue is not None:
+                robot._command(op, data)
+                continue
+            robot._write(view)
+            robot._sent(op, size, packet)
+
+        return skipped
+
+    def stream(self, packet_ids, callback=None):
+        """
+        Start the same sensor stream on every robot. Frames are merged into
+        the feed returned by feed(), or passed to callback as
+        callback(index, frame) from poll().
+        """
+        if callback is not None:
+            self.callback = callback
+
+        packet_ids = tuple(packet_ids)
+        data = bytearray(len(packet_ids) + 1)
+        data[0] = len(packet_ids)
+        data[1:] = bytes(packet_ids)
+
+        skipped = self.broadcast(STREAM, data)
+        for robot in self.robots:
+            if robot not in skipped:
+                robot.stream_parser(packet_ids)
+        return skipped
+
+    def feed(self, timeout=0):
+        """
+        Yield (index, frame) for every stream frame received from any robot.
+        Waits up to timeout seconds for data when nothing is buffered, then
+        stops once every transport is drained.
+        """
+        for index in self._ready(timeout):
+            robot = self.robots[index]
+            for frame in robot.frames():
+                self.frames += 1
+                yield index, frame
+
+    def poll(self, timeout=0):
+        """
+        Hand every received frame to the callback and run each robot's
+        background work. Returns the number of frames delivered.
+        """
+        count = 0
+        callback = self.callback
+        for index, frame in self.feed(timeout):
+            count += 1
+            if callback is not None:
+                callback(index, frame)
+
+        for robot in self.robots:
+            robot.tick()
+
+        return count
+
+    async def run(self, interval=0.015):
+        """
+        Poll the fleet forever as an asyncio task.
+        """
+        import asyncio
+
+        while True:
+            self.poll()
+            await asyncio.sleep(interval)
+
+    def _ready(self, timeout):
+        """
+        Indexes of the robots with a stream and buffered bytes.
+        """
+        streaming = [
+            index
+            for index, robot in enumerate(self.robots)
+            if robot._stream is not None
+        ]
+
+        ready = [
+            index for index in streaming if self.robots[index]._transport.in_waiting
+        ]
+        if ready or not timeout or not streaming:
+            return ready
+
+        selector = self._get_selector()
+        if selector is not None:
+            return [
+                key.data
+                for key, events in selector.select(timeout)
+                if self.robots[key.data]._stream is not None
+            ]
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            ready = [
+                index for index in streaming if self.robots[index]._transport.in_waiting
+            ]
+            if ready:
+                return ready
+            time.sleep(0.001)
+        return ready
+
+    def _get_selector(self):
+        if self._selector is not None:
+            return self._selector
+        if selectors is None:
+            return None
+
+        transports = [robot._transport for robot in self.robots]
+        if not all(hasattr(link, "fileno") for link in transports):
+            return None
+
+        self._selector = selectors.DefaultSelector()
+        for index, link in enumerate(transports):
+            self._selector.register(link.fileno(), selectors.EVENT_READ, index)
+        return self._selector
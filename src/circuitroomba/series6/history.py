@@ -0,0 +1,112 @@
+import time
+from array import array
+from .opcode import NO_CHANGE, mode_names
+
+# Data bytes kept per entry. Longer packets such as songs are truncated in the
+# trace, the full length is still recorded.
+DATA_WIDTH = 16
+
+
+class CommandHistory:
+    """
+    Fixed capacity ring buffer of the commands sent to the Roomba.
+
+    All storage is allocated up front in flat arrays (opcode, mode, data bytes
+    and a monotonic timestamp per entry) so appending a command is O(1) and
+    does not allocate. This keeps tracing cheap enough to leave enabled.
+
+    Indexing returns the most recent command first using the history tuple
+    structure from OpenInterface:
+    (operating_mode, command, data_bytes)
+    """
+
+    def __init__(self, depth=10, data_width=DATA_WIDTH):
+        if depth < 1:
+            raise RuntimeError("History depth must be at least 1.")
+
+        self.depth = depth
+        self._data_width = data_width
+        self._opcodes = bytearray(depth)
+        self._modes = bytearray(depth)
+        self._lengths = bytearray(depth)
+        self._data = bytearray(depth * data_width)
+        self._timestamps = array("d", [0.0] * depth)
+        self._next = 0
+        self._count = 0
+
+    def append(self, op, mode, packet, size):
+        """
+        Record a framed packet. packet holds the opcode followed by its data
+        bytes and size is the number of bytes used. mode is the mode index the
+        command changed to or NO_CHANGE.
+        """
+        i = self._next
+        self._opcodes[i] = op
+        self._modes[i] = mode
+
+        data_bytes = size - 1
+        self._lengths[i] = data_bytes if data_bytes < 255 else 255
+
+        if data_bytes > self._data_width:
+            data_bytes = self._data_width
+
+        offset = i * self._data_width
+        data = self._data
+        for j in range(data_bytes):
+            data[offset + j] = packet[j + 1]
+
+        self._timestamps[i] = time.monotonic()
+
+        i += 1
+        self._next = 0 if i == self.depth else i
+        if self._count < self.depth:
+            self._count += 1
+
+    def clear(self):
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("history index out of range")
+
+        i = (self._next - 1 - index) % self.depth
+        mode = self._modes[i]
+        return (
+            None if mode == NO_CHANGE else mode_names[mode],
+            bytes([self._opcodes[i]]),
+            self._entry_data(i),
+        )
+
+    def snapshot(self):
+        """
+        Copy the buffer out as a list ordered from oldest to newest for post
+        mortem analysis.
+
+        Snapshot tuple structure:
+        (timestamp, opcode, operating_mode, data_bytes)
+        """
+        entries = []
+        start = (self._next - self._count) % self.depth
+        for n in range(self._count):
+            i = (start + n) % self.depth
+            mode = self._modes[i]
+            entries.append(
+                (
+                    self._timestamps[i],
+                    self._opcodes[i],
+                    None if mode == NO_CHANGE else mode_names[mode],
+                    self._entry_data(i),
+                )
+            )
+        return entries
+
+    def _entry_data(self, i):
+        offset = i * self._data_width
+        size = min(self._lengths[i], self._data_width)
+        return bytes(self._data[offset : offset + size])
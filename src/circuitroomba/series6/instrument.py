@@ -0,0 +1,204 @@
+import time
+from array import array
+
+try:
+    clock = time.perf_counter
+except AttributeError:
+    clock = time.monotonic
+
+# Histogram buckets are powers of two of microseconds, bucket n counts
+# durations below 2**n us. 24 buckets reach about 8 seconds.
+BUCKETS = 24
+
+
+class Histogram:
+    """
+    Fixed size latency histogram with power of two microsecond buckets.
+
+    Recording is a bit_length and an array increment, no allocation, so it
+    can sit on the command path. Percentiles are the upper bound of the
+    bucket they fall in, within a factor of two.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = array("L", [0] * BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        bucket = int(seconds * 1000000).bit_length()
+        if bucket >= BUCKETS:
+            bucket = BUCKETS - 1
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """
+        Upper bound in seconds of the bucket holding the given fraction of
+        the recorded durations, 0 if nothing was recorded.
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket in range(BUCKETS):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return (1 << bucket) / 1000000
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+    def reset(self):
+        for bucket in range(BUCKETS):
+            self.counts[bucket] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Instruments:
+    """
+    Opt in latency histograms and counters for the command and sensor paths
+    of one interface.
+
+    Enable with OpenInterface.instrument(). While disabled the hot paths only
+    test that the interface has no instruments, nothing is timed or counted.
+
+    Histograms, durations in seconds:
+
+    - validate: mode and opcode checks of a command
+    - frame: packing the data bytes into the transmit buffer
+    - enqueue: putting a command on the send queue
+    - write: the transport write of every packet
+    - response: waiting for a sensor query response
+    - receive: reading buffered stream bytes from the transport
+    - decode: parsing and decoding one stream frame
+
+    snapshot() returns the histograms and counters in a plain dict that can
+    be scraped into monitoring. While a stream runs it includes
+    frames_dropped, an estimate of the frames lost to corruption or receive
+    overruns: the bytes the parser skipped, in whole frames.
+
+    >>> stats = bot.instrument()
+    >>> stats.snapshot()["write"]["p99"]
+    """
+
+    __slots__ = (
+        "_interface",
+        "started",
+        "validate",
+        "frame",
+        "enqueue",
+        "write",
+        "response",
+        "receive",
+        "decode",
+        "commands",
+        "bytes_sent",
+        "bytes_received",
+    )
+
+    def __init__(self, interface):
+        self._interface = interface
+        self.validate = Histogram()
+        self.frame = Histogram()
+        self.enqueue = Histogram()
+        self.write = Histogram()
+        self.response = Histogram()
+        self.receive = Histogram()
+        self.decode = Histogram()
+        self.reset()
+
+    def reset(self):
+        self.started = clock()
+        self.commands = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        for histogram in self._histograms():
+            histogram[1].reset()
+
+    def frames(self, interface):
+        """
+        Timed version of OpenInterface.frames.
+        """
+        parser = interface._stream
+        while True:
+            started = clock()
+            data = interface._read_available()
+            if not len(data):
+                return
+            self.receive.record(clock() - started)
+            self.bytes_received += len(data)
+
+            frames = parser.feed(data)
+            while True:
+                started = clock()
+                frame = next(frames, None)
+                if frame is None:
+                    break
+                self.decode.record(clock() - started)
+                yield frame
+
+    def snapshot(self):
+        """
+        Histograms, counters and rates since the last reset as a dict.
+        """
+        interface = self._interface
+        elapsed = clock() - self.started
+        snapshot = {
+            "elapsed": elapsed,
+            "commands": self.commands,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "bytes_sent_per_second": self.bytes_sent / elapsed if elapsed else 0.0,
+            "bytes_received_per_second": (
+                self.bytes_received / elapsed if elapsed else 0.0
+            ),
+            "setpoints_dropped": interface.setpoints_dropped,
+        }
+
+        parser = interface._stream
+        if parser is not None:
+            snapshot["frames"] = parser.frames
+            snapshot["checksum_errors"] = parser.checksum_errors
+            snapshot["skipped_bytes"] = parser.skipped_bytes
+            size = parser.frame_length + 3
+            snapshot["frames_dropped"] = (parser.skipped_bytes + size // 2) // size
+
+        queue = interface._queue
+        if queue is not None:
+            snapshot["queued"] = len(queue)
+            snapshot["queue_dropped"] = queue.dropped
+
+        overruns = getattr(interface._transport, "overruns", None)
+        if overruns is not None:
+            snapshot["rx_overruns"] = overruns
+
+        for name, histogram in self._histograms():
+            snapshot[name] = histogram.snapshot()
+        return snapshot
+
+    def _histograms(self):
+        return (
+            ("validate", self.validate),
+            ("frame", self.frame),
+            ("enqueue", self.enqueue),
+            ("write", self.write),
+            ("response", self.response),
+            ("receive", self.receive),
+            ("decode", self.decode),
+        )
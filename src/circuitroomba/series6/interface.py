@@ -1,7 +1,69 @@
 import time
-import busio
-import digitalio
-from .opcode import commands, mode_commands, valid_modes
+from .opcode import (
+    BAUD,
+    DO_STREAM,
+    DRIVE,
+    DRIVE_DIRECT,
+    DRIVE_PWM,
+    MODE_FULL,
+    MODE_OFF,
+    MODE_PASSIVE,
+    MODE_SAFE,
+    NO_CHANGE,
+    QUERY,
+    START,
+    UNKNOWN,
+    VARIABLE,
+    data_lengths,
+    legal_modes,
+    mode_names,
+    next_modes,
+    valid_modes,
+)
+from .transport import BusioTransport
+
+try:
+    instruments_clock = time.perf_counter
+except AttributeError:
+    instruments_clock = time.monotonic
+
+# Optional features such as tracing, sensor decoding and the send queue live in
+# their own modules and are imported on first use, so boards that only send
+# commands never load them.
+
+# Largest packet in the OI spec is a full Song: opcode, song number, length and
+# 16 note/duration pairs.
+MAX_PACKET_SIZE = 35
+
+# Commands that set the wheels moving, a cliff only stops Roomba in safe mode
+# while it is driving.
+DRIVE_OPCODES = (DRIVE[0], DRIVE_DIRECT[0], DRIVE_PWM[0])
+
+# Seconds stream frames may still show the mode from before a mode command,
+# unless one confirms the new mode sooner.
+MODE_SETTLE = 0.25
+
+# wake_up asks for the OI mode packet (35) to tell whether the Roomba is
+# listening. A sensor stream is paused meanwhile so its frames cannot be
+# taken for the answer.
+QUERY_MODE = bytes((QUERY[0], 35))
+PAUSE_STREAM = bytes((DO_STREAM[0], 0))
+RESUME_STREAM = bytes((DO_STREAM[0], 1))
+
+# BRC low pulse that wakes a sleeping Roomba. Pulses of 50-500ms count towards
+# the baud rate change sequence, so it is kept shorter.
+WAKE_PULSE = 0.02
+
+# Seconds a woken Roomba is given before it is asked again, doubled after
+# every attempt that gets no answer.
+WAKE_DELAY = 0.05
+
+# Seconds between stream frames, what may still be in flight after a pause.
+STREAM_PERIOD = 0.015
+
+# Longest sleep between polls while a read waits for bytes. The first poll
+# only yields, later ones back off to this.
+READ_BACKOFF = 0.002
 
 
 class OpenInterface:
@@ -40,33 +102,98 @@ class OpenInterface:
     https://www.irobotweb.com/~/media/MainSite/PDFs/About/STEM/Create/iRobot_Roomba_600_Open_Interface_Spec.pdf # noqa
     """
 
-    def __init__(self, tx_pin, rx_pin, brc_pin, baud_rate=115200, trace=False):
+    __slots__ = (
+        "_transport",
+        "_tx_pin",
+        "_rx_pin",
+        "_brc_pin",
+        "_baud_rate",
+        "_mode",
+        "_settle_until",
+        "_cliff_guard",
+        "_batch",
+        "_keep_awake",
+        "_stream",
+        "_query",
+        "_queue",
+        "_instruments",
+        "_last_write",
+        "_tx_idle_at",
+        "trace",
+        "_history",
+        "_tx_buffer",
+        "_tx_view",
+        "_rx_buffer",
+        "_rx_view",
+        "_setpoint",
+        "_setpoint_view",
+        "_setpoint_size",
+        "setpoints_dropped",
+    )
+
+    def __init__(
+        self,
+        tx_pin=None,
+        rx_pin=None,
+        brc_pin=None,
+        baud_rate=115200,
+        trace=False,
+        trace_depth=10,
+        transport=None,
+    ):
         """
         Initialize communication pins and state. State is referred to as
         operating mode to stay consistent with the Open Interface Specification
         document.
 
-        Two list are created to capture operating mode and command history. Both
-        store the last 5 items processed.
+        By default a busio.UART is opened on tx_pin and rx_pin. Pass a
+        transport from the transport module instead to talk to the Roomba over
+        pyserial or an in memory loopback, the pins are then not used.
 
-        If trace is enabled the last 10 commands will be captured in self.history.
+        If trace is enabled the last trace_depth commands will be captured in
+        self.history, a fixed size ring buffer. See history.CommandHistory.
 
         History tuple structure:
         (operating_mode, command, data_bytes)
         """
-        self._board = busio.UART(tx_pin, rx_pin, baudrate=baud_rate)
+        if transport is None:
+            transport = BusioTransport(tx_pin, rx_pin, baud_rate)
+
+        self._transport = transport
         self._tx_pin = tx_pin
         self._rx_pin = rx_pin
-        self._brc_pin = brc_pin
+        self._brc_pin = transport.configure_brc(brc_pin)
         self._baud_rate = baud_rate
-        self._operating_mode = "off"
+        self._mode = MODE_OFF
+        self._settle_until = 0
+        self._cliff_guard = False
+        self._batch = None
+        self._keep_awake = None
+        self._stream = None
+        self._query = None
+        self._queue = None
+        self._instruments = None
+        self._last_write = time.monotonic()
+        self._tx_idle_at = self._last_write
         self.trace = trace
 
-        # Could be expensive for an embedded environment.
         if trace:
-            self._history = [None for i in range(10)]
+            from .history import CommandHistory
+
+            self._history = CommandHistory(trace_depth)
+
+        # Every command is framed into this buffer and sent with a single write.
+        self._tx_buffer = bytearray(MAX_PACKET_SIZE)
+        self._tx_view = memoryview(self._tx_buffer)
+        self._rx_buffer = bytearray(64)
+        self._rx_view = memoryview(self._rx_buffer)
 
-        self._brc_pin.direction = digitalio.Direction.OUTPUT
+        # Latest setpoint waiting for the UART to drain, see setpoint().
+        # Allocated on first use.
+        self._setpoint = None
+        self._setpoint_view = None
+        self._setpoint_size = 0
+        self.setpoints_dropped = 0
 
     @property
     def valid_modes(self):
@@ -76,15 +203,9 @@ class OpenInterface:
     def history(self):
         return self._history
 
-    @history.setter
-    def history(self, new_history):
-        for i in range(1, len(self._history)):
-            self._history[-i] = self._history[-(i + 1)]
-        self._history[0] = new_history
-
     @property
     def operating_mode(self):
-        return self._operating_mode
+        return mode_names[self._mode]
 
     @operating_mode.setter
     def operating_mode(self, new_mode):
@@ -95,7 +216,7 @@ class OpenInterface:
         state that is maintained and changed based on the sequence of commands.
         """
         if new_mode and new_mode in valid_modes:
-            self._operating_mode = new_mode
+            self._mode = mode_names.index(new_mode)
         # instead of just using an else need to do an elif since new_mode can be None
         # for a noop operating mode change
         elif new_mode and new_mode not in valid_modes:
@@ -105,44 +226,449 @@ class OpenInterface:
                 " OpenInterface valid_modes attribute." % (new_mode)
             )
 
-    def command(self, new_command, data=0):
+    def command(self, new_command, data=None):
         """
         Accepts an inbound command that should be sent to the OI RX pin.
-        Data should be an int inline with the OI specification document
-        that will be handled as bytes internally.
+        Data should be an int for single data byte commands, or a bytes like
+        object for commands that take multiple data bytes, inline with the OI
+        specification document.
 
         Command is called to handle validation of the mode and state
-        transition as well as verify the data matches spec requirements.
+        transition as well as verify the data matches spec requirements. The
+        opcode and data bytes are framed into a single packet and written to
+        the UART in one call once validation passes.
+        """
+        if self._batch is not None:
+            self._batch.add(new_command, data)
+            return
+
+        instruments = self._instruments
+        if instruments is not None:
+            instruments.commands += 1
+            started = instruments_clock()
+
+        if self._queue is not None:
+            self._queue.put(new_command, data)
+            if instruments is not None:
+                instruments.enqueue.record(instruments_clock() - started)
+            self._queue.pump()
+            return
+
+        # A setpoint still waiting for the UART was issued first.
+        if self._setpoint_size:
+            self._flush_setpoint(self._tx_idle_at)
+
+        op = self._validate(new_command, self._mode)
+        if instruments is not None:
+            validated = instruments_clock()
+            instruments.validate.record(validated - started)
+
+        size = self._frame(op, data)
+        if instruments is not None:
+            instruments.frame.record(instruments_clock() - validated)
+
+        self._write(self._tx_view[:size])
+        self._sent(op, size)
+
+    # Modules built on the interface send through _command, which stays
+    # synchronous when a subclass makes command() awaitable.
+    _command = command
+
+    def _sent(self, op, size, packet=None):
+        """
+        Apply the mode transition and trace a packet once it has been written.
+        The packet defaults to the one framed in the transmit buffer.
+        """
+        if packet is None:
+            packet = self._tx_buffer
+
+        new_mode = next_modes[op]
+        if new_mode != NO_CHANGE:
+            self._changed_mode(new_mode)
+        elif op in DRIVE_OPCODES:
+            self._cliff_guard = _cliff_guarded(op, packet)
+
+        if self.trace:
+            self._history.append(op, new_mode, packet, size)
+
+    def _changed_mode(self, new_mode):
+        # Stream frames already on their way still show the old mode.
+        self._mode = new_mode
+        self._settle_until = self._tx_idle_at + MODE_SETTLE
+        if new_mode < MODE_SAFE:
+            self._cliff_guard = False
+
+    def _observe(self, layout, values, current=False):
+        """
+        Follow mode changes from the sensor values the Roomba reports. The OI
+        mode packet (35) is taken as it is. Without it a wheel drop, a powered
+        charger or a cliff while driving means Roomba has stopped and reverted
+        from safe to passive mode.
+
+        Stream frames can have been sent before the last mode command took
+        effect, they are only trusted once one reports the new mode or
+        MODE_SETTLE has passed. current marks values requested after every
+        command sent so far, such as query responses.
+        """
+        index = layout.mode_index
+        if self._settle_until and not current:
+            if index is not None and values[index] == self._mode:
+                self._settle_until = 0
+            elif time.monotonic() < self._settle_until:
+                return
+            else:
+                self._settle_until = 0
+
+        if index is not None:
+            mode = values[index]
+            if mode <= MODE_FULL:
+                self._mode = mode
+                if mode < MODE_SAFE:
+                    self._cliff_guard = False
+            return
+
+        if self._mode != MODE_SAFE:
+            return
+
+        for index, mask, cliff in layout.safety:
+            if values[index] & mask and (self._cliff_guard or not cliff):
+                self._mode = MODE_PASSIVE
+                self._cliff_guard = False
+                return
+
+    def command_many(self, sequence):
+        """
+        Send a sequence of commands as one packet. Each item is either an
+        opcode or an (opcode, data) tuple.
+
+        The whole sequence is checked against the mode state machine before
+        anything is written, so either every command is sent or none are.
+
+        >>> bot.command_many([START, SAFE, CLEAN])
+        """
+        batch = CommandBatch(self)
+        for item in sequence:
+            if isinstance(item, tuple):
+                batch.add(*item)
+            else:
+                batch.add(item)
+        batch.send()
+
+    def batch(self):
+        """
+        Context manager that collects the commands issued inside the block and
+        sends them with a single write when the block exits. Nothing is sent if
+        the block raises.
+
+        >>> with bot.batch():
+        ...     bot.start()
+        ...     bot.safe()
+        ...     bot.clean()
         """
-        command_struct = commands[new_command]
-        bdata = bytes([data])
+        return CommandBatch(self)
 
-        if new_command in mode_commands[self.operating_mode]:
-            self._board.write(new_command)
+    def _validate(self, new_command, mode):
+        """
+        Resolve the command to its integer opcode and verify it is legal in the
+        given mode index using the compiled tables in opcode.
+
+        Commands can be given as the single byte constants from opcode or as
+        integer opcodes.
+        """
+        if isinstance(new_command, bytes) and len(new_command) == 1:
+            op = new_command[0]
+        elif isinstance(new_command, int) and 0 <= new_command <= 255:
+            op = new_command
         else:
+            raise KeyError(new_command)
+
+        if data_lengths[op] == UNKNOWN:
+            raise KeyError(new_command)
+
+        if not legal_modes[op] & (1 << mode):
             raise RuntimeError(
                 "Illegal command in current mode.\n"
                 "Cannot call %s in %s mode.\n"
                 "Refer to the Roomba 600 Interface Spec for more information.\n"
-                % (new_command, self.operating_mode)
+                % (new_command, mode_names[mode])
             )
 
-        if data and len(bdata) == command_struct["data_bytes"]:
-            print(bdata)
-            self._board.write(bdata)
-        elif data and len(bdata) != command_struct["data_bytes"]:
+        return op
+
+    def _frame(self, op, data):
+        """
+        Write the opcode and data bytes into the transmit buffer and return the
+        packet size. Nothing is sent if the data does not match the spec.
+        """
+        buffer = self._tx_buffer
+        buffer[0] = op
+        data_bytes = data_lengths[op]
+
+        if data is None:
+            size = 0
+        elif isinstance(data, int):
+            buffer[1] = data
+            size = 1
+        else:
+            size = len(data)
+            if size <= MAX_PACKET_SIZE - 1:
+                buffer[1 : size + 1] = data
+
+        if data_bytes == VARIABLE:
+            if 0 < size <= MAX_PACKET_SIZE - 1:
+                return size + 1
+            data_bytes = "1 to %s" % (MAX_PACKET_SIZE - 1)
+
+        if size != data_bytes:
             raise RuntimeError(
                 "Correct amount of data bytes not provided for command.\n"
                 "Expected %s \n"
                 "Recieved %s.\n"
                 "Refer to command %s in Roomba Open Interface Spec for data byte "
-                "information" % (command_struct["data_bytes"], len(bdata), new_command)
+                "information" % (data_bytes, size, bytes([op]))
             )
 
-        self.operating_mode = command_struct["new_mode"]
+        return size + 1
 
-        if self.trace:
-            self.history = (command_struct["new_mode"], new_command, bdata)
+    def setpoint(self, new_command, data=None):
+        """
+        Send a command that supersedes any earlier one of its kind, such as a
+        drive velocity updated at 50-100Hz.
+
+        The command is validated and framed straight away. It is written once
+        the UART has drained the previous packets, estimated from the baud
+        rate. Until then it waits in a single slot, and a newer setpoint
+        replaces it so the robot always acts on the freshest command. Pending
+        setpoints are sent from tick(). With a send queue the setpoint waits in
+        the queue instead, replacing a queued command with the same opcode.
+        """
+        if self._batch is not None:
+            self._batch.add(new_command, data)
+            return
+
+        if self._queue is not None:
+            if self._queue.put(new_command, data, replace=True):
+                self.setpoints_dropped += 1
+            self._queue.pump()
+            return
+
+        op = self._validate(new_command, self._mode)
+        size = self._frame(op, data)
+
+        if self._setpoint_size:
+            self.setpoints_dropped += 1
+
+        if self._setpoint is None:
+            self._setpoint = bytearray(MAX_PACKET_SIZE)
+            self._setpoint_view = memoryview(self._setpoint)
+
+        self._setpoint[:size] = self._tx_view[:size]
+        self._setpoint_size = size
+        self._flush_setpoint()
+
+    def tx_idle(self, now=None):
+        """
+        True once every byte written should have left the UART.
+        """
+        if now is None:
+            now = time.monotonic()
+        return now >= self._tx_idle_at
+
+    def _flush_setpoint(self, now=None):
+        """
+        Write the pending setpoint if the UART is idle. A setpoint that is no
+        longer legal after a mode change is dropped.
+        """
+        size = self._setpoint_size
+        if not size or not self.tx_idle(now):
+            return False
+
+        self._setpoint_size = 0
+        op = self._setpoint[0]
+        if not legal_modes[op] & (1 << self._mode):
+            self.setpoints_dropped += 1
+            return False
+
+        self._write(self._setpoint_view[:size])
+        self._sent(op, size, self._setpoint)
+        return True
+
+    def _write(self, packet):
+        """
+        Single point where bytes leave for the Roomba. Tracks when the UART
+        should be idle again, a byte takes 10 bit times on the wire.
+        """
+        instruments = self._instruments
+        if instruments is None:
+            self._transport.write(packet)
+        else:
+            started = instruments_clock()
+            self._transport.write(packet)
+            instruments.write.record(instruments_clock() - started)
+            instruments.bytes_sent += len(packet)
+
+        now = time.monotonic()
+        if now > self._tx_idle_at:
+            self._tx_idle_at = now
+        self._tx_idle_at += len(packet) * 10 / self._baud_rate
+        self._last_write = now
+
+    def tick(self, now=None):
+        """
+        Give background work such as keep_awake a chance to run. Call this from
+        the main loop when not using asyncio. It never blocks.
+        """
+        if self._setpoint_size:
+            self._flush_setpoint(now)
+
+        if self._keep_awake is not None:
+            self._keep_awake.poll(now)
+
+        if self._stream is not None and self._stream.callback is not None:
+            for frame in self.frames():
+                self._stream.callback(frame)
+
+        if self._queue is not None:
+            self._queue.pump(now)
+
+        if self._query is not None:
+            self._query.flush()
+
+    @property
+    def query(self):
+        """
+        SensorQuery layer that coalesces sensor reads into QUERY_LIST requests
+        and caches the results. Created on first use.
+        """
+        if self._query is None:
+            from .query import SensorQuery
+
+            self._query = SensorQuery(self)
+        return self._query
+
+    def instrument(self, enabled=True):
+        """
+        Start recording latency histograms and counters for the command and
+        sensor paths and return the instrument.Instruments holding them.
+        Pass False to stop, the hot paths then cost nothing extra.
+        """
+        if not enabled:
+            self._instruments = None
+            return None
+
+        if self._instruments is None:
+            from .instrument import Instruments
+
+            self._instruments = Instruments(self)
+        return self._instruments
+
+    @property
+    def send_queue(self):
+        """
+        SendQueue that paces and prioritises outbound commands. Created on
+        first use, from then on command() goes through it.
+        """
+        if self._queue is None:
+            from .sendqueue import SendQueue
+
+            self._queue = SendQueue(self)
+        return self._queue
+
+    def _read_into(self, buffer, timeout):
+        """
+        Fill buffer from the UART, raising RuntimeError if the Roomba does not
+        send enough bytes within timeout seconds. Queued commands are sent
+        first, since the response depends on them.
+        """
+        if self._queue is not None:
+            self._queue.drain(timeout)
+
+        instruments = self._instruments
+        if instruments is not None:
+            started = instruments_clock()
+
+        # Slicing a bytearray would copy it, read through a view instead.
+        view = memoryview(buffer)
+        received = 0
+        size = len(view)
+        deadline = time.monotonic() + timeout
+        idle = 0
+
+        # Only bytes already waiting are read, a real UART read blocks for the
+        # transport's own timeout instead of this one.
+        while received < size:
+            waiting = self._transport.in_waiting
+            if waiting:
+                count = self._transport.readinto(
+                    view[received : received + min(waiting, size - received)]
+                )
+                received += count or 0
+                idle = 0
+                continue
+
+            now = time.monotonic()
+            if now > deadline:
+                raise RuntimeError(
+                    "Timed out waiting for %s bytes from the Roomba, received %s."
+                    % (size, received)
+                )
+            time.sleep(min(idle, deadline - now))
+            idle = min(idle * 2 or READ_BACKOFF / 8, READ_BACKOFF)
+
+        if instruments is not None:
+            instruments.response.record(instruments_clock() - started)
+            instruments.bytes_received += received
+
+        return received
+
+    def _read_available(self):
+        """
+        Read whatever the UART has buffered without blocking. Returns a
+        memoryview over the receive buffer, empty if nothing was waiting.
+        """
+        waiting = self._transport.in_waiting
+        if not waiting:
+            return self._rx_view[:0]
+
+        count = self._transport.readinto(
+            self._rx_view[: min(waiting, len(self._rx_buffer))]
+        )
+        return self._rx_view[: count or 0]
+
+    def stream_parser(self, packet_ids, callback=None):
+        """
+        Install a StreamParser for the packets a STREAM command requested.
+        Frames are then available from frames(), or passed to callback from
+        tick().
+        """
+        from .stream import StreamParser
+
+        self._stream = StreamParser(packet_ids, callback)
+        if self._stream.layout.watched:
+            self._stream.observer = self._observe
+        return self._stream
+
+    def frames(self):
+        """
+        Yield the sensor stream frames that can be decoded from the bytes
+        already received. Never blocks, stops once the UART is drained.
+        """
+        if self._stream is None:
+            raise RuntimeError(
+                "No sensor stream has been started. Call stream() with the "
+                "packet ids first."
+            )
+
+        if self._instruments is not None:
+            for frame in self._instruments.frames(self):
+                yield frame
+            return
+
+        data = self._read_available()
+        while len(data):
+            for frame in self._stream.feed(data):
+                yield frame
+            data = self._read_available()
 
     @property
     def baud_rate(self):
@@ -150,7 +676,11 @@ class OpenInterface:
 
     @baud_rate.setter
     def baud_rate(self, rate):
+        """
+        Track the baud rate and switch the local side of the link to match.
+        """
         self._baud_rate = rate
+        self._transport.baudrate = rate
 
     def _brc_set_baud_rate(self, baud_rate=19200):
         """
@@ -165,6 +695,11 @@ class OpenInterface:
         information on setting the baud rate at startup.
         """
 
+        if self._brc_pin is None:
+            raise RuntimeError(
+                "No BRC pin to pulse, use the BAUD command to change the baud rate."
+            )
+
         for i in range(3):
             self._brc_pin.value = False
             time.sleep(0.25)
@@ -173,29 +708,239 @@ class OpenInterface:
 
         self.baud_rate = baud_rate
 
-    def wake_up(self):
+    def wake_up(self, attempts=4, timeout=0.05, sleep=time.sleep):
         """
-        If the circuitroomba is in passive mode without any byte activity on the RX pin
-        for 5 minutes it will will enter into a sleep mode. To wake it up
-        you need to pulse the RX pin LOW/HIGH/LOW.
+        Make sure the Roomba is awake and listening, and return its operating
+        mode.
+
+        In passive mode the Roomba sleeps after 5 minutes without activity.
+        An awake Roomba answers a query for the OI mode packet within a few
+        milliseconds and nothing else is done. Otherwise BRC is pulsed low
+        briefly to wake it, START is sent in case the OI was off, and the mode
+        is read back again, waiting twice as long after every attempt that
+        gets no answer. Raises RuntimeError if the Roomba never answers.
+
+        The tracked operating mode is set to the mode read back. sleep is
+        used for every wait, pass a simulator's advance for virtual time.
         """
+        steps = self._wake_steps(attempts)
+        answer = None
+        try:
+            while True:
+                wait = steps.send(answer)
+                answer = None
+                if wait is None:
+                    answer = self._read_answer(timeout)
+                else:
+                    sleep(wait)
+        except StopIteration as done:
+            return done.value
+
+    def _wake_steps(self, attempts):
+        """
+        The wake_up sequence without its I/O waits, shared with the awaitable
+        version. Yields the seconds to wait, or None when it needs the answer
+        to the mode query sent back in. Returns the mode name.
+        """
+        streaming = self._pause_stream()
+        if streaming:
+            yield STREAM_PERIOD
+
+        delay = WAKE_DELAY
+        for attempt in range(attempts + 1):
+            if attempt:
+                if self._brc_pin is not None:
+                    self._brc_pin.value = False
+                    yield WAKE_PULSE
+                    self._brc_pin.value = True
+                yield delay
+                delay *= 2
+
+                self._write(START)
+                self._sent(START[0], 1, START)
+
+            # QUERY is written directly since the tracked mode may be wrong.
+            self._clear_input()
+            self._write(QUERY_MODE)
+            mode = yield None
+            if mode is not None and mode <= MODE_FULL:
+                break
+        else:
+            raise RuntimeError(
+                "The Roomba did not answer after %s wake up attempts." % attempts
+            )
 
-        for i in range(3):
-            self._brc_pin.value = False
-            time.sleep(0.5)
-            self._brc_pin.value = True
-            time.sleep(0.5)
-            self._brc_pin.value = False
-            time.sleep(0.5)
+        self._mode = mode
+        self._settle_until = 0
+        if mode < MODE_SAFE:
+            self._cliff_guard = False
+        if self._queue is not None:
+            self._queue.resync()
+
+        if streaming:
+            self._resume_stream()
+        return mode_names[mode]
+
+    def _read_answer(self, timeout):
+        """
+        Single byte answer to a query, None if it does not arrive in time.
+        """
+        try:
+            self._read_into(self._rx_view[:1], timeout)
+        except RuntimeError:
+            return None
+        return self._rx_buffer[0]
+
+    def _pause_stream(self):
+        """
+        Stop an active sensor stream so the bytes that follow answer a query.
+        Returns whether it was running. Frames already on their way can take
+        STREAM_PERIOD to arrive, wait that long before _clear_input().
+        """
+        if self._stream is None:
+            return False
+        self._write(PAUSE_STREAM)
+        return True
+
+    def _resume_stream(self):
+        self._write(RESUME_STREAM)
+
+    def _clear_input(self):
+        """
+        Drop the received bytes and any partial stream frame.
+        """
+        self._transport.reset_input_buffer()
+        if self._stream is not None:
+            self._stream.reset()
 
-    def keep_awake(self, duty_cycle=60):
+    def keep_awake(self, duty_cycle=60, pulse_width=1):
         """
         In passive mode the circuitroomba will go into a sleep mode after 5 minutes
         without activity. To prevent this we can pulse the BRC pin low on
         a given duty_cycle.
 
-        Currently need a way to put this into a queue, a background thread,
-        async task etc that sleeps for the duty cycle wakes up to pulse the
-        brc pin and then goes into the background again.
+        If an asyncio event loop is running the pulses are driven by a task on
+        that loop. Otherwise call tick() from the main loop. Either way the
+        returned KeepAwake scheduler can be stopped with stop().
+
+        >>> bot.keep_awake()
+        >>> while True:
+        ...     bot.tick()
         """
-        raise NotImplementedError
+        if self._keep_awake is not None:
+            self._keep_awake.stop()
+
+        from .keepalive import KeepAwake
+
+        self._keep_awake = KeepAwake(self, duty_cycle, pulse_width)
+
+        try:
+            import asyncio
+
+            asyncio.get_running_loop()
+        except (ImportError, AttributeError, RuntimeError):
+            return self._keep_awake
+
+        self._keep_awake.start()
+        return self._keep_awake
+
+
+class CommandBatch:
+    """
+    Collects commands for OpenInterface.command_many and OpenInterface.batch.
+
+    Commands are validated as they are added against the mode the Roomba will
+    be in at that point of the sequence, and framed into one contiguous packet.
+    The tracked operating mode and trace history are only updated once the
+    packet is sent.
+
+    BAUD cannot be batched because the OI needs 100ms of quiet after it before
+    another command is accepted.
+    """
+
+    __slots__ = ("_interface", "_mode", "_cliff_guard", "_packet", "_history")
+
+    def __init__(self, interface):
+        self._interface = interface
+        self._mode = interface._mode
+        self._cliff_guard = interface._cliff_guard
+        self._packet = bytearray()
+        self._history = []
+
+    def add(self, new_command, data=None):
+        interface = self._interface
+        op = interface._validate(new_command, self._mode)
+
+        if op == BAUD[0]:
+            raise RuntimeError(
+                "BAUD cannot be sent in a batch, the OI requires 100ms before "
+                "the next command."
+            )
+
+        size = interface._frame(op, data)
+        self._packet += interface._tx_view[:size]
+
+        new_mode = next_modes[op]
+        if new_mode != NO_CHANGE:
+            self._mode = new_mode
+            if new_mode < MODE_SAFE:
+                self._cliff_guard = False
+        elif op in DRIVE_OPCODES:
+            self._cliff_guard = _cliff_guarded(op, interface._tx_buffer)
+
+        if interface.trace:
+            self._history.append((op, new_mode, bytes(interface._tx_view[:size])))
+
+    def send(self):
+        interface = self._interface
+
+        # Commands queued before the batch go out first.
+        if interface._queue is not None:
+            interface._queue.drain()
+
+        if self._packet:
+            interface._write(self._packet)
+
+        if self._mode != interface._mode:
+            interface._changed_mode(self._mode)
+        interface._cliff_guard = self._cliff_guard
+
+        for op, new_mode, packet in self._history:
+            interface._history.append(op, new_mode, packet, len(packet))
+
+        self._packet = bytearray()
+        self._history = []
+
+    def __enter__(self):
+        if self._interface._batch is not None:
+            raise RuntimeError("A command batch is already open.")
+
+        self._mode = self._interface._mode
+        self._cliff_guard = self._interface._cliff_guard
+        self._interface._batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._interface._batch = None
+
+        if exc_type is None:
+            self.send()
+
+
+def _cliff_guarded(op, packet):
+    """
+    Whether a cliff stops Roomba in safe mode after the drive command in
+    packet.
+    """
+    from .odometry import ROBOT_RADIUS, cliff_guarded
+
+    first = (packet[1] << 8 | packet[2]) - ((packet[1] & 0x80) << 9)
+    second = (packet[3] << 8 | packet[4]) - ((packet[3] & 0x80) << 9)
+    if op != DRIVE[0]:
+        return cliff_guarded(first, second)
+
+    # Velocity and radius, the special straight radius values are wider than
+    # the robot and turning in place (+-1) is tighter.
+    if first > 0:
+        return True
+    return first < 0 and -ROBOT_RADIUS < second < ROBOT_RADIUS
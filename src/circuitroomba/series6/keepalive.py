@@ -0,0 +1,100 @@
+import time
+from .opcode import MODE_PASSIVE, START
+
+
+class KeepAwake:
+    """
+    Cooperative scheduler that pulses the BRC pin low on a duty cycle so the
+    Roomba does not sleep after 5 minutes in passive mode.
+
+    Nothing here blocks. On CircuitPython call poll() (or OpenInterface.tick())
+    from the main loop. On CPython start() runs the same poll loop as an
+    asyncio task on the running event loop.
+
+    Any bytes written to the Roomba also reset its sleep timer, so pulses are
+    skipped while other UART traffic is keeping the robot awake.
+
+    Pulses between 50 and 500ms are rejected since three of those in a row is
+    the BRC baud rate change sequence. The spec suggests one second every
+    minute.
+
+    Without a BRC pin, for example a serial cable with no control line wired
+    to it, START is sent instead. Only passive mode sleeps, and START leaves
+    the Roomba in it.
+    """
+
+    def __init__(self, interface, duty_cycle=60, pulse_width=1):
+        if 0.05 <= pulse_width <= 0.5:
+            raise RuntimeError(
+                "BRC pulses between 50 and 500ms can change the baud rate. "
+                "See page 4 of the Roomba Open Interface Spec."
+            )
+
+        self._interface = interface
+        self.duty_cycle = duty_cycle
+        self.pulse_width = pulse_width
+        self.pulses = 0
+        self._last_pulse = time.monotonic()
+        self._pulse_end = None
+        self._task = None
+
+    def poll(self, now=None):
+        """
+        Advance the scheduler and return the number of seconds until it next
+        needs to be polled.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        if self._pulse_end is not None:
+            if now < self._pulse_end:
+                return self._pulse_end - now
+
+            self._interface._brc_pin.value = True
+            self._pulse_end = None
+            self._last_pulse = now
+
+        last_activity = max(self._last_pulse, self._interface._last_write)
+        due = last_activity + self.duty_cycle
+
+        if now < due:
+            return due - now
+
+        if self._interface._brc_pin is None:
+            if self._interface._mode == MODE_PASSIVE:
+                self._interface._command(START)
+            self._last_pulse = now
+            self.pulses += 1
+            return self.duty_cycle
+
+        self._interface._brc_pin.value = False
+        self._pulse_end = now + self.pulse_width
+        self.pulses += 1
+        return self.pulse_width
+
+    async def run(self):
+        import asyncio
+
+        while True:
+            await asyncio.sleep(self.poll())
+
+    def start(self):
+        """
+        Schedule run() on the running asyncio event loop.
+        """
+        import asyncio
+
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def stop(self):
+        """
+        Cancel the asyncio task if there is one and release the BRC pin high.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        if self._pulse_end is not None:
+            self._interface._brc_pin.value = True
+            self._pulse_end = None
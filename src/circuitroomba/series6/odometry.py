@@ -0,0 +1,187 @@
+import math
+
+# Encoder counts per mm of wheel travel, 508.8 counts per revolution of a 72mm
+# wheel.
+COUNTS_PER_MM = 508.8 / (72 * 3.14159265)
+
+# Half the distance between the wheels in mm.
+HALF_WHEEL_BASE = 117.5
+
+# Radius of the robot body in mm.
+ROBOT_RADIUS = 170
+
+LEFT_ENCODER = 43
+RIGHT_ENCODER = 44
+
+
+def encoder_delta(new, old):
+    """
+    Counts moved between two encoder readings, allowing for the 16 bit
+    counter wrapping in either direction.
+    """
+    return ((new - old + 32768) & 0xFFFF) - 32768
+
+
+def cliff_guarded(right, left):
+    """
+    Whether safe mode stops Roomba at a cliff while its wheels turn at these
+    velocities: it does when moving forward, or backward on a radius tighter
+    than the robot.
+    """
+    travel = right + left
+    if travel > 0:
+        return True
+    if right == left:
+        return False
+    # The turning radius is HALF_WHEEL_BASE * travel / (right - left).
+    return abs(travel) * HALF_WHEEL_BASE < ROBOT_RADIUS * abs(right - left)
+
+
+class PoseEstimator:
+    """
+    Dead reckoning pose from the left and right encoder counts (packets 43
+    and 44).
+
+    Each reading is integrated as a short arc in O(1), updating x and y in mm
+    and heading in radians (counter clockwise, wrapped to -pi..pi) in place.
+    The first reading only sets the reference counts. Use the estimator as
+    the callback of a sensor stream that includes both encoders:
+
+    >>> pose = PoseEstimator()
+    >>> bot.stream([43, 44], pose)
+    >>> while True:
+    ...     bot.tick()
+    ...     print(pose.x, pose.y, pose.heading)
+    """
+
+    __slots__ = (
+        "counts_per_mm",
+        "wheel_base",
+        "x",
+        "y",
+        "heading",
+        "distance",
+        "updates",
+        "_left",
+        "_right",
+    )
+
+    def __init__(
+        self,
+        x=0.0,
+        y=0.0,
+        heading=0.0,
+        counts_per_mm=COUNTS_PER_MM,
+        wheel_base=2 * HALF_WHEEL_BASE,
+    ):
+        self.counts_per_mm = counts_per_mm
+        self.wheel_base = wheel_base
+        self.x = x
+        self.y = y
+        self.heading = heading
+        self.distance = 0.0
+        self.updates = 0
+        self._left = None
+        self._right = None
+
+    def __call__(self, frame):
+        self.update(frame[LEFT_ENCODER], frame[RIGHT_ENCODER])
+
+    def update(self, left, right):
+        """
+        Integrate a new pair of raw encoder counts.
+        """
+        if self._left is None:
+            self._left = left
+            self._right = right
+            return
+
+        left_mm = encoder_delta(left, self._left) / self.counts_per_mm
+        right_mm = encoder_delta(right, self._right) / self.counts_per_mm
+        self._left = left
+        self._right = right
+        self.updates += 1
+
+        if not left_mm and not right_mm:
+            return
+
+        travelled = (left_mm + right_mm) / 2
+        turned = (right_mm - left_mm) / self.wheel_base
+        middle = self.heading + turned / 2
+
+        self.x += travelled * math.cos(middle)
+        self.y += travelled * math.sin(middle)
+        self.heading = _wrap(self.heading + turned)
+        self.distance += travelled
+
+    def reset(self, x=0.0, y=0.0, heading=0.0):
+        """
+        Move the pose, keeping the encoder reference counts.
+        """
+        self.x = x
+        self.y = y
+        self.heading = heading
+        self.distance = 0.0
+
+    def batch(self, left, right):
+        """
+        Integrate whole sequences of encoder counts with NumPy, for example a
+        recorded session, and return arrays (x, y, heading) of the pose after
+        each reading. The estimator continues from the last pose. Gives the
+        same result as calling update() for each pair. Requires numpy.
+        """
+        import numpy
+
+        left = numpy.asarray(left, dtype=numpy.int64)
+        right = numpy.asarray(right, dtype=numpy.int64)
+        if left.shape != right.shape or left.ndim != 1:
+            raise RuntimeError("Encoder sequences must be 1d and the same length.")
+
+        count = len(left)
+        if not count:
+            empty = numpy.zeros(0)
+            return empty, empty.copy(), empty.copy()
+
+        start = 0
+        if self._left is None:
+            self._left = int(left[0])
+            self._right = int(right[0])
+            start = 1
+
+        previous_left = numpy.empty(count, dtype=numpy.int64)
+        previous_right = numpy.empty(count, dtype=numpy.int64)
+        previous_left[0] = self._left
+        previous_right[0] = self._right
+        previous_left[1:] = left[:-1]
+        previous_right[1:] = right[:-1]
+
+        left_mm = ((left - previous_left + 32768) & 0xFFFF) - 32768
+        right_mm = ((right - previous_right + 32768) & 0xFFFF) - 32768
+        left_mm = left_mm / self.counts_per_mm
+        right_mm = right_mm / self.counts_per_mm
+
+        travelled = (left_mm + right_mm) / 2
+        turned = (right_mm - left_mm) / self.wheel_base
+        unwrapped = self.heading + numpy.cumsum(turned)
+        middle = unwrapped - turned / 2
+
+        x = self.x + numpy.cumsum(travelled * numpy.cos(middle))
+        y = self.y + numpy.cumsum(travelled * numpy.sin(middle))
+        heading = numpy.arctan2(numpy.sin(unwrapped), numpy.cos(unwrapped))
+
+        self.x = float(x[-1])
+        self.y = float(y[-1])
+        self.heading = float(heading[-1])
+        self.distance += float(travelled.sum())
+        self.updates += count - start
+        self._left = int(left[-1])
+        self._right = int(right[-1])
+        return x, y, heading
+
+
+def _wrap(angle):
+    if angle > math.pi:
+        angle -= 2 * math.pi
+    elif angle <= -math.pi:
+        angle += 2 * math.pi
+    return angle
@@ -1,6 +1,14 @@
 # circuitroomba opcodes
 # https://www.irobotweb.com/-/media/MainSite/PDFs/About/STEM/Create/iRobot_Roomba_600_Open_Interface_Spec.pdf?la=en
 
+try:
+    from micropython import const
+except ImportError:
+
+    def const(value):
+        return value
+
+
 START = b"\x80"
 RESET = b"\x07"
 BAUD = b"\x81"
@@ -15,6 +23,7 @@ DRIVE = b"\x89"
 MOTORS = b"\x8A"
 PWM_MOTORS = b"\x90"
 DRIVE_PWM = b"\x92"
+DRIVE_DIRECT = b"\x91"
 LEDS = b"\x8B"
 SONG = b"\x8C"
 PLAY = b"\x8D"
@@ -30,8 +39,6 @@ BUTTONS = b"\xA5"
 SCHEDULE = b"\xA7"
 SET_DAY_TIME = b"\xA8"
 STOP = b"\xAD"
-SAFE = b"\x83"
-FULL = b"\x84"
 
 
 baud_codes = {
@@ -51,61 +58,129 @@ baud_codes = {
 
 valid_modes = ("off", "safe", "passive", "full")
 
-# Only SAFE and FULL have opcodes in the OI spec, because of that mode names
-# are used for keys instead of hex codes differing from commands.
-mode_commands = {
-    "passive": (
-        START,
-        RESET,
-        STOP,
-        BAUD,
-        SAFE,
-        FULL,
-        CLEAN,
-        MAX_CLEAN,
-        SPOT,
-        FORCE_SEEKING_DOCK,
-        POWER,
-    ),
-    "safe": (
-        START,
-        RESET,
-        STOP,
-        BAUD,
-        SAFE,
-        FULL,
-        CLEAN,
-        MAX_CLEAN,
-        SPOT,
-        FORCE_SEEKING_DOCK,
-        POWER,
-    ),
-    "full": (
-        START,
-        RESET,
-        STOP,
-        BAUD,
-        SAFE,
-        FULL,
-        CLEAN,
-        MAX_CLEAN,
-        SPOT,
-        FORCE_SEEKING_DOCK,
-        POWER,
-    ),
-    "off": (START, RESET),
-}
+# Mode indexes match the values reported by the OI Mode sensor packet (35).
+MODE_OFF = const(0)
+MODE_PASSIVE = const(1)
+MODE_SAFE = const(2)
+MODE_FULL = const(3)
 
-commands = {
-    START: {"int_opcode": 128, "data_bytes": 0, "new_mode": "passive"},
-    RESET: {"int_opcode": 7, "data_bytes": 0, "new_mode": "off"},
-    STOP: {"int_opcode": 173, "data_bytes": 0, "new_mode": "off"},
-    BAUD: {"int_opcode": 129, "data_bytes": 1, "new_mode": None},  # new mode noop
-    SAFE: {"int_opcode": 131, "data_bytes": 0, "new_mode": "safe"},
-    FULL: {"int_opcode": 132, "data_bytes": 0, "new_mode": "full"},
-    CLEAN: {"int_opcode": 135, "data_bytes": 0, "new_mode": "passive"},
-    MAX_CLEAN: {"int_opcode": 136, "data_bytes": 0, "new_mode": "passive"},
-    SPOT: {"int_opcode": 134, "data_bytes": 0, "new_mode": "passive"},
-    FORCE_SEEKING_DOCK: {"int_opcode": 143, "data_bytes": 0, "new_mode": "passive"},
-    POWER: {"int_opcode": 133, "data_bytes": 0, "new_mode": "passive"},
-}
+mode_names = ("off", "passive", "safe", "full")
+
+# Sentinels used by the compiled tables below.
+NO_CHANGE = const(0xFF)
+UNKNOWN = const(0xFF)
+VARIABLE = const(0xFE)
+
+# The command descriptions in spec packed four bytes per command: opcode,
+# data bytes, new mode and the mask of mode indexes it is legal in. Storing
+# the blob instead of dicts keeps the tables out of RAM on boards, regenerate
+# it with spec.pack_tables() after changing spec.
+PACKED = (
+    b"\x07\x00\x00\x0F\x80\x00\x01\x0F\x81\x01\xFF\x0E\x82\x00\x02\x0E"
+    b"\x83\x00\x02\x0E\x84\x00\x03\x0E\x85\x00\x01\x0E\x86\x00\x01\x0E"
+    b"\x87\x00\x01\x0E\x88\x00\x01\x0E\x89\x04\xFF\x0C\x8A\x01\xFF\x0C"
+    b"\x8B\x03\xFF\x0C\x8C\xFE\xFF\x0E\x8D\x01\xFF\x0C\x8E\x01\xFF\x0E"
+    b"\x8F\x00\x01\x0E\x90\x03\xFF\x0C\x91\x04\xFF\x0C\x92\x04\xFF\x0C"
+    b"\x94\xFE\xFF\x0E\x95\xFE\xFF\x0E\x96\x01\xFF\x0E\xA2\x02\xFF\x0C"
+    b"\xA3\x04\xFF\x0C\xA4\x04\xFF\x0C\xA5\x01\xFF\x0E\xA7\x0F\xFF\x0E"
+    b"\xA8\x03\xFF\x0E\xAD\x00\x00\x0E"
+)
+
+# PACKED expanded into flat tables indexed by the integer opcode so the
+# command path can validate with a single lookup and bit test.
+#
+# data_lengths[opcode] -> number of data bytes, VARIABLE for variable length
+#                         commands, UNKNOWN if not a supported command
+# next_modes[opcode]   -> mode index after the command, NO_CHANGE for a noop
+# legal_modes[opcode]  -> bitmask of mode indexes the command is available in
+data_lengths = bytearray(b"\xff" * 256)
+next_modes = bytearray(b"\xff" * 256)
+legal_modes = bytearray(256)
+
+for _i in range(0, len(PACKED), 4):
+    _op = PACKED[_i]
+    data_lengths[_op] = PACKED[_i + 1]
+    next_modes[_op] = PACKED[_i + 2]
+    legal_modes[_op] = PACKED[_i + 3]
+
+
+class _Table:
+    """
+    Read only mapping over the PACKED tables. Entries are decoded when they
+    are looked up, so the dicts in spec never have to be held in RAM.
+    """
+
+    def __init__(self, keys, entry, contains):
+        self._keys = keys
+        self._entry = entry
+        self._contains = contains
+
+    def __getitem__(self, key):
+        if not self._contains(key):
+            raise KeyError(key)
+        return self._entry(key)
+
+    def __contains__(self, key):
+        return self._contains(key)
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def keys(self):
+        return self._keys()
+
+    def values(self):
+        return [self._entry(key) for key in self._keys()]
+
+    def items(self):
+        return [(key, self._entry(key)) for key in self._keys()]
+
+    def get(self, key, default=None):
+        return self._entry(key) if self._contains(key) else default
+
+
+def _command_codes():
+    return [bytes((PACKED[i],)) for i in range(0, len(PACKED), 4)]
+
+
+def _is_command(code):
+    return (
+        isinstance(code, bytes) and len(code) == 1 and data_lengths[code[0]] != UNKNOWN
+    )
+
+
+def _command(code):
+    length = data_lengths[code[0]]
+    mode = next_modes[code[0]]
+    return {
+        "int_opcode": code[0],
+        "data_bytes": None if length == VARIABLE else length,
+        "new_mode": None if mode == NO_CHANGE else mode_names[mode],
+    }
+
+
+def _mode_codes(mode):
+    mode_bit = 1 << mode_names.index(mode)
+    return tuple(
+        bytes((PACKED[i],))
+        for i in range(0, len(PACKED), 4)
+        if PACKED[i + 3] & mode_bit
+    )
+
+
+# The same entries as spec.commands and spec.mode_commands, opcodes of a mode
+# are listed in opcode order.
+commands = _Table(_command_codes, _command, _is_command)
+mode_commands = _Table(lambda: list(mode_names), _mode_codes, mode_names.__contains__)
+
+
+def compile_tables():
+    """
+    Rebuild the dispatch tables from the dicts in spec after changing them.
+    """
+    from . import spec
+
+    spec.compile_tables()
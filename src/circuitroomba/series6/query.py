@@ -0,0 +1,134 @@
+import time
+from . import sensors
+from .opcode import QUERY_LIST
+
+# QUERY_LIST data is the packet count followed by the ids, and has to fit in
+# the interface transmit buffer.
+MAX_QUERY_PACKETS = 33
+
+
+class SensorQuery:
+    """
+    Coalesces sensor reads into QUERY_LIST requests and caches the values.
+
+    Reads registered with want() are held until flush(), which is called from
+    OpenInterface.tick(), then every pending packet is requested with one
+    QUERY_LIST round trip and the response is split back out to each caller.
+
+    Values are cached per single packet id for ttl seconds, so repeated reads
+    inside a control cycle never touch the wire. The Roomba updates its
+    sensors every 15ms which is the default ttl.
+
+    >>> bot.query.want(25, on_charge)
+    >>> bot.query.want(7, on_bump)
+    >>> bot.tick()  # one QUERY_LIST for both
+    >>> bot.query.read(25)  # cached
+    """
+
+    def __init__(self, interface, ttl=0.015, timeout=0.1):
+        self._interface = interface
+        self.ttl = ttl
+        self.timeout = timeout
+        self._pending = []
+        self._callbacks = []
+        self._values = {}
+        self._timestamps = {}
+        self._response = bytearray(64)
+
+        self.round_trips = 0
+        self.cache_hits = 0
+
+    def want(self, packet_id, callback=None):
+        """
+        Queue a read for the next flush. callback is called with the value,
+        a dict of member id to value for group packets.
+        """
+        sensors.members(packet_id)
+        if packet_id not in self._pending:
+            self._pending.append(packet_id)
+        if callback is not None:
+            self._callbacks.append((packet_id, callback))
+
+    def read(self, packet_id):
+        """
+        Return a cached value if it is still fresh, otherwise flush the
+        pending reads along with this one and return the new value.
+        """
+        if self.fresh(packet_id):
+            self.cache_hits += 1
+        else:
+            self.want(packet_id)
+            self.flush()
+        return self.cached(packet_id)
+
+    def fresh(self, packet_id, now=None):
+        if now is None:
+            now = time.monotonic()
+        for member in sensors.members(packet_id):
+            timestamp = self._timestamps.get(member)
+            if timestamp is None or now - timestamp > self.ttl:
+                return False
+        return True
+
+    def cached(self, packet_id):
+        """
+        Last value read for packet_id, regardless of age.
+        """
+        if packet_id in sensors.groups:
+            values = {}
+            for member in sensors.groups[packet_id]:
+                values[member] = self._values[member]
+            return values
+        return self._values[packet_id]
+
+    def invalidate(self, packet_id=None):
+        if packet_id is None:
+            self._timestamps.clear()
+        else:
+            for member in sensors.members(packet_id):
+                self._timestamps.pop(member, None)
+
+    def flush(self):
+        """
+        Send every pending read as QUERY_LIST requests and deliver the results.
+        Returns the number of round trips made.
+        """
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, []
+        callbacks, self._callbacks = self._callbacks, []
+        now = time.monotonic()
+
+        requested = [packet_id for packet_id in pending if not self.fresh(packet_id)]
+        round_trips = 0
+        for i in range(0, len(requested), MAX_QUERY_PACKETS):
+            self._request(requested[i : i + MAX_QUERY_PACKETS], now)
+            round_trips += 1
+
+        for packet_id, callback in callbacks:
+            callback(self.cached(packet_id))
+
+        return round_trips
+
+    def _request(self, packet_ids, now):
+        layout = sensors.layout(packet_ids)
+        data = bytearray(len(packet_ids) + 1)
+        data[0] = len(packet_ids)
+        data[1:] = bytes(packet_ids)
+
+        if len(self._response) < layout.size:
+            self._response = bytearray(layout.size)
+        response = memoryview(self._response)[: layout.size]
+
+        self._interface._command(QUERY_LIST, data)
+        self._interface._read_into(response, self.timeout)
+        self.round_trips += 1
+
+        values = layout.unpack_from(response)
+        for field, value in zip(layout.fields, values):
+            self._values[field] = value
+            self._timestamps[field] = now
+
+        if layout.watched:
+            self._interface._observe(layout, values, True)
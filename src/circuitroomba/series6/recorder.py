@@ -0,0 +1,371 @@
+import struct
+import time
+from .opcode import QUERY_LIST, SONG, STREAM, UNKNOWN, VARIABLE, data_lengths
+
+try:
+    import threading
+    from collections import deque
+except ImportError:
+    threading = None
+
+# Trace files start with the magic and format version, followed by records of
+# [direction][microseconds since the previous record][length][data...]
+MAGIC = b"CRTR\x01"
+RECORD = struct.Struct("<BIH")
+
+TX = 0
+RX = 1
+
+# Runs longer than this are split over several records.
+MAX_RUN = 0xFFFF
+
+# Gaps longer than this (about 71 minutes) are clamped.
+MAX_DELTA = 0xFFFFFFFF
+
+try:
+    _ticks = time.monotonic_ns
+except AttributeError:
+
+    def _ticks():
+        return int(time.monotonic() * 1000000000)
+
+
+def microseconds():
+    return _ticks() // 1000
+
+
+class Recorder:
+    """
+    Append only binary log of every byte run sent to and received from the
+    Roomba, with monotonic timestamps.
+
+    Records are packed into an in memory buffer. Once buffer_size bytes are
+    pending the buffer is handed to a writer thread, so the control loop
+    never waits on the disk. Without threads (CircuitPython) the buffer is
+    written in place when full, or whenever flush() is called. If the writer
+    thread fails to write, the error is raised again from the next record(),
+    flush() or close().
+
+    file is a path, opened for appending, or a writable binary file object.
+
+    >>> recorder = Recorder("session.trace")
+    >>> link = RecordingTransport(transport.SerialTransport("/dev/ttyUSB0"), recorder)
+    >>> bot = roomba.Commands(transport=link)
+    """
+
+    def __init__(self, file, buffer_size=8192, background=True, clock=microseconds):
+        if isinstance(file, str):
+            file = open(file, "ab")
+            self._owns_file = True
+        else:
+            self._owns_file = False
+
+        self._file = file
+        self._clock = clock
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._header = bytearray(RECORD.size)
+        self._last = clock()
+
+        self.records = 0
+        self.bytes = 0
+
+        if file.tell() == 0:
+            self._buffer += MAGIC
+
+        self._pending = None
+        self._thread = None
+        self._error = None
+        if background and threading is not None:
+            self._pending = deque()
+            self._wakeup = threading.Condition()
+            self._closing = False
+            self._thread = threading.Thread(target=self._writer, daemon=True)
+            self._thread.start()
+
+    def tx(self, data):
+        self.record(TX, data)
+
+    def rx(self, data):
+        self.record(RX, data)
+
+    def record(self, direction, data):
+        """
+        Append a byte run. data may be any bytes like object, it is copied.
+        """
+        if self._error is not None:
+            raise self._error
+
+        now = self._clock()
+        delta = now - self._last
+        self._last = now
+        if delta > MAX_DELTA:
+            delta = MAX_DELTA
+
+        data = memoryview(data)
+        size = len(data)
+        buffer = self._buffer
+        header = self._header
+        start = 0
+        while True:
+            length = min(size - start, MAX_RUN)
+            RECORD.pack_into(header, 0, direction, delta, length)
+            buffer += header
+            buffer += data[start : start + length]
+            self.records += 1
+            start += length
+            delta = 0
+            if start >= size:
+                break
+
+        self.bytes += size
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Hand the buffered records to the writer, or write them now when
+        running without a writer thread.
+        """
+        if self._error is not None:
+            raise self._error
+        if not self._buffer:
+            return
+
+        buffer = self._buffer
+        self._buffer = bytearray()
+
+        if self._thread is None:
+            self._file.write(buffer)
+            return
+
+        with self._wakeup:
+            self._pending.append(buffer)
+            self._wakeup.notify()
+
+    def close(self):
+        """
+        Write everything recorded so far and stop the writer.
+        """
+        if self._error is None:
+            self.flush()
+
+        if self._thread is not None:
+            with self._wakeup:
+                self._closing = True
+                self._wakeup.notify()
+            self._thread.join()
+            self._thread = None
+
+        if self._error is None:
+            self._file.flush()
+        if self._owns_file:
+            self._file.close()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _writer(self):
+        pending = self._pending
+        while True:
+            with self._wakeup:
+                while not pending and not self._closing:
+                    self._wakeup.wait()
+                if not pending:
+                    return
+                buffer = pending.popleft()
+            try:
+                self._file.write(buffer)
+            except Exception as error:
+                # Keep the error for the recording side, nothing more can
+                # be written.
+                with self._wakeup:
+                    self._error = error
+                    pending.clear()
+                return
+
+
+class RecordingTransport:
+    """
+    Wraps another transport and records every write and read into a
+    Recorder. Anything else is passed through to the wrapped transport.
+    """
+
+    def __init__(self, transport, recorder):
+        self.transport = transport
+        self.recorder = recorder
+
+    def configure_brc(self, pin):
+        return self.transport.configure_brc(pin)
+
+    @property
+    def baudrate(self):
+        return self.transport.baudrate
+
+    @baudrate.setter
+    def baudrate(self, rate):
+        self.transport.baudrate = rate
+
+    @property
+    def in_waiting(self):
+        return self.transport.in_waiting
+
+    def write(self, packet):
+        self.recorder.tx(packet)
+        return self.transport.write(packet)
+
+    def readinto(self, buffer):
+        count = self.transport.readinto(buffer)
+        if count:
+            self.recorder.rx(memoryview(buffer)[:count])
+        return count
+
+    def reset_input_buffer(self):
+        self.transport.reset_input_buffer()
+
+    def close(self):
+        self.transport.close()
+        self.recorder.close()
+
+    def __getattr__(self, name):
+        return getattr(self.transport, name)
+
+
+def read_records(file):
+    """
+    Yield (seconds, direction, data) for every record in a trace, seconds
+    counted from the start of the recording. file is a path, a binary file
+    object or the trace bytes.
+    """
+    if isinstance(file, str):
+        with open(file, "rb") as f:
+            data = f.read()
+    elif isinstance(file, (bytes, bytearray, memoryview)):
+        data = file
+    else:
+        data = file.read()
+
+    view = memoryview(data)
+    if bytes(view[: len(MAGIC)]) != MAGIC:
+        raise RuntimeError("Not a circuitroomba trace, or an unsupported version.")
+
+    offset = len(MAGIC)
+    end = len(view)
+    ticks = 0
+    while offset + RECORD.size <= end:
+        direction, delta, length = RECORD.unpack_from(view, offset)
+        offset += RECORD.size
+        if offset + length > end:
+            raise RuntimeError("Trace is truncated at byte %s." % offset)
+
+        ticks += delta
+        yield ticks / 1000000, direction, view[offset : offset + length]
+        offset += length
+
+
+def split_commands(data):
+    """
+    Yield (start, size) for each framed command in a run of transmitted
+    bytes. Stops at the first unknown opcode or incomplete command.
+    """
+    start = 0
+    end = len(data)
+    while start < end:
+        op = data[start]
+        size = data_lengths[op]
+        if size == UNKNOWN:
+            return
+        if size == VARIABLE:
+            if op in (STREAM[0], QUERY_LIST[0]) and start + 1 < end:
+                size = data[start + 1] + 1
+            elif op == SONG[0] and start + 2 < end:
+                size = 2 * data[start + 2] + 2
+            else:
+                return
+
+        size += 1
+        if start + size > end:
+            return
+        yield start, size
+        start += size
+
+
+class Replay:
+    """
+    Feed a recorded session back through an OpenInterface at full speed or
+    in real time.
+
+    Transmitted commands drive the interface mode state machine and trace
+    history exactly as they did when sent, without writing anything, and a
+    STREAM command installs the stream parser it requested. Received bytes
+    are fed to that parser. Use it to check or benchmark decoder changes
+    against captures from real robots.
+
+    >>> replay = Replay("session.trace")
+    >>> for seconds, frame in replay.run():
+    ...     print(seconds, frame[7])
+    """
+
+    def __init__(self, file, interface=None):
+        if interface is None:
+            from .interface import OpenInterface
+            from .transport import LoopbackTransport
+
+            interface = OpenInterface(transport=LoopbackTransport())
+
+        self.file = file
+        self.interface = interface
+        self.commands = 0
+        self.frames = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.unparsed_bytes = 0
+
+    def run(self, realtime=False, clock=time.monotonic, sleep=time.sleep):
+        """
+        Replay the trace, yielding (seconds, frame) for every stream frame
+        decoded. With realtime set records are spaced out as recorded.
+        """
+        interface = self.interface
+        started = clock()
+
+        for seconds, direction, data in read_records(self.file):
+            if realtime:
+                delay = started + seconds - clock()
+                if delay > 0:
+                    sleep(delay)
+
+            if direction == TX:
+                self.bytes_sent += len(data)
+                self._sent(data)
+                continue
+
+            self.bytes_received += len(data)
+            parser = interface._stream
+            if parser is None:
+                self.unparsed_bytes += len(data)
+                continue
+
+            for frame in parser.feed(data):
+                self.frames += 1
+                yield seconds, frame
+
+    def _sent(self, data):
+        interface = self.interface
+        consumed = 0
+        for start, size in split_commands(data):
+            op = data[start]
+            packet = data[start : start + size]
+            interface._sent(op, size, packet)
+            self.commands += 1
+            consumed = start + size
+
+            if op == STREAM[0]:
+                interface.stream_parser(packet[2:])
+
+        self.unparsed_bytes += len(data) - consumed
@@ -1,3 +1,4 @@
+import struct
 import time
 from .opcode import (
     START,
@@ -11,10 +12,23 @@ from .opcode import (
     SPOT,
     FORCE_SEEKING_DOCK,
     POWER,
+    STREAM,
+    DO_STREAM,
+    DRIVE,
+    DRIVE_DIRECT,
+    DRIVE_PWM,
+    MOTORS,
+    PWM_MOTORS,
+    PLAY,
     baud_codes,
 )
 from .interface import OpenInterface
 
+# Special radius values for drive()
+STRAIGHT = 0x7FFF
+TURN_CLOCKWISE = -1
+TURN_COUNTER_CLOCKWISE = 1
+
 
 class Commands(OpenInterface):
     """
@@ -27,8 +41,23 @@ class Commands(OpenInterface):
     >>> bot.clean()
     """
 
-    def __init__(self, tx_pin, rx_pin, brc_pin, baud_rate=115200, trace=False):
-        super().__init__(tx_pin, rx_pin, brc_pin, baud_rate, trace)
+    __slots__ = ("_motion",)
+
+    def __init__(
+        self,
+        tx_pin=None,
+        rx_pin=None,
+        brc_pin=None,
+        baud_rate=115200,
+        trace=False,
+        trace_depth=10,
+        transport=None,
+    ):
+        super().__init__(
+            tx_pin, rx_pin, brc_pin, baud_rate, trace, trace_depth, transport
+        )
+        # Motion arguments are packed into this buffer for every command.
+        self._motion = bytearray(4)
 
     def __repr__(self):
         return (
@@ -103,11 +132,13 @@ class Commands(OpenInterface):
         """
 
         if baud_rate_code in baud_codes.keys():
-            self.baud_rate = baud_codes[baud_rate_code]
+            # the command goes out at the current rate before switching
             self.command(BAUD, baud_rate_code)
-            # per the OI spec another command cannot be issued after the baud command
-            # for 100ms
-            time.sleep(1 / 1000000)
+            if self._queue is None:
+                self.baud_rate = baud_codes[baud_rate_code]
+                # per the OI spec another command cannot be issued after the baud
+                # command for 100ms, the send queue holds itself instead
+                time.sleep(0.1)
         else:
             raise RuntimeError(
                 "Invalid baud rate code. Please refer to page 9 of the"
@@ -204,3 +235,251 @@ class Commands(OpenInterface):
         - Changes mode to: Passive
         """
         self.command(POWER)
+
+    def drive(self, velocity, radius=STRAIGHT, latest=False):
+        """
+        This command controls Roomba’s drive wheels. Velocity is the average
+        velocity of the drive wheels in mm/s, radius the radius in mm at which
+        Roomba will turn. A positive radius turns left, a negative radius
+        turns right. Use STRAIGHT, TURN_CLOCKWISE or TURN_COUNTER_CLOCKWISE for
+        the special cases.
+
+        With latest set the command is sent as a setpoint, see setpoint().
+
+        - Serial sequence: [137] [Velocity high byte] [Velocity low byte]
+          [Radius high byte] [Radius low byte]
+        - Available in modes: Safe or Full
+        - Changes mode to: No Change
+        - Velocity (-500 – 500 mm/s)
+        - Radius (-2000 – 2000 mm)
+        """
+        if radius == 0x8000:
+            radius = -0x8000
+        if radius not in (STRAIGHT, -0x8000):
+            _check_range("radius", radius, -2000, 2000)
+        _check_range("velocity", velocity, -500, 500)
+        self._send_motion(DRIVE, velocity, radius, latest)
+
+    def drive_direct(self, right, left, latest=False):
+        """
+        This command lets you control the forward and backward motion of
+        Roomba’s drive wheels independently, velocities are in mm/s.
+
+        With latest set the command is sent as a setpoint, see setpoint().
+
+        - Serial sequence: [145] [Right velocity high byte]
+          [Right velocity low byte] [Left velocity high byte]
+          [Left velocity low byte]
+        - Available in modes: Safe or Full
+        - Changes mode to: No Change
+        - Right and left wheel velocity (-500 – 500 mm/s)
+        """
+        _check_range("right velocity", right, -500, 500)
+        _check_range("left velocity", left, -500, 500)
+        self._send_motion(DRIVE_DIRECT, right, left, latest)
+
+    def drive_pwm(self, right, left, latest=False):
+        """
+        This command lets you control the raw forward and backward motion of
+        Roomba’s drive wheels independently.
+
+        With latest set the command is sent as a setpoint, see setpoint().
+
+        - Serial sequence: [146] [Right PWM high byte] [Right PWM low byte]
+          [Left PWM high byte] [Left PWM low byte]
+        - Available in modes: Safe or Full
+        - Changes mode to: No Change
+        - Right and left wheel PWM (-255 – 255)
+        """
+        _check_range("right PWM", right, -255, 255)
+        _check_range("left PWM", left, -255, 255)
+        self._send_motion(DRIVE_PWM, right, left, latest)
+
+    def motors(
+        self,
+        side_brush=False,
+        vacuum=False,
+        main_brush=False,
+        side_brush_clockwise=False,
+        main_brush_outward=False,
+    ):
+        """
+        This command lets you control the forward and backward motion of
+        Roomba’s main brush, side brush, and vacuum independently. All motors
+        run at maximum speed when enabled.
+
+        - Serial sequence: [138] [Motors]
+        - Available in modes: Safe or Full
+        - Changes mode to: No Change
+        """
+        bits = (
+            side_brush
+            | vacuum << 1
+            | main_brush << 2
+            | side_brush_clockwise << 3
+            | main_brush_outward << 4
+        )
+        self.command(MOTORS, bits)
+
+    def pwm_motors(self, main_brush=0, side_brush=0, vacuum=0):
+        """
+        This command lets you control the speed of Roomba’s main brush, side
+        brush, and vacuum independently. Positive speeds turn the brushes in
+        their default cleaning direction.
+
+        - Serial sequence: [144] [Main Brush PWM] [Side Brush PWM] [Vacuum PWM]
+        - Available in modes: Safe or Full
+        - Changes mode to: No Change
+        - Main Brush and Side Brush duty cycle (-127 – 127)
+        - Vacuum duty cycle (0 – 127)
+        """
+        _check_range("main brush PWM", main_brush, -127, 127)
+        _check_range("side brush PWM", side_brush, -127, 127)
+        _check_range("vacuum PWM", vacuum, 0, 127)
+        struct.pack_into(">bbb", self._motion, 0, main_brush, side_brush, vacuum)
+        self.command(PWM_MOTORS, memoryview(self._motion)[:3])
+
+    def _send_motion(self, new_command, first, second, latest):
+        struct.pack_into(">hh", self._motion, 0, first, second)
+        if latest:
+            self.setpoint(new_command, self._motion)
+        else:
+            self.command(new_command, self._motion)
+
+    def leds(
+        self,
+        debris=False,
+        spot=False,
+        dock=False,
+        check_robot=False,
+        color=0,
+        intensity=0,
+    ):
+        """
+        This command controls the LEDs common to all models of Roomba 600. The
+        power LED color goes from 0 for green to 255 for red, and its intensity
+        from 0 for off to 255 for full. The packet is compiled once and cached,
+        see compiler.leds.
+
+        - Serial sequence: [139] [LED Bits] [Power Color] [Power Intensity]
+        - Available in modes: Safe or Full
+        - Changes mode to: No Change
+        """
+        from . import compiler
+
+        compiler.leds(debris, spot, dock, check_robot, color, intensity).send(self)
+
+    def digit_leds_ascii(self, text):
+        """
+        This command controls the four 7 segment displays using ASCII character
+        codes, text is shown left to right. The packet is compiled once and
+        cached, see compiler.digits.
+
+        - Serial sequence: [164] [Digit 3 ASCII] [Digit 2 ASCII] [Digit 1 ASCII]
+          [Digit 0 ASCII]
+        - Available in modes: Safe or Full
+        - Changes mode to: No Change
+        """
+        from . import compiler
+
+        compiler.digits(text).send(self)
+
+    def song(self, notes):
+        """
+        This command loads a melody into the song slots and starts playing it
+        without blocking. Notes are (note, seconds) pairs, melodies longer than
+        the 16 notes of a slot are spread across the four slots. Returns a
+        compiler.Playback, poll it from the main loop until it stops playing
+        to send the later parts. Compile a compiler.Melody once to replay a
+        tune without encoding it again.
+
+        >>> playback = bot.song(notes)
+        >>> while playback.poll():
+        ...     bot.tick()
+
+        - Serial sequence: [140] [Song Number] [Song Length] [Note Number 1]
+          [Note Duration 1] [Note Number 2] [Note Duration 2], etc.
+        - Available in modes: Safe or Full
+        - Changes mode to: No Change
+        """
+        from . import compiler
+
+        return compiler.Melody(notes).start(self)
+
+    def play(self, song_number):
+        """
+        This command plays a song loaded into one of the song slots.
+
+        - Serial sequence: [141] [Song Number]
+        - Available in modes: Safe or Full
+        - Changes mode to: No Change
+        """
+        self.command(PLAY, song_number)
+
+    def stream(self, packet_ids, callback=None):
+        """
+        This command starts a stream of data packets. The list of packets
+        requested is sent every 15 ms, which is the rate Roomba uses to update
+        data. Returns the StreamParser that decodes the frames. Read them with
+        frames(), or pass a callback and call tick() from the main loop.
+
+        It is up to you not to request more data than can be sent at the
+        current baud rate in the 15 ms time slot.
+
+        - Serial sequence: [148] [Number of packets] [Packet ID 1] [Packet ID 2] etc.
+        - Available in modes: Passive, Safe, or Full
+        - Changes mode to: No Change
+        """
+        parser = self.stream_parser(packet_ids, callback)
+        data = bytearray(len(parser.packet_ids) + 1)
+        data[0] = len(parser.packet_ids)
+        data[1:] = bytes(parser.packet_ids)
+        self.command(STREAM, data)
+        return parser
+
+    def pause_stream(self):
+        """
+        This command stops the stream without clearing the list of requested
+        packets.
+
+        - Serial sequence: [150] [0]
+        - Available in modes: Passive, Safe, or Full
+        - Changes mode to: No Change
+        """
+        self.command(DO_STREAM, 0)
+
+    def resume_stream(self):
+        """
+        This command restarts the stream using the list of packets last
+        requested.
+
+        - Serial sequence: [150] [1]
+        - Available in modes: Passive, Safe, or Full
+        - Changes mode to: No Change
+        """
+        self.command(DO_STREAM, 1)
+        if self._stream is not None:
+            self._stream.reset()
+
+    def sensors(self, packet_id):
+        """
+        This command requests the OI to send a packet of sensor data bytes.
+        Reads go through the query layer, so a value read within the last
+        query.ttl seconds is returned from cache, and other pending reads are
+        sent in the same QUERY_LIST request. Single packets return an int,
+        group packets a dict of member packet id to value.
+
+        - Serial sequence: [149] [Number of Packets] [Packet ID 1] ... [Packet ID N]
+        - Available in modes: Passive, Safe, or Full
+        - Changes mode to: No Change
+        """
+        return self.query.read(packet_id)
+
+
+def _check_range(name, value, low, high):
+    if not low <= value <= high:
+        raise RuntimeError(
+            "%s %s is out of range, expected %s to %s.\n"
+            "Refer to the Roomba Open Interface Spec for more information."
+            % (name, value, low, high)
+        )
@@ -0,0 +1,275 @@
+import time
+from .opcode import (
+    BAUD,
+    CLEAN,
+    CONTROL as CONTROL_OPCODE,
+    DO_STREAM,
+    DRIVE,
+    DRIVE_DIRECT,
+    DRIVE_PWM,
+    FORCE_SEEKING_DOCK,
+    FULL,
+    MAX_CLEAN,
+    MOTORS,
+    NO_CHANGE,
+    POWER,
+    PWM_MOTORS,
+    QUERY,
+    QUERY_LIST,
+    RESET,
+    SAFE,
+    SPOT,
+    START,
+    STOP,
+    STREAM,
+    baud_codes,
+    legal_modes,
+    next_modes,
+)
+
+# Priority lanes, lower lanes are always sent first.
+SAFETY = 0
+CONTROL = 1
+MOTION = 2
+BULK = 3
+LANES = 4
+
+# Lane for each integer opcode, anything not listed is BULK (LEDs, songs,
+# schedules).
+lanes = bytearray([BULK] * 256)
+for _code in (STOP, RESET, POWER):
+    lanes[_code[0]] = SAFETY
+for _code in (
+    START,
+    BAUD,
+    CONTROL_OPCODE,
+    SAFE,
+    FULL,
+    CLEAN,
+    MAX_CLEAN,
+    SPOT,
+    FORCE_SEEKING_DOCK,
+    QUERY,
+    QUERY_LIST,
+    STREAM,
+    DO_STREAM,
+):
+    lanes[_code[0]] = CONTROL
+for _code in (DRIVE, DRIVE_DIRECT, DRIVE_PWM, MOTORS, PWM_MOTORS):
+    lanes[_code[0]] = MOTION
+
+# Seconds the OI needs after a command before it accepts the next one.
+min_gaps = {BAUD[0]: 0.1}
+
+# The Roomba works through its input every 15ms.
+SLOT = 0.015
+
+
+class SendQueue:
+    """
+    Outbound queue that paces commands to what the link and the OI can take.
+
+    Commands are validated and framed when they are put, then wait in one of
+    four priority lanes: SAFETY (stop, reset, power), CONTROL (mode and
+    sensor commands), MOTION (drive and motors) and BULK (everything else).
+    pump() always sends from the lowest non empty lane first, so a STOP
+    skips ahead of queued motion or LED traffic. Within a lane commands keep
+    their order.
+
+    Sending is limited by a token bucket of bytes that refills at the line
+    rate of the current baud rate, with a burst of one 15ms OI update slot,
+    172 bytes at 115200. That keeps the UART transmit buffer from filling up
+    while still sending as fast as the wire allows. Opcodes in min_gaps hold
+    the queue after they are sent, BAUD holds it for 100ms and switches the
+    local baud rate when it goes out.
+
+    A queued command that is no longer legal when its turn comes, because a
+    higher priority command changed the mode, is dropped.
+
+    Once created through OpenInterface.send_queue, command() puts into the
+    queue and tick() pumps it. Other writers keep to the queue as well:
+    setpoint() replaces a waiting command with the same opcode, a batch and
+    Fleet.broadcast() go out after the commands already queued, and
+    wake_up() writes ahead of the queue, whose commands are meant for an
+    awake robot, then resyncs the predicted mode.
+
+    >>> queue = bot.send_queue
+    >>> bot.drive(200, 500)
+    >>> bot.stop()  # sent before anything still waiting
+    """
+
+    def __init__(self, interface, lane_size=16, burst=None):
+        self._interface = interface
+        self.lanes = tuple([] for lane in range(LANES))
+        self.lane_size = lane_size
+        self.burst = burst
+        self._mode = interface._mode
+        self._tokens = 0
+        self._refilled = None
+        self._hold_until = 0
+
+        self.sent = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return sum(len(lane) for lane in self.lanes)
+
+    def put(self, new_command, data=None, lane=None, replace=False):
+        """
+        Validate and frame a command and add it to its lane. The lane defaults
+        to the one listed for the opcode in lanes. Raises RuntimeError when
+        the lane is full.
+
+        With replace set a command with the same opcode still waiting in the
+        lane is overwritten in place instead, and True is returned.
+        """
+        interface = self._interface
+        if not len(self):
+            self._mode = interface._mode
+
+        op = interface._validate(new_command, self._mode)
+        if lane is None:
+            lane = lanes[op]
+
+        queue = self.lanes[lane]
+        if replace:
+            for i in range(len(queue)):
+                if queue[i][0] == op:
+                    size = interface._frame(op, data)
+                    queue[i] = bytes(interface._tx_view[:size])
+                    return True
+
+        if len(queue) >= self.lane_size:
+            raise RuntimeError(
+                "Send queue lane %s is full, %s commands are waiting."
+                % (lane, len(queue))
+            )
+
+        size = interface._frame(op, data)
+        queue.append(bytes(interface._tx_view[:size]))
+
+        new_mode = next_modes[op]
+        if new_mode != NO_CHANGE:
+            self._mode = new_mode
+        return False
+
+    def resync(self):
+        """
+        Predict the mode again from the tracked mode, after something outside
+        the queue changed it.
+        """
+        mode = self._interface._mode
+        for lane in self.lanes:
+            for packet in lane:
+                new_mode = next_modes[packet[0]]
+                if new_mode != NO_CHANGE:
+                    mode = new_mode
+        self._mode = mode
+
+    def pump(self, now=None):
+        """
+        Send as many queued commands as the token bucket and the minimum gaps
+        allow. Never blocks, returns the number of commands sent.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        interface = self._interface
+        self._refill(now)
+        count = 0
+
+        while now >= self._hold_until:
+            queue = self._next_lane()
+            if queue is None:
+                break
+
+            packet = queue[0]
+            size = len(packet)
+            if size > self._tokens:
+                break
+
+            del queue[0]
+            op = packet[0]
+            if not legal_modes[op] & (1 << interface._mode):
+                self.dropped += 1
+                continue
+
+            interface._write(packet)
+            interface._sent(op, size, packet)
+            self._tokens -= size
+            self.sent += 1
+            count += 1
+
+            if op == BAUD[0]:
+                interface.baud_rate = baud_codes[packet[1]]
+            if op in min_gaps:
+                self._hold_until = now + min_gaps[op]
+
+        return count
+
+    def wait(self, now=None):
+        """
+        Seconds until pump() can send the next command, None if the queue is
+        empty.
+        """
+        queue = self._next_lane()
+        if queue is None:
+            return None
+
+        if now is None:
+            now = time.monotonic()
+        self._refill(now)
+
+        delay = self._hold_until - now
+        shortfall = len(queue[0]) - self._tokens
+        if shortfall > 0:
+            delay = max(delay, shortfall / self._rate())
+        return max(delay, 0)
+
+    def drain(self, timeout=1):
+        """
+        Block until every queued command has been sent. Raises RuntimeError if
+        that takes longer than timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            self.pump()
+            delay = self.wait()
+            if delay is None:
+                return
+            if time.monotonic() + delay > deadline:
+                raise RuntimeError(
+                    "Timed out draining the send queue, %s commands are waiting."
+                    % len(self)
+                )
+            time.sleep(delay)
+
+    def clear(self):
+        for lane in self.lanes:
+            del lane[:]
+        self._mode = self._interface._mode
+
+    def _next_lane(self):
+        for lane in self.lanes:
+            if lane:
+                return lane
+        return None
+
+    def _rate(self):
+        # bytes per second, 10 bit times per byte
+        return self._interface.baud_rate / 10
+
+    def _capacity(self):
+        if self.burst is not None:
+            return self.burst
+        return max(int(self._rate() * SLOT), len(self._interface._tx_buffer))
+
+    def _refill(self, now):
+        capacity = self._capacity()
+        if self._refilled is None:
+            self._tokens = capacity
+        else:
+            self._tokens += (now - self._refilled) * self._rate()
+            if self._tokens > capacity:
+                self._tokens = capacity
+        self._refilled = now
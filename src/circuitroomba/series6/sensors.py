@@ -0,0 +1,238 @@
+# circuitroomba sensor packets
+# See "Roomba Open Interface Sensor Packets", page 23 of the OI spec.
+import struct
+from array import array
+
+# packet id: (name, data bytes, signed)
+packets = {
+    7: ("bumps_wheel_drops", 1, False),
+    8: ("wall", 1, False),
+    9: ("cliff_left", 1, False),
+    10: ("cliff_front_left", 1, False),
+    11: ("cliff_front_right", 1, False),
+    12: ("cliff_right", 1, False),
+    13: ("virtual_wall", 1, False),
+    14: ("wheel_overcurrents", 1, False),
+    15: ("dirt_detect", 1, False),
+    16: ("unused_16", 1, False),
+    17: ("infrared_character_omni", 1, False),
+    18: ("buttons", 1, False),
+    19: ("distance", 2, True),
+    20: ("angle", 2, True),
+    21: ("charging_state", 1, False),
+    22: ("voltage", 2, False),
+    23: ("current", 2, True),
+    24: ("temperature", 1, True),
+    25: ("battery_charge", 2, False),
+    26: ("battery_capacity", 2, False),
+    27: ("wall_signal", 2, False),
+    28: ("cliff_left_signal", 2, False),
+    29: ("cliff_front_left_signal", 2, False),
+    30: ("cliff_front_right_signal", 2, False),
+    31: ("cliff_right_signal", 2, False),
+    32: ("unused_32", 1, False),
+    33: ("unused_33", 2, False),
+    34: ("charging_sources_available", 1, False),
+    35: ("oi_mode", 1, False),
+    36: ("song_number", 1, False),
+    37: ("song_playing", 1, False),
+    38: ("number_of_stream_packets", 1, False),
+    39: ("requested_velocity", 2, True),
+    40: ("requested_radius", 2, True),
+    41: ("requested_right_velocity", 2, True),
+    42: ("requested_left_velocity", 2, True),
+    43: ("left_encoder_counts", 2, True),
+    44: ("right_encoder_counts", 2, True),
+    45: ("light_bumper", 1, False),
+    46: ("light_bump_left_signal", 2, False),
+    47: ("light_bump_front_left_signal", 2, False),
+    48: ("light_bump_center_left_signal", 2, False),
+    49: ("light_bump_center_right_signal", 2, False),
+    50: ("light_bump_front_right_signal", 2, False),
+    51: ("light_bump_right_signal", 2, False),
+    52: ("infrared_character_left", 1, False),
+    53: ("infrared_character_right", 1, False),
+    54: ("left_motor_current", 2, True),
+    55: ("right_motor_current", 2, True),
+    56: ("main_brush_motor_current", 2, True),
+    57: ("side_brush_motor_current", 2, True),
+    58: ("stasis", 1, False),
+}
+
+# Group packet id: member packet ids in the order the Roomba sends them.
+groups = {
+    0: tuple(range(7, 27)),
+    1: tuple(range(7, 17)),
+    2: tuple(range(17, 21)),
+    3: tuple(range(21, 27)),
+    4: tuple(range(27, 35)),
+    5: tuple(range(35, 43)),
+    6: tuple(range(7, 43)),
+    100: tuple(range(7, 59)),
+    101: tuple(range(43, 59)),
+    106: tuple(range(46, 52)),
+    107: tuple(range(54, 59)),
+}
+
+# The OI mode packet, its value is the mode index used in opcode.
+MODE_PACKET = 35
+
+# Readings that make Roomba stop and revert from safe to passive mode:
+# packet id: (bit mask, only while driving forward or turning tightly).
+# Wheel drops, a cliff and a powered charger, see "Safe Mode" in the spec.
+safety_conditions = {
+    7: (0x0C, False),
+    9: (0x01, True),
+    10: (0x01, True),
+    11: (0x01, True),
+    12: (0x01, True),
+    34: (0x03, False),
+}
+
+
+def members(packet_id):
+    """
+    Single packet ids contained in packet_id, in wire order.
+    """
+    if packet_id in groups:
+        return groups[packet_id]
+    if packet_id in packets:
+        return (packet_id,)
+    raise KeyError(packet_id)
+
+
+def packet_size(packet_id):
+    """
+    Number of data bytes the Roomba sends for packet_id.
+    """
+    return sum(packets[member][1] for member in members(packet_id))
+
+
+def field_format(packet_id):
+    """
+    struct format character for a single packet. Values are sent high byte
+    first.
+    """
+    name, size, signed = packets[packet_id]
+    if size == 1:
+        return "b" if signed else "B"
+    return "h" if signed else "H"
+
+
+class Layout:
+    """
+    Precompiled struct layout for a list of requested packet ids.
+
+    The format is built once so a response can be decoded with a single
+    unpack_from straight out of the receive buffer. Set stream to True for
+    the stream frame payload, where each requested packet is preceded by its
+    id byte.
+
+    Group packets are expanded, fields holds the single packet ids in the
+    order values are returned.
+    """
+
+    def __init__(self, packet_ids, stream=False):
+        self.packet_ids = tuple(packet_ids)
+        self.stream = stream
+
+        fields = []
+        id_offsets = []
+        fmt = ">"
+        offset = 0
+        for packet_id in self.packet_ids:
+            if stream:
+                id_offsets.append(offset)
+                fmt += "x"
+                offset += 1
+            for member in members(packet_id):
+                fields.append(member)
+                fmt += field_format(member)
+                offset += packets[member][1]
+
+        self.fields = tuple(fields)
+        self.index = {}
+        for i, field in enumerate(self.fields):
+            self.index[field] = i
+        self.id_offsets = tuple(id_offsets)
+
+        # Where the values that reveal a mode change are, so watching for
+        # them costs nothing for layouts without them.
+        self.mode_index = self.index.get(MODE_PACKET)
+        safety = []
+        for field, condition in safety_conditions.items():
+            if field in self.index:
+                safety.append((self.index[field],) + condition)
+        self.safety = tuple(safety)
+        self.watched = self.mode_index is not None or bool(self.safety)
+        self.format = fmt
+        self.size = offset
+
+        try:
+            self.unpack_from = struct.Struct(fmt).unpack_from
+        except AttributeError:
+            # CircuitPython's struct has no Struct class.
+            def unpack_from(buffer, offset=0):
+                return struct.unpack_from(fmt, buffer, offset)
+
+            self.unpack_from = unpack_from
+
+    def ids_match(self, buffer, offset=0):
+        """
+        Check the packet id bytes of a stream payload.
+        """
+        for packet_id, id_offset in zip(self.packet_ids, self.id_offsets):
+            if buffer[offset + id_offset] != packet_id:
+                return False
+        return True
+
+    def decode(self, buffer, offset=0):
+        """
+        Decode to a dict of single packet id to value.
+        """
+        values = {}
+        for field, value in zip(self.fields, self.unpack_from(buffer, offset)):
+            values[field] = value
+        return values
+
+    def decode_into(self, buffer, out, offset=0):
+        """
+        Decode into a preallocated flat array, one slot per entry in fields,
+        so high rate consumers avoid building a dict per response.
+        """
+        i = 0
+        for value in self.unpack_from(buffer, offset):
+            out[i] = value
+            i += 1
+        return out
+
+    def new_array(self):
+        """
+        Array sized for decode_into.
+        """
+        return array("l", [0] * len(self.fields))
+
+
+_layouts = {}
+
+
+def layout(packet_ids, stream=False):
+    """
+    Shared Layout for packet_ids, compiled the first time it is requested.
+    """
+    key = (tuple(packet_ids), stream)
+    compiled = _layouts.get(key)
+    if compiled is None:
+        compiled = _layouts[key] = Layout(key[0], stream)
+    return compiled
+
+
+def decode(packet_id, data, offset=0):
+    """
+    Decode the data bytes of a single packet, returning an int. Group packets
+    return a dict of member packet id to value.
+    """
+    compiled = layout((packet_id,))
+    if packet_id in groups:
+        return compiled.decode(data, offset)
+    return compiled.unpack_from(data, offset)[0]
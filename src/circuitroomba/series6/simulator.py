@@ -0,0 +1,404 @@
+import random
+import struct
+from . import sensors
+from .odometry import COUNTS_PER_MM, HALF_WHEEL_BASE, cliff_guarded
+from .opcode import (
+    BAUD,
+    DIGIT_LEDS_ASCII,
+    DO_STREAM,
+    DRIVE,
+    DRIVE_DIRECT,
+    DRIVE_PWM,
+    MODE_OFF,
+    MODE_PASSIVE,
+    MODE_SAFE,
+    NO_CHANGE,
+    PLAY,
+    QUERY,
+    QUERY_LIST,
+    RESET,
+    SONG,
+    STOP,
+    STREAM,
+    UNKNOWN,
+    VARIABLE,
+    baud_codes,
+    data_lengths,
+    legal_modes,
+    next_modes,
+)
+
+# In passive mode the Roomba sleeps after 5 minutes without activity.
+SLEEP_TIMEOUT = 300
+
+# Stream frames are sent every 15ms.
+STREAM_PERIOD = 0.015
+
+# Quiet period after BAUD before the new rate is used.
+BAUD_DELAY = 0.1
+
+
+class VirtualClock:
+    """
+    Monotonic clock that only moves when advanced, so the simulator can replay
+    hours of behaviour in seconds.
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class SimulatedPin:
+    """
+    BRC pin for an OpenInterface talking to a SimulatedRoomba. Level changes
+    are passed to the simulator.
+    """
+
+    def __init__(self, roomba):
+        self._roomba = roomba
+        self._value = True
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, level):
+        level = bool(level)
+        if level != self._value:
+            self._value = level
+            self._roomba._brc_changed(level)
+
+
+class SimulatedRoomba:
+    """
+    In process Roomba that follows the Open Interface spec, for load testing
+    and benchmarks without hardware.
+
+    The simulator is the peer of a LoopbackTransport, so every packet the
+    interface writes is handled as soon as it is sent. It tracks the
+    off/passive/safe/full modes with the same tables the interface uses, and
+    silently ignores commands that are illegal in the current mode, as the
+    robot does. It answers QUERY and QUERY_LIST, streams frames every 15ms,
+    honours BAUD switches, and sleeps after 5 minutes of passive idle.
+
+    Bytes sent while the two sides disagree on the baud rate are garbled and
+    dropped. Set noisy_above to a baud rate to corrupt a fraction of the
+    traffic at faster rates, like a long harness would.
+
+    Time only moves with advance(), so hours of behaviour can be replayed in
+    seconds.
+
+    >>> link = transport.LoopbackTransport()
+    >>> robot = simulator.SimulatedRoomba(link)
+    >>> bot = roomba.Commands(transport=link, brc_pin=robot.brc)
+    """
+
+    def __init__(
+        self, transport, clock=None, baud_rate=115200, noisy_above=None, noise=0.1
+    ):
+        self.transport = transport
+        transport.peer = self
+        self.clock = clock if clock is not None else VirtualClock()
+        self.brc = SimulatedPin(self)
+
+        self.baud_rate = baud_rate
+        # Above noisy_above each byte is corrupted with probability noise, as
+        # on a long harness.
+        self.noisy_above = noisy_above
+        self.noise = noise
+        self._random = random.Random(0)
+        self.mode = MODE_OFF
+        self.asleep = False
+
+        self.sensors = {}
+        for packet_id in sensors.packets:
+            self.sensors[packet_id] = 0
+        self.sensors[21] = 0
+        self.sensors[22] = 15600
+        self.sensors[23] = -180
+        self.sensors[24] = 25
+        self.sensors[25] = 2500
+        self.sensors[26] = 2696
+        self._charge = float(self.sensors[25])
+        self._right = 0
+        self._left = 0
+        self._encoders = [0.0, 0.0]
+
+        self.songs = {}
+        self.played = []
+        self.display = b"    "
+        self.commands_received = 0
+        self.commands_ignored = 0
+        self.garbled_bytes = 0
+        self.frames_sent = 0
+
+        self._rx = bytearray()
+        self._last_activity = self.clock()
+        self._hold_until = 0
+        self._stream_ids = None
+        self._streaming = False
+        self._next_frame = 0
+        self._brc_low_since = None
+        self._brc_pulses = []
+
+    def receive(self, data):
+        """
+        Called by the transport with every packet the interface writes.
+        """
+        now = self.clock()
+
+        if self.transport.baudrate != self.baud_rate or now < self._hold_until:
+            self.garbled_bytes += len(data)
+            return
+
+        if self.asleep:
+            return
+
+        if self._corrupted(len(data)):
+            self.garbled_bytes += len(data)
+            return
+
+        self._last_activity = now
+        self._rx += data
+        self._process()
+
+    def advance(self, seconds, on_step=None):
+        """
+        Move virtual time forward, sending stream frames as they fall due and
+        putting the robot to sleep when it has been idle too long. on_step is
+        called after each 15ms step so a host loop can keep up.
+        """
+        end = self.clock() + seconds
+        while self.clock() < end:
+            step = min(STREAM_PERIOD, end - self.clock())
+            self.clock.advance(step)
+            now = self.clock()
+
+            self._drain_battery(step)
+            if self.mode == MODE_SAFE:
+                self._check_safety()
+            self._turn_wheels(step)
+
+            if (
+                self.mode == MODE_PASSIVE
+                and not self.asleep
+                and now - self._last_activity >= SLEEP_TIMEOUT
+            ):
+                self.asleep = True
+                self._streaming = False
+
+            if self._streaming and now >= self._next_frame:
+                self._send(self.stream_frame(self._stream_ids))
+                self.frames_sent += 1
+                self._next_frame += STREAM_PERIOD
+
+            if on_step is not None:
+                on_step(now)
+
+    def set_sensor(self, packet_id, value):
+        self.sensors[packet_id] = value
+
+    def encode(self, packet_ids):
+        """
+        Sensor data bytes for a QUERY_LIST response.
+        """
+        data = bytearray()
+        for packet_id in packet_ids:
+            data += self._pack(packet_id)
+        return data
+
+    def stream_frame(self, packet_ids):
+        """
+        One stream frame with the current sensor values.
+        """
+        payload = bytearray()
+        for packet_id in packet_ids:
+            payload.append(packet_id)
+            payload += self._pack(packet_id)
+
+        frame = bytearray([19, len(payload)]) + payload
+        frame.append(-sum(frame) & 0xFF)
+        return frame
+
+    def _corrupted(self, size):
+        if self.noisy_above is None or self.baud_rate <= self.noisy_above:
+            return False
+        return self._random.random() > (1 - self.noise) ** size
+
+    def _send(self, data):
+        if self._corrupted(len(data)):
+            data = bytearray(data)
+            data[self._random.randrange(len(data))] ^= 0x55
+        self.transport.inject(data)
+
+    def _pack(self, packet_id):
+        fields = sensors.members(packet_id)
+        fmt = ">"
+        for member in fields:
+            fmt += sensors.field_format(member)
+        return struct.pack(fmt, *[self.sensors[member] for member in fields])
+
+    def _process(self):
+        rx = self._rx
+        while rx:
+            op = rx[0]
+            size = data_lengths[op]
+
+            if size == UNKNOWN:
+                del rx[:1]
+                continue
+
+            if size == VARIABLE:
+                if len(rx) < 2:
+                    return
+                size = self._variable_length(op, rx)
+                if size is None:
+                    return
+
+            if len(rx) < size + 1:
+                # The OI waits for the rest of the data bytes.
+                return
+
+            data = bytes(rx[1 : size + 1])
+            del rx[: size + 1]
+            self._execute(op, data)
+
+    def _variable_length(self, op, rx):
+        if op in (STREAM[0], QUERY_LIST[0]):
+            return rx[1] + 1
+        if op == SONG[0]:
+            if len(rx) < 3:
+                return None
+            return 2 * rx[2] + 2
+        return None
+
+    def _execute(self, op, data):
+        now = self.clock()
+
+        if not legal_modes[op] & (1 << self.mode):
+            self.commands_ignored += 1
+            return
+
+        self.commands_received += 1
+
+        if op == QUERY[0]:
+            self._send(self.encode(data))
+        elif op == QUERY_LIST[0]:
+            self._send(self.encode(data[1:]))
+        elif op == STREAM[0]:
+            self._stream_ids = tuple(data[1:])
+            self._streaming = True
+            self._next_frame = now + STREAM_PERIOD
+        elif op == DO_STREAM[0]:
+            self._streaming = bool(data[0]) and self._stream_ids is not None
+            self._next_frame = now + STREAM_PERIOD
+        elif op == BAUD[0]:
+            self.baud_rate = baud_codes[data[0]]
+            self._hold_until = now + BAUD_DELAY
+        elif op in (STOP[0], RESET[0]):
+            self._streaming = False
+            self._stream_ids = None
+        elif op == SONG[0]:
+            self.songs[data[0]] = data[2:]
+        elif op == PLAY[0]:
+            self.played.append((now, data[0], self.songs.get(data[0])))
+        elif op == DIGIT_LEDS_ASCII[0]:
+            self.display = data
+        elif op in (DRIVE[0], DRIVE_DIRECT[0], DRIVE_PWM[0]):
+            self._drive(op, *struct.unpack(">hh", data))
+
+        new_mode = next_modes[op]
+        if new_mode != NO_CHANGE:
+            self.mode = new_mode
+            if new_mode < MODE_SAFE:
+                # Leaving safe and full mode stops the drive wheels.
+                self._right = self._left = 0
+        self.sensors[35] = self.mode
+
+    def _drive(self, op, first, second):
+        if op == DRIVE[0]:
+            velocity, radius = first, second
+            self.sensors[39] = velocity
+            self.sensors[40] = radius
+            if radius in (0x7FFF, -0x8000):
+                right = left = velocity
+            elif radius == -1:
+                right, left = -velocity, velocity
+            elif radius == 1:
+                right, left = velocity, -velocity
+            else:
+                right = velocity * (radius + HALF_WHEEL_BASE) / radius
+                left = velocity * (radius - HALF_WHEEL_BASE) / radius
+        elif op == DRIVE_DIRECT[0]:
+            right, left = first, second
+            self.sensors[41] = right
+            self.sensors[42] = left
+        else:
+            # Roughly full speed at full PWM.
+            right, left = first * 500 / 255, second * 500 / 255
+
+        self._right = right
+        self._left = left
+
+    def _check_safety(self):
+        # Safe mode stops the motors and reverts to passive on a safety
+        # condition, see sensors.safety_conditions.
+        for packet_id, (mask, cliff) in sensors.safety_conditions.items():
+            if self.sensors[packet_id] & mask and (
+                not cliff or cliff_guarded(self._right, self._left)
+            ):
+                self.mode = MODE_PASSIVE
+                self.sensors[35] = MODE_PASSIVE
+                self._right = self._left = 0
+                return
+
+    def _turn_wheels(self, seconds):
+        if not self._right and not self._left:
+            return
+        for index, velocity, packet_id in (
+            (0, self._left, 43),
+            (1, self._right, 44),
+        ):
+            self._encoders[index] += velocity * seconds * COUNTS_PER_MM
+            counts = int(self._encoders[index]) & 0xFFFF
+            self.sensors[packet_id] = counts - 0x10000 if counts > 0x7FFF else counts
+
+    def _brc_changed(self, level):
+        now = self.clock()
+
+        if not level:
+            self._brc_low_since = now
+            # A BRC pulse wakes the robot and resets the sleep timer.
+            self.asleep = False
+            self._last_activity = now
+            return
+
+        if self._brc_low_since is None:
+            return
+
+        width = now - self._brc_low_since
+        self._brc_low_since = None
+
+        # Three 50-500ms pulses switch the robot to 19200 baud.
+        if 0.05 <= width <= 0.5:
+            self._brc_pulses.append(now)
+            self._brc_pulses = self._brc_pulses[-3:]
+            if len(self._brc_pulses) == 3 and now - self._brc_pulses[0] < 2:
+                self.baud_rate = 19200
+                self._brc_pulses = []
+        else:
+            self._brc_pulses = []
+
+    def _drain_battery(self, seconds):
+        # current is in mA and charge in mAh
+        if self.sensors[21] == 0:
+            drained = -self.sensors[23] * seconds / 3600
+            self._charge -= drained
+            self.sensors[25] = max(0, int(self._charge))
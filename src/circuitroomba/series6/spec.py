@@ -0,0 +1,172 @@
+"""
+The Open Interface command descriptions the dispatch tables in opcode are
+built from.
+
+These dicts are only needed to change or check the tables, opcode ships them
+prepacked so the runtime never builds them. Importing this module on a
+board costs RAM for every entry.
+"""
+
+from .opcode import (
+    BAUD,
+    BUTTONS,
+    CLEAN,
+    CONTROL,
+    DIGIT_LEDS_ASCII,
+    DIGIT_LEDS_RAW,
+    DO_STREAM,
+    DRIVE,
+    DRIVE_DIRECT,
+    DRIVE_PWM,
+    FORCE_SEEKING_DOCK,
+    FULL,
+    LEDS,
+    MAX_CLEAN,
+    MOTORS,
+    PLAY,
+    POWER,
+    PWM_MOTORS,
+    QUERY,
+    QUERY_LIST,
+    RESET,
+    SAFE,
+    SCHEDULE,
+    SCHEDULING_LEDS,
+    SET_DAY_TIME,
+    SONG,
+    SPOT,
+    START,
+    STOP,
+    STREAM,
+    NO_CHANGE,
+    VARIABLE,
+    data_lengths,
+    legal_modes,
+    mode_names,
+    next_modes,
+)
+
+# Commands the OI accepts in every mode once it has been started.
+started_commands = (
+    START,
+    RESET,
+    STOP,
+    BAUD,
+    CONTROL,
+    SAFE,
+    FULL,
+    CLEAN,
+    MAX_CLEAN,
+    SPOT,
+    FORCE_SEEKING_DOCK,
+    POWER,
+    SCHEDULE,
+    SET_DAY_TIME,
+    BUTTONS,
+    SONG,
+    QUERY,
+    STREAM,
+    DO_STREAM,
+    QUERY_LIST,
+)
+
+# Actuator commands, only accepted while the user has control of Roomba.
+actuator_commands = (
+    DRIVE,
+    DRIVE_DIRECT,
+    DRIVE_PWM,
+    MOTORS,
+    PWM_MOTORS,
+    PLAY,
+    LEDS,
+    SCHEDULING_LEDS,
+    DIGIT_LEDS_RAW,
+    DIGIT_LEDS_ASCII,
+)
+
+# Only SAFE and FULL have opcodes in the OI spec, because of that mode names
+# are used for keys instead of hex codes differing from commands.
+mode_commands = {
+    "passive": started_commands,
+    "safe": started_commands + actuator_commands,
+    "full": started_commands + actuator_commands,
+    "off": (START, RESET),
+}
+
+commands = {
+    START: {"int_opcode": 128, "data_bytes": 0, "new_mode": "passive"},
+    RESET: {"int_opcode": 7, "data_bytes": 0, "new_mode": "off"},
+    STOP: {"int_opcode": 173, "data_bytes": 0, "new_mode": "off"},
+    BAUD: {"int_opcode": 129, "data_bytes": 1, "new_mode": None},  # new mode noop
+    SAFE: {"int_opcode": 131, "data_bytes": 0, "new_mode": "safe"},
+    # Identical to SAFE, kept by the OI for older clients.
+    CONTROL: {"int_opcode": 130, "data_bytes": 0, "new_mode": "safe"},
+    FULL: {"int_opcode": 132, "data_bytes": 0, "new_mode": "full"},
+    CLEAN: {"int_opcode": 135, "data_bytes": 0, "new_mode": "passive"},
+    MAX_CLEAN: {"int_opcode": 136, "data_bytes": 0, "new_mode": "passive"},
+    SPOT: {"int_opcode": 134, "data_bytes": 0, "new_mode": "passive"},
+    FORCE_SEEKING_DOCK: {"int_opcode": 143, "data_bytes": 0, "new_mode": "passive"},
+    POWER: {"int_opcode": 133, "data_bytes": 0, "new_mode": "passive"},
+    SCHEDULE: {"int_opcode": 167, "data_bytes": 15, "new_mode": None},
+    SET_DAY_TIME: {"int_opcode": 168, "data_bytes": 3, "new_mode": None},
+    BUTTONS: {"int_opcode": 165, "data_bytes": 1, "new_mode": None},
+    QUERY: {"int_opcode": 142, "data_bytes": 1, "new_mode": None},
+    # data_bytes None marks a variable length command.
+    STREAM: {"int_opcode": 148, "data_bytes": None, "new_mode": None},
+    DO_STREAM: {"int_opcode": 150, "data_bytes": 1, "new_mode": None},
+    QUERY_LIST: {"int_opcode": 149, "data_bytes": None, "new_mode": None},
+    DRIVE: {"int_opcode": 137, "data_bytes": 4, "new_mode": None},
+    DRIVE_DIRECT: {"int_opcode": 145, "data_bytes": 4, "new_mode": None},
+    DRIVE_PWM: {"int_opcode": 146, "data_bytes": 4, "new_mode": None},
+    MOTORS: {"int_opcode": 138, "data_bytes": 1, "new_mode": None},
+    PWM_MOTORS: {"int_opcode": 144, "data_bytes": 3, "new_mode": None},
+    SONG: {"int_opcode": 140, "data_bytes": None, "new_mode": None},
+    PLAY: {"int_opcode": 141, "data_bytes": 1, "new_mode": None},
+    LEDS: {"int_opcode": 139, "data_bytes": 3, "new_mode": None},
+    SCHEDULING_LEDS: {"int_opcode": 162, "data_bytes": 2, "new_mode": None},
+    DIGIT_LEDS_RAW: {"int_opcode": 163, "data_bytes": 4, "new_mode": None},
+    DIGIT_LEDS_ASCII: {"int_opcode": 164, "data_bytes": 4, "new_mode": None},
+}
+
+
+def compile_tables():
+    """
+    Rebuild the dispatch tables in opcode from commands and mode_commands.
+    """
+    for code, command_struct in commands.items():
+        if command_struct["data_bytes"] is None:
+            data_lengths[code[0]] = VARIABLE
+        else:
+            data_lengths[code[0]] = command_struct["data_bytes"]
+        if command_struct["new_mode"] is None:
+            next_modes[code[0]] = NO_CHANGE
+        else:
+            next_modes[code[0]] = mode_names.index(command_struct["new_mode"])
+
+    for code in commands:
+        legal_modes[code[0]] = 0
+    for mode, codes in mode_commands.items():
+        mode_bit = 1 << mode_names.index(mode)
+        for code in codes:
+            legal_modes[code[0]] |= mode_bit
+
+
+def pack_tables():
+    """
+    Pack commands and mode_commands into the blob stored in opcode.PACKED,
+    four bytes per command: opcode, data bytes, new mode and legal mode mask.
+    """
+    packed = bytearray()
+    for code in sorted(commands):
+        command_struct = commands[code]
+        data_bytes = command_struct["data_bytes"]
+        new_mode = command_struct["new_mode"]
+        mask = 0
+        for mode, codes in mode_commands.items():
+            if code in codes:
+                mask |= 1 << mode_names.index(mode)
+        packed.append(code[0])
+        packed.append(VARIABLE if data_bytes is None else data_bytes)
+        packed.append(NO_CHANGE if new_mode is None else mode_names.index(new_mode))
+        packed.append(mask)
+    return bytes(packed)
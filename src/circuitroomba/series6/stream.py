@@ -0,0 +1,187 @@
+import time
+from . import sensors
+
+# Every stream frame starts with this byte.
+HEADER = 19
+
+# Header, n-bytes and checksum around at most 255 bytes of packet data.
+MAX_FRAME_SIZE = 258
+
+
+class StreamFrame:
+    """
+    One decoded stream frame.
+
+    values is the tuple unpacked from the frame, ordered as layout.fields.
+    Index the frame by single packet id to get a value, group packets are
+    expanded into their members.
+    """
+
+    def __init__(self, values, layout, timestamp):
+        self.values = values
+        self.layout = layout
+        self.timestamp = timestamp
+
+    def __getitem__(self, packet_id):
+        return self.values[self.layout.index[packet_id]]
+
+    def as_dict(self):
+        values = {}
+        for field, value in zip(self.layout.fields, self.values):
+            values[field] = value
+        return values
+
+    def __repr__(self):
+        return "StreamFrame(%r)" % (self.as_dict(),)
+
+
+class StreamParser:
+    """
+    Incremental parser for the frames the Roomba sends every 15ms after a
+    STREAM command:
+
+    [19][N-bytes][Packet ID 1][Packet 1 data...][Packet ID 2]...[Checksum]
+
+    Bytes can be fed in chunks of any size. The parser validates the header,
+    length, packet ids and checksum of each frame and resynchronises on the
+    next header byte after corrupt data. Memory use is bounded by a fixed
+    receive buffer of two maximum size frames.
+
+    Packet data is decoded with the precompiled sensors.Layout for the
+    requested packets. With flat set, no frame objects are created: every
+    frame is decoded into the same preallocated array (ordered as
+    layout.fields) and that array is yielded instead.
+
+    >>> parser = StreamParser([7, 25])
+    >>> for frame in parser.feed(uart.read(64)):
+    ...     print(frame[25])
+    """
+
+    def __init__(self, packet_ids, callback=None, flat=False):
+        self.packet_ids = tuple(packet_ids)
+        self.callback = callback
+        self.layout = sensors.layout(self.packet_ids, stream=True)
+        self.values = self.layout.new_array() if flat else None
+
+        # Called with the layout and values of every frame, see
+        # OpenInterface.stream_parser.
+        self.observer = None
+
+        # Packet data plus one id byte per requested packet.
+        self.frame_length = self.layout.size
+
+        if self.frame_length > MAX_FRAME_SIZE - 3:
+            raise RuntimeError(
+                "Requested packets need %s bytes per frame, the OI allows 255."
+                % self.frame_length
+            )
+
+        self._buffer = bytearray(2 * MAX_FRAME_SIZE)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+
+        self.frames = 0
+        self.checksum_errors = 0
+        self.skipped_bytes = 0
+
+    def feed(self, data):
+        """
+        Add received bytes and yield every complete frame they finish.
+        """
+        data = memoryview(data)
+        while True:
+            taken = self._append(data)
+            data = data[taken:]
+
+            frame = self._next_frame()
+            while frame is not None:
+                yield frame
+                frame = self._next_frame()
+
+            if not len(data):
+                return
+
+    def parse(self, data):
+        """
+        Feed bytes and hand each frame to the callback. Returns the number of
+        frames parsed.
+        """
+        count = 0
+        for frame in self.feed(data):
+            count += 1
+            if self.callback is not None:
+                self.callback(frame)
+        return count
+
+    def reset(self):
+        """
+        Drop any buffered partial frame.
+        """
+        self._start = 0
+        self._end = 0
+
+    def _append(self, data):
+        if self._start:
+            pending = self._end - self._start
+            self._buffer[:pending] = self._view[self._start : self._end]
+            self._start = 0
+            self._end = pending
+
+        count = min(len(data), len(self._buffer) - self._end)
+        self._buffer[self._end : self._end + count] = data[:count]
+        self._end += count
+        return count
+
+    def _next_frame(self):
+        buffer = self._buffer
+
+        while True:
+            start = buffer.find(b"\x13", self._start, self._end)
+            if start < 0:
+                self.skipped_bytes += self._end - self._start
+                self._start = self._end
+                return None
+
+            self.skipped_bytes += start - self._start
+            self._start = start
+
+            if self._end - start < 2:
+                return None
+
+            if buffer[start + 1] != self.frame_length:
+                self._skip()
+                continue
+
+            end = start + self.frame_length + 3
+            if end > self._end:
+                return None
+
+            if sum(self._view[start:end]) & 0xFF:
+                self.checksum_errors += 1
+                self._skip()
+                continue
+
+            if not self.layout.ids_match(self._buffer, start + 2):
+                self._skip()
+                continue
+
+            self._start = end
+            self.frames += 1
+
+            if self.values is not None:
+                values = frame = self.layout.decode_into(
+                    self._buffer, self.values, start + 2
+                )
+            else:
+                values = self.layout.unpack_from(self._buffer, start + 2)
+                frame = StreamFrame(values, self.layout, time.monotonic())
+
+            if self.observer is not None:
+                self.observer(self.layout, values)
+            return frame
+
+    def _skip(self):
+        # Not a frame after all, resume scanning after this header byte.
+        self._start += 1
+        self.skipped_bytes += 1
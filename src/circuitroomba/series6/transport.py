@@ -0,0 +1,195 @@
+class BusioTransport:
+    """
+    busio.UART on a CircuitPython board, or a Blinka supported host. This is
+    the default transport OpenInterface creates from its tx and rx pins.
+    """
+
+    def __init__(self, tx_pin, rx_pin, baud_rate=115200, timeout=1):
+        import busio
+
+        self._uart = busio.UART(tx_pin, rx_pin, baudrate=baud_rate, timeout=timeout)
+
+    def configure_brc(self, pin):
+        """
+        Set the digitalio.DigitalInOut wired to BRC as an output. Without one
+        there is no BRC pin.
+        """
+        if pin is None:
+            return None
+
+        import digitalio
+
+        pin.direction = digitalio.Direction.OUTPUT
+        return pin
+
+    @property
+    def baudrate(self):
+        return self._uart.baudrate
+
+    @baudrate.setter
+    def baudrate(self, rate):
+        self._uart.baudrate = rate
+
+    @property
+    def in_waiting(self):
+        return self._uart.in_waiting
+
+    def write(self, packet):
+        return self._uart.write(packet)
+
+    def readinto(self, buffer):
+        return self._uart.readinto(buffer) or 0
+
+    def reset_input_buffer(self):
+        self._uart.reset_input_buffer()
+
+    def close(self):
+        self._uart.deinit()
+
+
+class ControlLinePin:
+    """
+    Drives BRC from a serial modem control line (RTS or DTR) for USB to serial
+    cables that wire BRC to one of them. Exposes the value attribute used for
+    digitalio pins.
+    """
+
+    def __init__(self, port, line="rts"):
+        self._port = port
+        self._line = line
+
+    @property
+    def value(self):
+        return getattr(self._port, self._line)
+
+    @value.setter
+    def value(self, level):
+        setattr(self._port, self._line, level)
+
+
+class SerialTransport:
+    """
+    pyserial port, for example /dev/ttyUSB0 on a Linux host connected with a
+    USB to serial cable. Requires pyserial.
+
+    brc_line selects the modem control line ("rts" or "dtr") wired to BRC,
+    if the cable has one.
+    """
+
+    def __init__(self, port, baud_rate=115200, timeout=1, brc_line=None):
+        import serial
+
+        self._serial = serial.Serial(port, baud_rate, timeout=timeout)
+        self._brc_line = brc_line
+
+    def configure_brc(self, pin):
+        if pin is None and self._brc_line is not None:
+            return ControlLinePin(self._serial, self._brc_line)
+        return pin
+
+    @property
+    def baudrate(self):
+        return self._serial.baudrate
+
+    @baudrate.setter
+    def baudrate(self, rate):
+        self._serial.baudrate = rate
+
+    @property
+    def in_waiting(self):
+        return self._serial.in_waiting
+
+    def write(self, packet):
+        return self._serial.write(packet)
+
+    def readinto(self, buffer):
+        return self._serial.readinto(buffer) or 0
+
+    def reset_input_buffer(self):
+        self._serial.reset_input_buffer()
+
+    def fileno(self):
+        return self._serial.fileno()
+
+    def close(self):
+        self._serial.close()
+
+
+class LoopbackPin:
+    """
+    Stand in for the BRC pin on a LoopbackTransport.
+    """
+
+    def __init__(self):
+        self.value = True
+
+
+class LoopbackTransport:
+    """
+    In memory transport for tests, benchmarks and the simulator.
+
+    Bytes written by the interface are handed straight to peer.receive() as a
+    memoryview, without copying, when a peer is attached. Otherwise they are
+    collected in tx. Bytes the Roomba sends back are pushed with inject() into
+    a fixed size ring buffer that readinto() drains. Bytes that do not fit
+    are dropped and counted in overruns, like a real UART receive buffer.
+    """
+
+    def __init__(self, baud_rate=115200, size=4096):
+        self.baudrate = baud_rate
+        self.peer = None
+        self.tx = bytearray()
+        self.writes = 0
+        self.overruns = 0
+        self._rx = bytearray(size)
+        self._rx_view = memoryview(self._rx)
+        self._head = 0
+        self._count = 0
+
+    def configure_brc(self, pin):
+        return LoopbackPin() if pin is None else pin
+
+    @property
+    def in_waiting(self):
+        return self._count
+
+    def write(self, packet):
+        self.writes += 1
+        if self.peer is not None:
+            self.peer.receive(memoryview(packet))
+        else:
+            self.tx += packet
+        return len(packet)
+
+    def inject(self, data):
+        """
+        Queue bytes for the interface to read.
+        """
+        size = len(self._rx)
+        data = memoryview(data)
+        count = min(len(data), size - self._count)
+        self.overruns += len(data) - count
+
+        tail = (self._head + self._count) % size
+        first = min(count, size - tail)
+        self._rx[tail : tail + first] = data[:first]
+        self._rx[: count - first] = data[first:count]
+        self._count += count
+        return count
+
+    def readinto(self, buffer):
+        size = len(self._rx)
+        count = min(len(buffer), self._count)
+        first = min(count, size - self._head)
+        buffer[:first] = self._rx_view[self._head : self._head + first]
+        buffer[first:count] = self._rx_view[: count - first]
+        self._head = (self._head + count) % size
+        self._count -= count
+        return count
+
+    def reset_input_buffer(self):
+        self._head = 0
+        self._count = 0
+
+    def close(self):
+        self.peer = None
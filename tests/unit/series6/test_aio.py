@@ -0,0 +1,124 @@
+import asyncio
+import unittest
+from circuitroomba.series6 import aio, opcode, simulator, transport
+
+
+class Answer:
+    """
+    Peer that collects what is written and answers QUERY with reply.
+    """
+
+    def __init__(self, link, reply):
+        self.link = link
+        self.reply = reply
+        self.received = bytearray()
+        link.peer = self
+
+    def receive(self, data):
+        self.received += data
+        if data[0] == opcode.QUERY[0]:
+            self.link.inject(self.reply)
+
+
+class Test_async_commands(unittest.TestCase):
+    def setUp(self) -> None:
+        self.link = transport.LoopbackTransport()
+        self.bot = aio.AsyncCommands(transport=self.link)
+
+    def test_commands_are_awaitable(self):
+        async def run():
+            await self.bot.start()
+            await self.bot.safe()
+
+        asyncio.run(run())
+
+        self.assertEqual(self.link.tx, opcode.START + opcode.SAFE)
+        self.assertEqual(self.bot.operating_mode, "safe")
+
+    def test_illegal_command_raises(self):
+        with self.assertRaises(RuntimeError):
+            asyncio.run(self.bot.clean())
+
+    def test_sensor_read(self):
+        peer = Answer(self.link, b"\x01")
+
+        async def run():
+            await self.bot.start()
+            return await self.bot.sensors(35)
+
+        self.assertEqual(asyncio.run(run()), 1)
+        self.assertEqual(peer.received, opcode.START + opcode.QUERY + b"\x23")
+
+    def test_sensor_read_pauses_stream(self):
+        peer = Answer(self.link, b"\x01")
+
+        async def run():
+            await self.bot.start()
+            self.bot.stream_parser([7])
+            # stream bytes already received
+            self.link.inject(b"\x13\x02\x07\x00\xe4")
+            return await self.bot.sensors(35)
+
+        self.assertEqual(asyncio.run(run()), 1)
+        self.assertEqual(
+            peer.received,
+            opcode.START + b"\x96\x00" + opcode.QUERY + b"\x23\x96\x01",
+        )
+
+    def test_group_sensor_read(self):
+        Answer(self.link, b"\x00\x05\x00\x40\xff\x38")
+
+        async def run():
+            await self.bot.start()
+            return await self.bot.sensors(2)
+
+        self.assertEqual(asyncio.run(run()), {17: 0, 18: 5, 19: 64, 20: -200})
+
+    def test_sensor_read_times_out(self):
+        async def run():
+            await self.bot.start()
+            await self.bot.sensors(35, timeout=0.01)
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(run())
+
+    def test_robots_share_one_event_loop(self):
+        other_link = transport.LoopbackTransport()
+        other = aio.AsyncCommands(transport=other_link)
+
+        async def run():
+            await asyncio.gather(self.bot.start(), other.start())
+            await asyncio.gather(self.bot.baud(11), other.baud(11))
+
+        asyncio.run(run())
+
+        self.assertEqual(other_link.tx, opcode.START + opcode.BAUD + b"\x0b")
+
+    def test_wake_up_reads_back_the_mode(self):
+        link = transport.LoopbackTransport()
+        robot = simulator.SimulatedRoomba(link)
+        bot = aio.AsyncCommands(transport=link, brc_pin=robot.brc)
+
+        self.assertEqual(asyncio.run(bot.wake_up()), "passive")
+        self.assertEqual(robot.mode, opcode.MODE_PASSIVE)
+
+    def test_wake_up_without_answer_raises(self):
+        with self.assertRaises(RuntimeError):
+            asyncio.run(self.bot.wake_up(attempts=1, timeout=0.001))
+
+    def test_sync_layers_work_on_async_interface(self):
+        link = transport.LoopbackTransport()
+        robot = simulator.SimulatedRoomba(link)
+        bot = aio.AsyncCommands(transport=link)
+        stats = bot.instrument()
+
+        async def run():
+            await bot.start()
+            await bot.safe()
+
+        asyncio.run(run())
+
+        self.assertEqual(bot.query.read(35), 2)
+        self.assertEqual(robot.mode, opcode.MODE_SAFE)
+        self.assertEqual(stats.commands, 3)
+        self.assertEqual(stats.bytes_sent, 5)
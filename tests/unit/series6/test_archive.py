@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+import unittest
+from circuitroomba.series6 import archive, roomba, simulator, transport
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Test_archive(unittest.TestCase):
+    packet_ids = (7, 19, 3)
+
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "telemetry.cra")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+
+    def write(self, count, stride=16):
+        with archive.ArchiveWriter(self.path, self.packet_ids, stride) as writer:
+            for i in range(count):
+                writer.append(i * 0.5, (i % 4, 16000 + i, 1, 2000 - i, -i, 25, i, 2696))
+
+    def test_fixed_width_records(self):
+        self.write(10)
+        with archive.Archive(self.path) as telemetry:
+            self.assertEqual(len(telemetry), 10)
+            # timestamp, packets 7 and 19, then group 3 (21 to 26)
+            self.assertEqual(telemetry.record_size, 8 + 1 + 2 + 10)
+            self.assertEqual(telemetry.layout.fields, (7, 19, 21, 22, 23, 24, 25, 26))
+
+    def test_time_range(self):
+        self.write(100)
+        with archive.Archive(self.path) as telemetry:
+            records = list(telemetry.records(10, 12))
+
+            self.assertEqual([t for t, values in records], [10, 10.5, 11, 11.5])
+            self.assertEqual(records[0][1][1], 16020)
+            self.assertEqual(telemetry.span(49.6), (100, 100))
+            self.assertEqual(telemetry.span(None, 0.1), (0, 1))
+            self.assertEqual(telemetry.find(-5), 0)
+
+    def test_columns(self):
+        self.write(100)
+        with archive.Archive(self.path) as telemetry:
+            self.assertEqual(list(telemetry.column(23, 40, 42)), [-80, -81, -82, -83])
+            self.assertEqual(list(telemetry.timestamps(48.5)), [48.5, 49, 49.5])
+            with self.assertRaises(RuntimeError):
+                telemetry.column(43)
+
+    def test_reopen_and_append(self):
+        self.write(20)
+        with open(self.path, "ab") as file:
+            file.write(b"\x00\x01\x02")
+
+        with archive.ArchiveWriter(self.path, self.packet_ids) as writer:
+            self.assertEqual(writer.count, 20)
+            self.assertEqual(writer.stride, 16)
+            writer.append(10, (0, 0, 0, 0, 0, 0, 0, 0))
+            with self.assertRaises(RuntimeError):
+                writer.append(9, (0, 0, 0, 0, 0, 0, 0, 0))
+
+        with archive.Archive(self.path) as telemetry:
+            self.assertEqual(len(telemetry), 21)
+            self.assertEqual(telemetry._index_records, [0, 16])
+            self.assertEqual(telemetry.find(10), 20)
+
+        with self.assertRaises(RuntimeError):
+            archive.ArchiveWriter(self.path, (7,))
+
+    def test_missing_index(self):
+        self.write(100)
+        os.remove(self.path + archive.INDEX_SUFFIX)
+        with archive.Archive(self.path) as telemetry:
+            self.assertEqual(len(telemetry._index_records), 7)
+            self.assertEqual(telemetry.find(33), 66)
+
+    def test_index_is_rebuilt_when_appending(self):
+        self.write(100)
+        os.remove(self.path + archive.INDEX_SUFFIX)
+
+        with archive.ArchiveWriter(self.path, self.packet_ids) as writer:
+            for i in range(100, 120):
+                writer.append(i * 0.5, (0, 0, 0, 0, 0, 0, 0, 0))
+
+        with archive.Archive(self.path) as telemetry:
+            self.assertEqual(telemetry._index_records, list(range(0, 120, 16)))
+            self.assertEqual(telemetry.find(25.0), 50)
+            self.assertEqual(telemetry.find(55.0), 110)
+
+    def test_index_with_gap_falls_back_to_sampling(self):
+        self.write(100)
+        index_path = self.path + archive.INDEX_SUFFIX
+        with open(index_path, "rb") as file:
+            entries = file.read()
+        with open(index_path, "wb") as file:
+            file.write(entries[archive.INDEX_ENTRY.size :])
+
+        with archive.Archive(self.path) as telemetry:
+            self.assertEqual(telemetry._index_records, list(range(0, 100, 16)))
+            self.assertEqual(telemetry.find(25.0), 50)
+
+    def test_empty(self):
+        self.write(0)
+        with archive.Archive(self.path) as telemetry:
+            self.assertEqual(list(telemetry.records()), [])
+            self.assertEqual(len(telemetry.column(7)), 0)
+
+    def test_stream_callback(self):
+        link = transport.LoopbackTransport()
+        robot = simulator.SimulatedRoomba(link)
+        bot = roomba.Commands(transport=link)
+        bot.start()
+
+        with archive.ArchiveWriter(self.path, self.packet_ids) as writer:
+            bot.stream(self.packet_ids, writer)
+            robot.advance(0.155, lambda now: bot.tick())
+
+        with archive.Archive(self.path) as telemetry:
+            self.assertEqual(len(telemetry), 10)
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_to_numpy(self):
+        self.write(100)
+        with archive.Archive(self.path) as telemetry:
+            values = telemetry.to_numpy(10, 12)
+
+            self.assertEqual(values["timestamp"].tolist(), [10, 10.5, 11, 11.5])
+            self.assertEqual(values["current"].tolist(), [-20, -21, -22, -23])
+            self.assertEqual(len(telemetry.to_numpy(60)), 0)
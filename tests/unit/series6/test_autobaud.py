@@ -0,0 +1,134 @@
+import unittest
+from unittest import mock
+from circuitroomba.series6 import autobaud, opcode, roomba, simulator, transport
+
+
+class WrongAnswers:
+    """
+    Peer that answers every QUERY with a byte that is not an OI mode.
+    """
+
+    def __init__(self, link):
+        self.link = link
+        link.peer = self
+
+    def receive(self, data):
+        if data[0] == opcode.QUERY[0]:
+            self.link.inject(b"\xee")
+
+
+class Test_autobaud(unittest.TestCase):
+    def connect(self, **kwargs):
+        self.link = transport.LoopbackTransport()
+        self.robot = simulator.SimulatedRoomba(self.link, **kwargs)
+        self.bot = roomba.Commands(transport=self.link, brc_pin=self.robot.brc)
+        self.tuner = autobaud.AutoBaud(
+            self.bot, timeout=0.002, sleep=self.robot.advance
+        )
+
+    def test_probe_clean_link(self):
+        self.connect()
+        self.bot.start()
+
+        self.assertEqual(self.tuner.probe(), 0)
+
+    def test_probe_counts_wrong_answers(self):
+        link = transport.LoopbackTransport()
+        WrongAnswers(link)
+        bot = roomba.Commands(transport=link)
+        tuner = autobaud.AutoBaud(bot, timeout=0.002)
+        bot.start()
+
+        self.assertEqual(tuner.probe(), tuner.probes)
+        with self.assertRaises(RuntimeError):
+            tuner.detect((11,))
+
+    def test_detect_finds_robot_rate(self):
+        self.connect(baud_rate=19200)
+
+        self.assertEqual(self.tuner.detect((11, 7, 5)), 19200)
+        self.assertEqual(self.bot.operating_mode, "passive")
+        self.assertEqual(self.robot.mode, 1)
+
+    def test_detect_fails_without_answer(self):
+        self.connect(baud_rate=19200)
+
+        with self.assertRaises(RuntimeError):
+            self.tuner.detect((11, 10))
+
+    def test_negotiate_keeps_fastest_clean_rate(self):
+        self.connect()
+        self.bot.start()
+
+        self.assertEqual(self.tuner.negotiate((9, 11, 10)), 115200)
+
+    def test_negotiate_degrades_on_noisy_link(self):
+        self.connect(noisy_above=38400, noise=0.1)
+        self.bot.start()
+
+        self.assertEqual(self.tuner.negotiate((11, 10, 9, 7)), 38400)
+        self.assertEqual(self.robot.baud_rate, 38400)
+        self.assertEqual(self.link.baudrate, 38400)
+
+    def test_poll_falls_back_when_checksums_fail(self):
+        self.connect(noisy_above=57600, noise=0.05)
+        self.bot.start()
+        self.bot.safe()
+        self.bot.stream([6])
+        self.tuner.window = 50
+        received = []
+        execute = self.robot._execute
+
+        def record(op, data):
+            received.append((op, data))
+            execute(op, data)
+
+        self.robot._execute = record
+
+        rate = None
+        for i in range(100):
+            self.robot.advance(0.015)
+            list(self.bot.frames())
+            rate = self.tuner.poll() or rate
+
+        self.assertEqual(rate, 57600)
+        self.assertEqual(self.tuner.fallbacks, 1)
+        self.assertEqual(self.robot.baud_rate, 57600)
+
+        # No probe ran while the stream was sending frames.
+        do_stream = opcode.DO_STREAM[0]
+        queries = [i for i, (op, data) in enumerate(received) if op == 142]
+        paused = received.index((do_stream, b"\x00"))
+        resumed = received.index((do_stream, b"\x01"))
+        self.assertTrue(paused < queries[0] and queries[-1] < resumed)
+        self.assertTrue(self.robot._streaming)
+
+    def test_poll_fallback_keeps_full_mode(self):
+        self.connect(noisy_above=57600, noise=0.05)
+        self.bot.start()
+        self.bot.full()
+        self.bot.stream([6])
+        self.tuner.window = 50
+
+        # The robot misses the first BAUD switch, so detect() has to find it.
+        receive = self.robot.receive
+        missed = []
+
+        def lossy(data):
+            if data[0] == opcode.BAUD[0] and not missed:
+                missed.append(bytes(data))
+                return
+            receive(data)
+
+        self.link.peer = mock.Mock(receive=lossy)
+
+        for i in range(100):
+            self.robot.advance(0.015)
+            list(self.bot.frames())
+            self.tuner.poll()
+
+        self.assertEqual(len(missed), 1)
+        self.assertEqual(self.tuner.fallbacks, 1)
+        self.assertEqual(self.robot.mode, opcode.MODE_FULL)
+        self.assertEqual(self.bot.operating_mode, "full")
+        self.bot.drive(100, 0x7FFF)
@@ -0,0 +1,89 @@
+import io
+import unittest
+from circuitroomba.series6 import recorder, simulator, stream, transport
+
+try:
+    from circuitroomba.series6 import bulk
+except ImportError:
+    bulk = None
+
+
+@unittest.skipIf(bulk is None, "numpy is not installed")
+class Test_bulk_decoder(unittest.TestCase):
+    packet_ids = (7, 19, 22, 43)
+
+    def setUp(self) -> None:
+        self.robot = simulator.SimulatedRoomba(transport.LoopbackTransport())
+
+    def log(self):
+        data = bytearray()
+        for i in range(20):
+            self.robot.set_sensor(19, -i)
+            self.robot.set_sensor(22, 16000 + i)
+            frame = bytearray(self.robot.stream_frame(self.packet_ids))
+            if i == 5:
+                frame[4] ^= 0x55
+            if i == 9:
+                frame = frame[:6]
+            if i == 12:
+                # a header, length and id pattern in the middle of a frame
+                data += b"\x13\x0b\x07"
+            data += frame
+        return bytes(data)
+
+    def test_columns(self):
+        decoder = bulk.BulkDecoder(self.packet_ids)
+        values = decoder.decode(self.log())
+
+        self.assertEqual(
+            values.dtype.names,
+            ("bumps_wheel_drops", "distance", "voltage", "left_encoder_counts"),
+        )
+        self.assertEqual(values["distance"][:3].tolist(), [0, -1, -2])
+        self.assertEqual(values["voltage"][-1], 16019)
+
+    def test_matches_stream_parser(self):
+        data = self.log()
+        decoder = bulk.BulkDecoder(self.packet_ids)
+        values = decoder.decode(data)
+
+        parser = stream.StreamParser(self.packet_ids)
+        frames = list(parser.feed(data))
+
+        self.assertEqual(values.tolist(), [frame.values for frame in frames])
+        self.assertEqual(decoder.frames, parser.frames)
+        self.assertEqual(decoder.frames, 18)
+        self.assertEqual(decoder.checksum_errors, parser.checksum_errors)
+        self.assertEqual(decoder.skipped_bytes, parser.skipped_bytes)
+
+    def test_group_packets(self):
+        decoder = bulk.BulkDecoder([2])
+        values = decoder.decode(self.robot.stream_frame([2]))
+
+        self.assertEqual(len(values.dtype.names), 4)
+        self.assertEqual(len(values), 1)
+
+    def test_repeated_packets(self):
+        decoder = bulk.BulkDecoder([22, 3])
+        values = decoder.decode(self.robot.stream_frame([22, 3]))
+
+        self.assertEqual(len(values.dtype.names), 6)
+        self.assertEqual(values["voltage"][0], self.robot.sensors[22])
+        self.assertEqual(len(values), 1)
+
+    def test_short_log(self):
+        decoder = bulk.BulkDecoder(self.packet_ids)
+
+        self.assertEqual(len(decoder.decode(b"\x13\x0b")), 0)
+        self.assertEqual(decoder.skipped_bytes, 2)
+
+    def test_trace(self):
+        file = io.BytesIO()
+        with recorder.Recorder(file, background=False) as trace:
+            trace.tx(b"\x94\x04\x07\x13\x16\x2b")
+            data = self.log()
+            trace.rx(data[:30])
+            trace.rx(data[30:])
+
+        decoder = bulk.BulkDecoder(self.packet_ids)
+        self.assertEqual(len(decoder.decode_trace(file.getvalue())), 18)
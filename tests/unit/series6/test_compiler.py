@@ -0,0 +1,129 @@
+import unittest
+from circuitroomba.series6 import compiler, opcode, roomba, simulator, transport
+
+
+class Test_compiler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.link = transport.LoopbackTransport()
+        self.robot = simulator.SimulatedRoomba(self.link)
+        self.bot = roomba.Commands(transport=self.link, trace=True)
+        self.bot.start()
+        self.bot.safe()
+        self.link.peer = None
+        self.link.tx.clear()
+        self.writes = self.link.writes
+
+    def test_leds_match_spec_example(self):
+        self.bot.leds(dock=True, intensity=128)
+
+        self.assertEqual(self.link.tx, bytes([139, 4, 0, 128]))
+
+    def test_programs_are_cached(self):
+        self.assertIs(compiler.digits("ABCD"), compiler.digits("ABCD"))
+        self.assertIs(compiler.leds(spot=True), compiler.leds(spot=True))
+
+    def test_digits_are_padded(self):
+        self.bot.digit_leds_ascii("OK")
+
+        self.assertEqual(self.link.tx, b"\xa4OK  ")
+        self.assertEqual(self.bot.history[0], (None, opcode.DIGIT_LEDS_ASCII, b"OK  "))
+
+    def test_digits_reject_unprintable(self):
+        with self.assertRaises(RuntimeError):
+            compiler.digits("\x01")
+        with self.assertRaises(RuntimeError):
+            compiler.digits("HELLO")
+
+    def test_program_is_one_write(self):
+        program = compiler.Program(
+            [(opcode.LEDS, b"\x08\xff\xff"), (opcode.DIGIT_LEDS_ASCII, b"ERR ")]
+        )
+        program.send(self.bot)
+
+        self.assertEqual(self.link.writes, self.writes + 1)
+        self.assertEqual(len(program), 9)
+
+    def test_program_checks_mode(self):
+        program = compiler.leds(check_robot=True)
+        self.bot.operating_mode = "passive"
+
+        with self.assertRaises(RuntimeError):
+            program.send(self.bot)
+
+    def test_program_checks_data_length(self):
+        with self.assertRaises(RuntimeError):
+            compiler.Program([(opcode.LEDS, b"\x00")])
+
+    def test_note_names(self):
+        self.assertEqual(compiler.note_number("A4"), 69)
+        self.assertEqual(compiler.note_number("C#5"), 73)
+        self.assertEqual(compiler.note_number("Bb3"), 58)
+        self.assertEqual(compiler.note_number("R"), 0)
+        self.assertEqual(compiler.note_number(60), 60)
+
+    def test_short_melody(self):
+        melody = compiler.Melody([("C5", 0.25), ("G5", 0.5)])
+
+        self.assertEqual(len(melody.steps), 1)
+        self.assertEqual(melody.duration, 0.75)
+        self.assertEqual(
+            melody.steps[0][1].packet, bytes([140, 0, 2, 72, 16, 79, 32, 141, 0])
+        )
+
+    def test_long_melody_rotates_slots(self):
+        melody = compiler.Melody([(60 + i % 12, 0.125) for i in range(100)])
+        offsets = [offset for offset, program in melody.steps]
+        slots = [program.packet[-1] for offset, program in melody.steps]
+
+        self.assertEqual(len(melody.steps), 7)
+        self.assertEqual(offsets, [0, 2, 4, 6, 8, 10, 12])
+        self.assertEqual(slots, [0, 1, 2, 3, 0, 1, 2])
+        # the second step reloads slot 0 with the fifth chunk
+        self.assertEqual(melody.steps[1][1].packet[:3], bytes([140, 0, 16]))
+
+    def test_melody_plays_on_simulator(self):
+        self.link.peer = self.robot
+        notes = [(60 + i % 12, 0.125) for i in range(40)]
+        melody = compiler.Melody(notes)
+        sleeps = []
+
+        melody.play(self.bot, sleeps.append)
+
+        self.assertEqual(sleeps, [2, 2])
+        self.assertEqual([slot for t, slot, song in self.robot.played], [0, 1, 2])
+        self.assertEqual(len(self.robot.played[2][2]), 16)
+
+    def test_playback_polls(self):
+        melody = compiler.Melody([(60, 0.25)] * 20)
+
+        playback = melody.start(self.bot, now=0)
+        self.assertTrue(playback.poll(1))
+        self.assertFalse(playback.poll(4))
+        self.assertEqual(self.link.tx[-2:], bytes([141, 1]))
+
+    def test_song_does_not_block(self):
+        playback = self.bot.song([(60, 0.25)] * 20)
+
+        self.assertTrue(playback.playing)
+        self.assertEqual(self.link.tx[-2:], bytes([141, 0]))
+        self.assertFalse(playback.poll(playback.started + 4))
+        self.assertEqual(self.link.tx[-2:], bytes([141, 1]))
+
+    def test_song_needs_safe_or_full(self):
+        self.bot.start()
+
+        with self.assertRaises(RuntimeError):
+            self.bot.song([(60, 0.25)])
+
+    def test_program_follows_pending_setpoint(self):
+        self.bot.baud_rate = 300
+        stats = self.bot.instrument()
+        self.bot.drive(100, 0x7FFF)
+        self.bot.drive(200, 0x7FFF, latest=True)
+        self.bot.leds(dock=True)
+
+        self.assertEqual(
+            self.link.tx,
+            bytes([137, 0, 100, 127, 255, 137, 0, 200, 127, 255, 139, 4, 0, 0]),
+        )
+        self.assertEqual(stats.commands, 2)
@@ -0,0 +1,65 @@
+import unittest
+from circuitroomba.series6 import fleet, opcode, roomba, simulator, transport
+
+
+class Test_fleet(unittest.TestCase):
+    def setUp(self) -> None:
+        self.links = []
+        self.robots = []
+        bots = []
+        for i in range(3):
+            link = transport.LoopbackTransport()
+            robot = simulator.SimulatedRoomba(link)
+            self.links.append(link)
+            self.robots.append(robot)
+            bots.append(roomba.Commands(transport=link, brc_pin=robot.brc))
+        self.fleet = fleet.Fleet(bots)
+
+    def advance(self, seconds):
+        for robot in self.robots:
+            robot.advance(seconds)
+
+    def test_broadcast_reaches_every_robot(self):
+        self.fleet.broadcast(opcode.START)
+        skipped = self.fleet.broadcast(opcode.SAFE)
+
+        self.assertEqual(skipped, [])
+        self.assertEqual([robot.mode for robot in self.robots], [2, 2, 2])
+        self.assertEqual([bot.operating_mode for bot in self.fleet], ["safe"] * 3)
+
+    def test_broadcast_skips_robots_in_illegal_mode(self):
+        self.fleet[1].start()
+
+        skipped = self.fleet.broadcast(opcode.FORCE_SEEKING_DOCK)
+
+        self.assertEqual(skipped, [self.fleet[0], self.fleet[2]])
+        self.assertEqual(self.robots[1].commands_received, 2)
+
+    def test_broadcast_checks_data_once(self):
+        self.fleet.broadcast(opcode.START)
+
+        with self.assertRaises(RuntimeError):
+            self.fleet.broadcast(opcode.QUERY, b"\x07\x08")
+
+    def test_broadcast_uses_send_queue(self):
+        queue = self.fleet[1].send_queue
+        self.fleet.broadcast(opcode.START)
+        self.fleet.broadcast(opcode.SAFE)
+
+        self.assertEqual(queue.sent, 2)
+        self.assertEqual([robot.mode for robot in self.robots], [2, 2, 2])
+
+    def test_merged_feed(self):
+        received = []
+        self.fleet.broadcast(opcode.START)
+        self.fleet.stream([7, 25], lambda index, frame: received.append(index))
+
+        self.advance(0.155)
+        self.fleet.poll()
+
+        self.assertEqual(len(received), 30)
+        self.assertEqual(sorted(set(received)), [0, 1, 2])
+        self.assertEqual(self.fleet.frames, 30)
+
+    def test_feed_without_streams_is_empty(self):
+        self.assertEqual(list(self.fleet.feed(0.01)), [])
@@ -0,0 +1,47 @@
+import unittest
+from circuitroomba.series6 import history, opcode
+
+
+class Test_command_history(unittest.TestCase):
+    def test_newest_entry_is_first(self):
+        trace = history.CommandHistory(3)
+        trace.append(128, opcode.MODE_PASSIVE, b"\x80", 1)
+        trace.append(129, opcode.NO_CHANGE, b"\x81\x0b", 2)
+
+        self.assertEqual(trace[0], (None, opcode.BAUD, b"\x0b"))
+        self.assertEqual(trace[1], ("passive", opcode.START, b""))
+        self.assertEqual(len(trace), 2)
+
+    def test_oldest_entries_are_overwritten(self):
+        trace = history.CommandHistory(3)
+        for i in range(5):
+            trace.append(129, opcode.NO_CHANGE, bytes([129, i]), 2)
+
+        self.assertEqual(len(trace), 3)
+        self.assertEqual([trace[i][2] for i in range(3)], [b"\x04", b"\x03", b"\x02"])
+
+        with self.assertRaises(IndexError):
+            trace[3]
+
+    def test_snapshot_is_ordered_oldest_to_newest(self):
+        trace = history.CommandHistory(2)
+        trace.append(128, opcode.MODE_PASSIVE, b"\x80", 1)
+        trace.append(131, opcode.MODE_SAFE, b"\x83", 1)
+        trace.append(132, opcode.MODE_FULL, b"\x84", 1)
+
+        snapshot = trace.snapshot()
+
+        self.assertEqual(
+            [entry[1:] for entry in snapshot],
+            [
+                (131, "safe", b""),
+                (132, "full", b""),
+            ],
+        )
+        self.assertLessEqual(snapshot[0][0], snapshot[1][0])
+
+    def test_long_data_is_truncated(self):
+        trace = history.CommandHistory(1, data_width=2)
+        trace.append(140, opcode.NO_CHANGE, b"\x8c\x00\x01\x40\x20", 5)
+
+        self.assertEqual(trace[0][2], b"\x00\x01")
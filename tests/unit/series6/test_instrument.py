@@ -0,0 +1,101 @@
+import unittest
+from circuitroomba.series6 import instrument, roomba, simulator, transport
+
+
+class Test_histogram(unittest.TestCase):
+    def test_percentiles(self):
+        histogram = instrument.Histogram()
+        for i in range(99):
+            histogram.record(0.000010)
+        histogram.record(0.005)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.percentile(0.5), 16 / 1000000)
+        self.assertEqual(histogram.percentile(0.99), 16 / 1000000)
+        self.assertEqual(histogram.percentile(1), 8192 / 1000000)
+        self.assertEqual(histogram.max, 0.005)
+
+    def test_long_durations_fall_in_last_bucket(self):
+        histogram = instrument.Histogram()
+        histogram.record(60)
+
+        self.assertEqual(histogram.counts[-1], 1)
+
+    def test_empty(self):
+        self.assertEqual(instrument.Histogram().snapshot()["p99"], 0.0)
+
+
+class Test_instruments(unittest.TestCase):
+    def setUp(self) -> None:
+        self.link = transport.LoopbackTransport()
+        self.robot = simulator.SimulatedRoomba(self.link)
+        self.bot = roomba.Commands(transport=self.link)
+
+    def test_disabled_by_default(self):
+        self.bot.start()
+
+        self.assertIsNone(self.bot._instruments)
+        self.assertIsNone(self.bot.instrument(False))
+
+    def test_command_path(self):
+        stats = self.bot.instrument()
+        self.bot.start()
+        self.bot.safe()
+        self.bot.drive(100, 0x7FFF)
+
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["commands"], 3)
+        self.assertEqual(snapshot["bytes_sent"], 7)
+        self.assertEqual(snapshot["validate"]["count"], 3)
+        self.assertEqual(snapshot["write"]["count"], 3)
+        self.assertGreater(snapshot["write"]["p99"], 0)
+        self.assertEqual(self.robot.mode, 2)
+
+    def test_queued_commands(self):
+        stats = self.bot.instrument()
+        self.bot.send_queue
+        self.bot.start()
+
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["enqueue"]["count"], 1)
+        self.assertEqual(snapshot["queued"], 0)
+
+    def test_sensor_paths(self):
+        stats = self.bot.instrument()
+        self.bot.start()
+        self.bot.sensors(7)
+        self.bot.stream([7, 25])
+        self.robot.advance(0.155)
+        frames = list(self.bot.frames())
+
+        snapshot = stats.snapshot()
+        self.assertEqual(len(frames), 10)
+        self.assertEqual(snapshot["decode"]["count"], 10)
+        self.assertEqual(snapshot["frames"], 10)
+        self.assertEqual(snapshot["checksum_errors"], 0)
+        self.assertEqual(snapshot["response"]["count"], 1)
+        self.assertEqual(snapshot["bytes_received"], 1 + 10 * 8)
+
+    def test_frames_dropped(self):
+        stats = self.bot.instrument()
+        self.link.peer = None
+        self.bot.stream_parser([7, 25])
+        frame = self.robot.stream_frame([7, 25])
+        corrupt = bytearray(frame)
+        corrupt[3] ^= 0xFF
+
+        self.link.inject(frame + corrupt + frame + frame[3:] + frame)
+        frames = list(self.bot.frames())
+
+        snapshot = stats.snapshot()
+        self.assertEqual(len(frames), 3)
+        self.assertEqual(snapshot["checksum_errors"], 1)
+        self.assertEqual(snapshot["frames_dropped"], 2)
+
+    def test_reset(self):
+        stats = self.bot.instrument()
+        self.bot.start()
+        stats.reset()
+
+        self.assertEqual(stats.snapshot()["commands"], 0)
+        self.assertEqual(stats.write.count, 0)
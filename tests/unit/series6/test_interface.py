@@ -1,6 +1,19 @@
+import time
 import unittest
 from unittest import mock
-from circuitroomba.series6 import interface, opcode
+from circuitroomba.series6 import interface, opcode, transport
+
+
+class BlockingTransport(transport.LoopbackTransport):
+    """
+    Loopback whose reads block for a second when nothing is waiting, like a
+    UART opened with timeout=1.
+    """
+
+    def readinto(self, buffer):
+        if not self.in_waiting:
+            time.sleep(1)
+        return super().readinto(buffer)
 
 
 class Test_interface(unittest.TestCase):
@@ -10,72 +23,38 @@ class Test_interface(unittest.TestCase):
     """
 
     def setUp(self) -> None:
-        self.board = mock.MagicMock()
-
-    @mock.patch("circuitroomba.series6.interface.busio", return_value=mock.MagicMock())
-    @mock.patch(
-        "circuitroomba.series6.interface.busio.UART", return_value=mock.MagicMock()
-    )
-    def test_history_not_available_by_default(self, uart, busio):
-        oi = interface.OpenInterface(self.board.RX, self.board.TX, self.board.A1)
+        self.transport = transport.LoopbackTransport()
+
+    def test_history_not_available_by_default(self):
+        oi = interface.OpenInterface(transport=self.transport)
         self.assertEqual(False, oi.trace)
         self.assertEqual(False, hasattr(oi, "history"))
 
-    @mock.patch("circuitroomba.series6.interface.busio", return_value=mock.MagicMock())
-    @mock.patch(
-        "circuitroomba.series6.interface.busio.UART", return_value=mock.MagicMock()
-    )
-    def test_valid_modes_return_only_valid_modes(self, uart, busio):
-        oi = interface.OpenInterface(
-            self.board.RX, self.board.TX, self.board.A1, trace=True
-        )
+    def test_valid_modes_return_only_valid_modes(self):
+        oi = interface.OpenInterface(transport=self.transport, trace=True)
 
         self.assertEqual(oi.valid_modes, ("off", "safe", "passive", "full"))
 
-    @mock.patch("circuitroomba.series6.interface.busio", return_value=mock.MagicMock())
-    @mock.patch(
-        "circuitroomba.series6.interface.busio.UART", return_value=mock.MagicMock()
-    )
-    def test_change_operating_mode(self, uart, busio):
-        oi = interface.OpenInterface(
-            self.board.RX, self.board.TX, self.board.A1, trace=True
-        )
+    def test_change_operating_mode(self):
+        oi = interface.OpenInterface(transport=self.transport, trace=True)
 
         oi.operating_mode = "safe"
         self.assertEqual(oi.operating_mode, "safe")
 
-    @mock.patch("circuitroomba.series6.interface.busio", return_value=mock.MagicMock())
-    @mock.patch(
-        "circuitroomba.series6.interface.busio.UART", return_value=mock.MagicMock()
-    )
-    def test_invalid_operating_mode(self, uart, busio):
-        oi = interface.OpenInterface(
-            self.board.RX, self.board.TX, self.board.A1, trace=True
-        )
+    def test_invalid_operating_mode(self):
+        oi = interface.OpenInterface(transport=self.transport, trace=True)
 
         with self.assertRaises(RuntimeError):
             oi.operating_mode = "kernel"
 
-    @mock.patch("circuitroomba.series6.interface.busio", return_value=mock.MagicMock())
-    @mock.patch(
-        "circuitroomba.series6.interface.busio.UART", return_value=mock.MagicMock()
-    )
-    def test_send_new_command(self, uart, busio):
-        oi = interface.OpenInterface(
-            self.board.RX, self.board.TX, self.board.A1, trace=True
-        )
+    def test_send_new_command(self):
+        oi = interface.OpenInterface(transport=self.transport, trace=True)
 
         oi.command(opcode.START)
         self.assertEqual(oi.history[0][1], opcode.START)
 
-    @mock.patch("circuitroomba.series6.interface.busio", return_value=mock.MagicMock())
-    @mock.patch(
-        "circuitroomba.series6.interface.busio.UART", return_value=mock.MagicMock()
-    )
-    def test_history_cannot_exceed_10(self, uart, busio):
-        oi = interface.OpenInterface(
-            self.board.RX, self.board.TX, self.board.A1, trace=True
-        )
+    def test_history_cannot_exceed_10(self):
+        oi = interface.OpenInterface(transport=self.transport, trace=True)
 
         for i in range(15):
             oi.command(opcode.START)
@@ -83,65 +62,180 @@ class Test_interface(unittest.TestCase):
         self.assertEqual(len(oi.history), 10)
 
         for i in range(9):
-            self.assertEqual(oi.history[i], ("passive", opcode.START, b"\x00"))
+            self.assertEqual(oi.history[i], ("passive", opcode.START, b""))
 
-    @mock.patch("circuitroomba.series6.interface.busio", return_value=mock.MagicMock())
-    @mock.patch(
-        "circuitroomba.series6.interface.busio.UART", return_value=mock.MagicMock()
-    )
-    def test_send_invalid_command(self, uart, busio):
-        oi = interface.OpenInterface(
-            self.board.RX, self.board.TX, self.board.A1, trace=True
-        )
+    def test_send_invalid_command(self):
+        oi = interface.OpenInterface(transport=self.transport, trace=True)
 
         with self.assertRaises(KeyError):
             oi.command("0x10")
 
-    @mock.patch("circuitroomba.series6.interface.busio", return_value=mock.MagicMock())
-    @mock.patch(
-        "circuitroomba.series6.interface.busio.UART", return_value=mock.MagicMock()
-    )
-    def test_send_invalid_command_for_current_operating_mode(self, uart, busio):
-        oi = interface.OpenInterface(
-            self.board.RX, self.board.TX, self.board.A1, trace=True
-        )
+    def test_send_invalid_command_for_current_operating_mode(self):
+        oi = interface.OpenInterface(transport=self.transport, trace=True)
 
         with self.assertRaises(RuntimeError):
             oi.command(opcode.STOP)
             oi.command(opcode.BAUD, 11)
 
-    @mock.patch("circuitroomba.series6.interface.busio", return_value=mock.MagicMock())
-    @mock.patch(
-        "circuitroomba.series6.interface.busio.UART", return_value=mock.MagicMock()
-    )
-    def test_send_new_command_with_data(self, uart, busio):
-        oi = interface.OpenInterface(
-            self.board.RX, self.board.TX, self.board.A1, trace=True
-        )
-        oi.wake_up()
+    def test_send_new_command_with_data(self):
+        oi = interface.OpenInterface(transport=self.transport, trace=True)
         oi.command(opcode.START)
         oi.command(opcode.BAUD, 11)
-        self.assertEqual(oi.history[1], ("passive", opcode.START, b"\x00"))
+        self.assertEqual(oi.history[1], ("passive", opcode.START, b""))
         self.assertEqual(oi.history[0], (None, opcode.BAUD, b"\x0b"))
 
-    @mock.patch("circuitroomba.series6.interface.busio", return_value=mock.MagicMock())
-    @mock.patch(
-        "circuitroomba.series6.interface.busio.UART", return_value=mock.MagicMock()
-    )
-    def test_send_new_command_with_invalid_data(self, uart, busio):
-        oi = interface.OpenInterface(
-            self.board.RX, self.board.TX, self.board.A1, trace=True
-        )
+    def test_send_new_command_with_invalid_data(self):
+        oi = interface.OpenInterface(transport=self.transport, trace=True)
 
         with self.assertRaises(RuntimeError):
             oi.command(opcode.RESET, 11)
 
-    @mock.patch("circuitroomba.series6.interface.busio", return_value=mock.MagicMock())
-    @mock.patch(
-        "circuitroomba.series6.interface.busio.UART", return_value=mock.MagicMock()
-    )
-    def test_keep_awake_is_not_available(self, uart, busio):
-        oi = interface.OpenInterface(self.board.RX, self.board.TX, self.board.A1)
+    def test_keep_awake_is_driven_by_tick_without_event_loop(self):
+        oi = interface.OpenInterface(transport=self.transport)
+        keeper = oi.keep_awake(duty_cycle=60)
+        now = oi._last_write
+
+        oi.tick(now + 61)
+        self.assertEqual(keeper.pulses, 1)
+        self.assertEqual(oi._brc_pin.value, False)
+
+        oi.tick(now + 62)
+        self.assertEqual(oi._brc_pin.value, True)
+
+    def test_command_is_sent_in_a_single_write(self):
+        oi = interface.OpenInterface(transport=self.transport)
+        oi.command(opcode.START)
+        oi.command(opcode.BAUD, 11)
+
+        self.assertEqual(self.transport.writes, 2)
+        self.assertEqual(self.transport.tx, opcode.START + opcode.BAUD + b"\x0b")
+
+    def test_nothing_is_written_when_data_is_invalid(self):
+        oi = interface.OpenInterface(transport=self.transport)
+        oi.command(opcode.START)
+
+        with self.assertRaises(RuntimeError):
+            oi.command(opcode.BAUD)
+
+        self.assertEqual(self.transport.writes, 1)
+
+    def test_command_many_sends_one_packet(self):
+        oi = interface.OpenInterface(transport=self.transport, trace=True)
+        oi.command_many([opcode.START, opcode.SAFE, opcode.CLEAN])
+
+        self.assertEqual(self.transport.writes, 1)
+        self.assertEqual(self.transport.tx, opcode.START + opcode.SAFE + opcode.CLEAN)
+        self.assertEqual(oi.operating_mode, "passive")
+        self.assertEqual(oi.history[0], ("passive", opcode.CLEAN, b""))
+        self.assertEqual(oi.history[1], ("safe", opcode.SAFE, b""))
+
+    def test_command_many_rejects_illegal_sequence_before_writing(self):
+        oi = interface.OpenInterface(transport=self.transport)
 
-        with self.assertRaises(NotImplementedError):
-            oi.keep_awake()
+        with self.assertRaises(RuntimeError):
+            oi.command_many([opcode.START, opcode.STOP, opcode.SAFE])
+
+        self.assertEqual(self.transport.writes, 0)
+        self.assertEqual(oi.operating_mode, "off")
+
+    def test_batch_context_sends_on_exit(self):
+        oi = interface.OpenInterface(transport=self.transport)
+        with oi.batch():
+            oi.command(opcode.START)
+            oi.command(opcode.FULL)
+            self.assertEqual(self.transport.writes, 0)
+
+        self.assertEqual(self.transport.writes, 1)
+        self.assertEqual(self.transport.tx, opcode.START + opcode.FULL)
+        self.assertEqual(oi.operating_mode, "full")
+
+    def test_batch_rejects_baud(self):
+        oi = interface.OpenInterface(transport=self.transport)
+
+        with self.assertRaises(RuntimeError):
+            oi.command_many([opcode.START, (opcode.BAUD, 11)])
+
+        self.assertEqual(self.transport.writes, 0)
+
+    def test_send_integer_opcode(self):
+        oi = interface.OpenInterface(transport=self.transport)
+
+        oi.command(128)
+        oi.command(131)
+
+        self.assertEqual(oi.operating_mode, "safe")
+
+    def test_history_depth_is_configurable(self):
+        oi = interface.OpenInterface(
+            transport=self.transport, trace=True, trace_depth=3
+        )
+
+        oi.command_many([opcode.START, opcode.SAFE, opcode.FULL, opcode.CLEAN])
+
+        self.assertEqual(len(oi.history), 3)
+        self.assertEqual(oi.history[2], ("safe", opcode.SAFE, b""))
+
+    def test_setpoint_is_sent_when_idle(self):
+        oi = interface.OpenInterface(transport=self.transport)
+        oi.operating_mode = "safe"
+
+        oi.setpoint(opcode.DRIVE, b"\x00\xc8\x7f\xff")
+
+        self.assertEqual(self.transport.tx, b"\x89\x00\xc8\x7f\xff")
+
+    def test_newer_setpoint_replaces_pending(self):
+        oi = interface.OpenInterface(transport=self.transport, baud_rate=300)
+        oi.command_many([opcode.START, opcode.SAFE])
+
+        oi.setpoint(opcode.DRIVE, b"\x00\x01\x7f\xff")
+        oi.setpoint(opcode.DRIVE, b"\x00\x02\x7f\xff")
+        oi.setpoint(opcode.DRIVE, b"\x00\x03\x7f\xff")
+        self.assertEqual(self.transport.tx, bytes([128, 131]))
+
+        oi.tick(oi._tx_idle_at)
+
+        self.assertEqual(self.transport.tx, b"\x80\x83\x89\x00\x03\x7f\xff")
+        self.assertEqual(oi.setpoints_dropped, 2)
+
+    def test_setpoint_dropped_after_mode_change(self):
+        oi = interface.OpenInterface(transport=self.transport, baud_rate=300)
+        oi.command_many([opcode.START, opcode.SAFE])
+
+        oi.setpoint(opcode.DRIVE, b"\x00\x01\x7f\xff")
+        oi.operating_mode = "passive"
+        oi.tick(oi._tx_idle_at)
+
+        self.assertEqual(self.transport.tx, bytes([128, 131]))
+        self.assertEqual(oi.setpoints_dropped, 1)
+
+    def test_state_uses_slots(self):
+        oi = interface.OpenInterface(transport=self.transport)
+
+        self.assertFalse(hasattr(oi, "__dict__"))
+        with self.assertRaises(AttributeError):
+            oi.mode = "safe"
+
+    def test_read_sleeps_while_waiting(self):
+        oi = interface.OpenInterface(transport=self.transport)
+        sleeps = []
+        real_sleep = time.sleep
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            real_sleep(seconds)
+
+        with mock.patch.object(interface.time, "sleep", sleep):
+            with self.assertRaises(RuntimeError):
+                oi._read_into(bytearray(1), 0.05)
+
+        self.assertEqual(sleeps[0], 0)
+        self.assertLess(len(sleeps), 100)
+        self.assertLessEqual(max(sleeps), interface.READ_BACKOFF)
+
+    def test_read_timeout_is_kept_on_blocking_transport(self):
+        oi = interface.OpenInterface(transport=BlockingTransport())
+        started = time.monotonic()
+
+        with self.assertRaises(RuntimeError):
+            oi.wake_up(attempts=1, sleep=lambda seconds: None)
+        self.assertLess(time.monotonic() - started, 0.5)
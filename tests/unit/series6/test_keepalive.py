@@ -0,0 +1,74 @@
+import asyncio
+import unittest
+from unittest import mock
+from circuitroomba.series6 import interface, keepalive, opcode, transport
+
+
+class Test_keep_awake(unittest.TestCase):
+    def setUp(self) -> None:
+        self.interface = mock.MagicMock()
+        self.interface._last_write = 0
+
+    def test_pulse_is_low_for_pulse_width(self):
+        keeper = keepalive.KeepAwake(self.interface, duty_cycle=60, pulse_width=1)
+        keeper._last_pulse = 0
+
+        self.assertEqual(keeper.poll(30), 30)
+        self.assertEqual(keeper.poll(60), 1)
+        self.assertEqual(self.interface._brc_pin.value, False)
+
+        self.assertEqual(keeper.poll(60.5), 0.5)
+        self.assertEqual(keeper.poll(61), 60)
+        self.assertEqual(self.interface._brc_pin.value, True)
+        self.assertEqual(keeper.pulses, 1)
+
+    def test_uart_traffic_skips_pulses(self):
+        keeper = keepalive.KeepAwake(self.interface, duty_cycle=60)
+        keeper._last_pulse = 0
+        self.interface._last_write = 50
+
+        self.assertEqual(keeper.poll(60), 50)
+        self.assertEqual(keeper.pulses, 0)
+
+    def test_baud_change_pulse_widths_are_rejected(self):
+        with self.assertRaises(RuntimeError):
+            keepalive.KeepAwake(self.interface, pulse_width=0.25)
+
+    def test_runs_as_asyncio_task(self):
+        keeper = keepalive.KeepAwake(self.interface, duty_cycle=0.01, pulse_width=0.01)
+        self.interface._last_write = keeper._last_pulse
+
+        async def idle():
+            keeper.start()
+            await asyncio.sleep(0.1)
+            keeper.stop()
+
+        asyncio.run(idle())
+
+        self.assertGreater(keeper.pulses, 0)
+        self.assertEqual(self.interface._brc_pin.value, True)
+
+    def test_start_is_sent_without_brc_pin(self):
+        link = transport.LoopbackTransport()
+        oi = interface.OpenInterface(transport=link)
+        oi._brc_pin = None
+        keeper = keepalive.KeepAwake(oi, duty_cycle=60)
+        keeper._last_pulse = 0
+        oi._last_write = 0
+
+        self.assertEqual(keeper.poll(60), 60)
+        self.assertEqual(link.tx, b"")
+
+        oi.command(opcode.START)
+        oi._last_write = 0
+        self.assertEqual(keeper.poll(120), 60)
+        self.assertEqual(link.tx, opcode.START + opcode.START)
+        self.assertEqual(keeper.pulses, 2)
+        self.assertEqual(oi.operating_mode, "passive")
+
+    def test_brc_baud_change_needs_pin(self):
+        oi = interface.OpenInterface(transport=transport.LoopbackTransport())
+        oi._brc_pin = None
+
+        with self.assertRaises(RuntimeError):
+            oi._brc_set_baud_rate()
@@ -0,0 +1,96 @@
+import math
+import unittest
+from circuitroomba.series6 import odometry, roomba, simulator, transport
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Test_encoder_delta(unittest.TestCase):
+    def test_forward_wrap(self):
+        self.assertEqual(odometry.encoder_delta(-32768 + 5, 32767 - 4), 10)
+
+    def test_backward_wrap(self):
+        self.assertEqual(odometry.encoder_delta(32767 - 4, -32768 + 5), -10)
+
+    def test_unsigned_counts(self):
+        self.assertEqual(odometry.encoder_delta(3, 65530), 9)
+
+
+class Test_pose_estimator(unittest.TestCase):
+    def test_first_reading_sets_reference(self):
+        pose = odometry.PoseEstimator()
+        pose.update(1000, -2000)
+
+        self.assertEqual((pose.x, pose.y, pose.heading), (0.0, 0.0, 0.0))
+
+    def test_straight_across_wrap(self):
+        pose = odometry.PoseEstimator()
+        counts = round(100 * odometry.COUNTS_PER_MM)
+        pose.update(32767 - 10, 32767 - 10)
+        pose.update(-32768 + counts - 11, -32768 + counts - 11)
+
+        self.assertAlmostEqual(pose.x, 100, delta=0.5)
+        self.assertAlmostEqual(pose.y, 0)
+        self.assertAlmostEqual(pose.heading, 0)
+
+    def test_turn_in_place(self):
+        pose = odometry.PoseEstimator()
+        quarter = math.pi / 2 * odometry.HALF_WHEEL_BASE * odometry.COUNTS_PER_MM
+        pose.update(0, 0)
+        for i in range(1, 11):
+            step = round(quarter * i / 10)
+            pose.update(-step, step)
+
+        self.assertAlmostEqual(pose.heading, math.pi / 2, places=2)
+        self.assertAlmostEqual(pose.x, 0)
+        self.assertEqual(pose.updates, 10)
+
+    def test_heading_wraps(self):
+        pose = odometry.PoseEstimator(heading=math.pi - 0.01)
+        pose.update(0, 0)
+        pose.update(-50, 50)
+
+        self.assertLess(pose.heading, 0)
+
+    def test_stream_callback(self):
+        link = transport.LoopbackTransport()
+        robot = simulator.SimulatedRoomba(link)
+        bot = roomba.Commands(transport=link)
+        pose = odometry.PoseEstimator()
+
+        bot.start()
+        bot.safe()
+        bot.stream([43, 44], pose)
+        bot.drive(200)
+        robot.advance(1.005, lambda now: bot.tick())
+
+        self.assertAlmostEqual(pose.x, 200, delta=10)
+        self.assertAlmostEqual(pose.y, 0)
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class Test_batch(unittest.TestCase):
+    def test_matches_incremental(self):
+        left = [(i * 37) % 65536 - 32768 for i in range(0, 3000)]
+        right = [(i * 41) % 65536 - 32768 for i in range(0, 3000)]
+
+        incremental = odometry.PoseEstimator()
+        for pair in zip(left, right):
+            incremental.update(*pair)
+
+        batch = odometry.PoseEstimator()
+        x, y, heading = batch.batch(left[:1000], right[:1000])
+        x, y, heading = batch.batch(left[1000:], right[1000:])
+
+        self.assertEqual(len(x), 2000)
+        self.assertAlmostEqual(batch.x, incremental.x, places=6)
+        self.assertAlmostEqual(batch.y, incremental.y, places=6)
+        self.assertAlmostEqual(batch.heading, incremental.heading, places=9)
+        self.assertEqual(batch.updates, incremental.updates)
+
+    def test_mismatched_lengths(self):
+        with self.assertRaises(RuntimeError):
+            odometry.PoseEstimator().batch([1, 2], [1])
@@ -1,5 +1,5 @@
 import unittest
-from circuitroomba.series6 import opcode
+from circuitroomba.series6 import opcode, spec
 
 
 class Test_opcode_are_set_correct(unittest.TestCase):
@@ -91,3 +91,64 @@ class Test_opcode_are_set_correct(unittest.TestCase):
 
     def test_stop(self):
         self.assertEqual(opcode.STOP, bytes([173]))
+
+
+class Test_compiled_tables(unittest.TestCase):
+    """
+    The dispatch tables are packed from the commands and mode_commands in spec
+    and must agree with them.
+    """
+
+    def test_packed_tables_match_spec(self):
+        self.assertEqual(opcode.PACKED, spec.pack_tables())
+
+    def test_commands_match_spec(self):
+        self.assertEqual(dict(opcode.commands.items()), spec.commands)
+        self.assertEqual(opcode.commands[opcode.STREAM]["data_bytes"], None)
+        self.assertNotIn(b"\x10", opcode.commands)
+
+    def test_mode_commands_match_spec(self):
+        self.assertEqual(set(opcode.mode_commands), set(spec.mode_commands))
+        for mode, codes in spec.mode_commands.items():
+            self.assertEqual(sorted(opcode.mode_commands[mode]), sorted(codes))
+
+    def test_tables_import_without_module_getattr(self):
+        from circuitroomba.series6.opcode import commands, mode_commands
+
+        self.assertIn(opcode.START, commands)
+        self.assertEqual(mode_commands["off"], (opcode.RESET, opcode.START))
+        self.assertFalse(hasattr(opcode, "__getattr__"))
+
+    def test_data_lengths_match_commands(self):
+        for code, command_struct in spec.commands.items():
+            if command_struct["data_bytes"] is None:
+                self.assertEqual(opcode.data_lengths[code[0]], opcode.VARIABLE)
+            else:
+                self.assertEqual(
+                    opcode.data_lengths[code[0]], command_struct["data_bytes"]
+                )
+
+    def test_unknown_opcodes_are_marked(self):
+        self.assertEqual(opcode.data_lengths[0x10], opcode.UNKNOWN)
+
+    def test_next_modes_match_commands(self):
+        self.assertEqual(opcode.next_modes[opcode.START[0]], opcode.MODE_PASSIVE)
+        self.assertEqual(opcode.next_modes[opcode.FULL[0]], opcode.MODE_FULL)
+        self.assertEqual(opcode.next_modes[opcode.BAUD[0]], opcode.NO_CHANGE)
+        self.assertEqual(opcode.next_modes[opcode.CONTROL[0]], opcode.MODE_SAFE)
+
+    def test_every_spec_command_is_packed(self):
+        self.assertEqual(opcode.data_lengths[opcode.SCHEDULE[0]], 15)
+        self.assertEqual(opcode.data_lengths[opcode.SET_DAY_TIME[0]], 3)
+        self.assertEqual(
+            opcode.legal_modes[opcode.BUTTONS[0]],
+            1 << opcode.MODE_PASSIVE | 1 << opcode.MODE_SAFE | 1 << opcode.MODE_FULL,
+        )
+
+    def test_legal_modes_match_mode_commands(self):
+        for mode, codes in spec.mode_commands.items():
+            mode_bit = 1 << opcode.mode_names.index(mode)
+            for code in spec.commands:
+                self.assertEqual(
+                    bool(opcode.legal_modes[code[0]] & mode_bit), code in codes
+                )
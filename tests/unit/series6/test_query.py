@@ -0,0 +1,80 @@
+import unittest
+from unittest import mock
+from circuitroomba.series6 import query
+
+
+class FakeInterface:
+    """
+    Answers QUERY_LIST requests from a table of raw packet bytes.
+    """
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+        self._reply = b""
+
+    def _command(self, new_command, data):
+        packet_ids = list(data[1:])
+        self.requests.append(packet_ids)
+        self._reply = b"".join(self.responses[i] for i in packet_ids)
+
+    def _read_into(self, buffer, timeout):
+        buffer[:] = self._reply
+        return len(buffer)
+
+    def _observe(self, layout, values, current=False):
+        self.observed = (layout.fields, values, current)
+
+
+class Test_sensor_query(unittest.TestCase):
+    def setUp(self) -> None:
+        self.interface = FakeInterface(
+            {
+                7: b"\x01",
+                25: b"\x0b\xb8",
+                9: b"\x00",
+                19: b"\xff\x38",
+                20: b"\x00\x05",
+            }
+        )
+        self.query = query.SensorQuery(self.interface, ttl=10)
+
+    def test_pending_reads_are_coalesced(self):
+        charge = mock.Mock()
+        bumps = mock.Mock()
+        self.query.want(25, charge)
+        self.query.want(7, bumps)
+        self.query.want(25)
+
+        self.assertEqual(self.query.flush(), 1)
+
+        self.assertEqual(self.interface.requests, [[25, 7]])
+        charge.assert_called_once_with(3000)
+        bumps.assert_called_once_with(1)
+        self.assertEqual(self.interface.observed, ((25, 7), (3000, 1), True))
+
+    def test_cached_reads_do_not_touch_the_wire(self):
+        self.assertEqual(self.query.read(19), -200)
+        self.assertEqual(self.query.read(19), -200)
+
+        self.assertEqual(len(self.interface.requests), 1)
+        self.assertEqual(self.query.cache_hits, 1)
+
+    def test_expired_values_are_requested_again(self):
+        self.query.ttl = 0
+        self.query.read(9)
+        self.query._timestamps[9] -= 1
+        self.query.read(9)
+
+        self.assertEqual(len(self.interface.requests), 2)
+
+    def test_group_read_uses_members(self):
+        self.interface.responses[2] = b"\x00\x05\xff\x38\x00\x05"
+
+        self.assertEqual(self.query.read(2)[19], -200)
+        self.assertEqual(self.query.read(19), -200)
+        self.assertEqual(len(self.interface.requests), 1)
+
+    def test_flush_with_nothing_pending(self):
+        self.assertEqual(self.query.flush(), 0)
+        self.assertEqual(self.interface.requests, [])
@@ -0,0 +1,151 @@
+import io
+import os
+import tempfile
+import unittest
+from circuitroomba.series6 import recorder, roomba, simulator, transport
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class FullDisk(io.BytesIO):
+    def write(self, data):
+        raise OSError(28, "No space left on device")
+
+
+class Test_recorder(unittest.TestCase):
+    def test_round_trip(self):
+        clock = FakeClock()
+        file = io.BytesIO()
+        trace = recorder.Recorder(file, background=False, clock=clock)
+        trace.tx(b"\x80\x83")
+        clock.now = 15000
+        trace.rx(bytearray(b"\x13\x02\x07\x00\xe4"))
+        trace.close()
+
+        records = [
+            (seconds, direction, bytes(data))
+            for seconds, direction, data in recorder.read_records(file.getvalue())
+        ]
+        self.assertEqual(
+            records,
+            [
+                (0.0, recorder.TX, b"\x80\x83"),
+                (0.015, recorder.RX, b"\x13\x02\x07\x00\xe4"),
+            ],
+        )
+
+    def test_long_runs_are_split(self):
+        file = io.BytesIO()
+        with recorder.Recorder(file, background=False) as trace:
+            trace.rx(bytes(70000))
+
+        runs = [len(data) for s, d, data in recorder.read_records(file.getvalue())]
+        self.assertEqual(runs, [0xFFFF, 70000 - 0xFFFF])
+
+    def test_background_writer(self):
+        file = io.BytesIO()
+        trace = recorder.Recorder(file, buffer_size=64)
+        for i in range(100):
+            trace.tx(b"\x89\x00\x64\x7f\xff")
+        trace.close()
+
+        self.assertEqual(len(list(recorder.read_records(file.getvalue()))), 100)
+        self.assertEqual(trace.bytes, 500)
+
+    def test_writer_errors_are_raised(self):
+        trace = recorder.Recorder(FullDisk(), buffer_size=16)
+        trace.tx(bytes(32))
+        trace._thread.join(1)
+
+        with self.assertRaises(OSError):
+            trace.tx(b"\x80")
+        with self.assertRaises(OSError):
+            trace.flush()
+        with self.assertRaises(OSError):
+            trace.close()
+        self.assertIsNone(trace._thread)
+
+    def test_appends_to_existing_file(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(path)
+        try:
+            for i in range(2):
+                with recorder.Recorder(path) as trace:
+                    trace.tx(b"\x80")
+
+            self.assertEqual(len(list(recorder.read_records(path))), 2)
+        finally:
+            os.remove(path)
+
+    def test_rejects_other_files(self):
+        with self.assertRaises(RuntimeError):
+            list(recorder.read_records(b"not a trace"))
+
+    def test_split_commands(self):
+        data = b"\x80\x83\x94\x02\x07\x19\x8c\x00\x01\x48\x20\x8e"
+        self.assertEqual(
+            list(recorder.split_commands(data)), [(0, 1), (1, 1), (2, 4), (6, 5)]
+        )
+
+
+class Test_replay(unittest.TestCase):
+    def record_session(self):
+        file = io.BytesIO()
+        trace = recorder.Recorder(file, background=False)
+        link = transport.LoopbackTransport()
+        robot = simulator.SimulatedRoomba(link)
+        bot = roomba.Commands(transport=recorder.RecordingTransport(link, trace))
+
+        bot.start()
+        bot.safe()
+        bot.stream([7, 25])
+        robot.advance(0.155)
+        frames = list(bot.frames())
+        trace.close()
+        return file.getvalue(), frames
+
+    def test_recording_transport(self):
+        data, frames = self.record_session()
+        records = list(recorder.read_records(data))
+
+        sent = b"".join(bytes(d) for s, direction, d in records if direction == 0)
+        self.assertEqual(sent, b"\x80\x83\x94\x02\x07\x19")
+        self.assertEqual(len(frames), 10)
+
+    def test_replay_matches_live_session(self):
+        data, frames = self.record_session()
+        replay = recorder.Replay(data)
+        replayed = [frame for seconds, frame in replay.run()]
+
+        self.assertEqual([f.values for f in replayed], [f.values for f in frames])
+        self.assertEqual(replay.commands, 3)
+        self.assertEqual(replay.interface.operating_mode, "safe")
+        self.assertEqual(replay.unparsed_bytes, 0)
+
+    def test_realtime_replay(self):
+        clock = FakeClock()
+        file = io.BytesIO()
+        trace = recorder.Recorder(file, background=False, clock=clock)
+        trace.tx(b"\x80")
+        clock.now = 500000
+        trace.tx(b"\x83")
+        trace.close()
+
+        now = [0.0]
+        delays = []
+
+        def sleep(seconds):
+            delays.append(seconds)
+            now[0] += seconds
+
+        replay = recorder.Replay(file.getvalue())
+        list(replay.run(realtime=True, clock=lambda: now[0], sleep=sleep))
+        self.assertEqual(delays, [0.5])
+        self.assertEqual(replay.interface.operating_mode, "safe")
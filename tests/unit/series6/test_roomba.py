@@ -1,36 +1,304 @@
 import unittest
 import time
-from unittest import mock
-from circuitroomba.series6 import roomba
+from circuitroomba.series6 import interface, opcode, roomba, simulator, transport
 
 
 class Test_roomba_commands(unittest.TestCase):
-    @mock.patch("circuitroomba.series6.interface.busio", return_value=mock.MagicMock())
-    @mock.patch(
-        "circuitroomba.series6.interface.busio.UART", return_value=mock.MagicMock()
-    )
     def test_roomba_roomba_fails_to_send_new_command_to_fast_after_baud_change(
-        self, uart, busio
+        self,
     ):
         with self.assertRaises(RuntimeError):
-            board = mock.MagicMock()
-            bot = roomba.Commands(board.RX, board.TX, board.A1)
-            bot.wake_up()
+            bot = roomba.Commands(transport=transport.LoopbackTransport())
             bot.baud(8)
             bot.start()
 
-    @mock.patch("circuitroomba.series6.interface.busio", return_value=mock.MagicMock())
-    @mock.patch(
-        "circuitroomba.series6.interface.busio.UART", return_value=mock.MagicMock()
-    )
-    def test_roomba_roomba_sends_new_command_after_baud_change_with_wait(
-        self, uart, busio
-    ):
-        board = mock.MagicMock()
-        bot = roomba.Commands(board.RX, board.TX, board.A1)
-        bot.wake_up()
+    def test_roomba_roomba_sends_new_command_after_baud_change_with_wait(self):
+        link = transport.LoopbackTransport()
+        bot = roomba.Commands(transport=link)
         bot.start()
         bot.baud(3)
         time.sleep(0.5)
         bot.stop()
         self.assertEqual(bot.baud_rate, 2400)
+        self.assertEqual(link.baudrate, 2400)
+        self.assertEqual(link.tx, bytes([128, 129, 3, 173]))
+
+
+class Test_roomba_motion(unittest.TestCase):
+    def setUp(self) -> None:
+        self.link = transport.LoopbackTransport()
+        # A slow link so setpoints wait for the UART to drain.
+        self.bot = roomba.Commands(transport=self.link, baud_rate=300)
+        self.bot.start()
+        self.bot.safe()
+        self.link.tx.clear()
+
+    def test_drive_packs_signed_arguments(self):
+        self.bot.drive(-200, 500)
+
+        self.assertEqual(self.link.tx, bytes([137, 255, 56, 1, 244]))
+
+    def test_drive_special_radius(self):
+        self.bot.drive(100, 0x8000)
+        self.bot.drive(100, roomba.TURN_CLOCKWISE)
+
+        self.assertEqual(self.link.tx[1:5], bytes([0, 100, 128, 0]))
+        self.assertEqual(self.link.tx[6:], bytes([0, 100, 255, 255]))
+
+    def test_drive_rejects_out_of_range(self):
+        with self.assertRaises(RuntimeError):
+            self.bot.drive(501, 0)
+        with self.assertRaises(RuntimeError):
+            self.bot.drive_pwm(0, -256)
+
+    def test_drive_requires_safe_mode(self):
+        self.bot.start()
+        with self.assertRaises(RuntimeError):
+            self.bot.drive_direct(100, 100)
+
+    def test_motors(self):
+        self.bot.motors(side_brush=True, main_brush=True, side_brush_clockwise=True)
+        self.bot.pwm_motors(10, -5, 3)
+
+        self.assertEqual(self.link.tx, bytes([138, 13, 144, 10, 251, 3]))
+
+    def test_latest_setpoint(self):
+        self.bot.drive_direct(100, 100, latest=True)
+        self.bot.drive_direct(200, 200, latest=True)
+        self.bot.tick(self.bot._tx_idle_at)
+
+        self.assertEqual(self.link.tx, bytes([145, 0, 200, 0, 200]))
+
+
+class Test_roomba_sensor_stream(unittest.TestCase):
+    def setUp(self) -> None:
+        self.link = transport.LoopbackTransport()
+        self.bot = roomba.Commands(transport=self.link)
+        self.bot.start()
+        self.link.tx.clear()
+
+    def test_stream_sends_packet_list(self):
+        self.bot.stream([29, 13])
+
+        self.assertEqual(self.link.tx, bytes([148, 2, 29, 13]))
+
+    def test_frames_are_read_from_uart(self):
+        self.bot.stream([29, 13])
+        self.link.inject(bytes([19, 5, 29, 2, 37, 13, 0, 151]) * 20)
+
+        frames = list(self.bot.frames())
+
+        self.assertEqual(len(frames), 20)
+        self.assertEqual(frames[0][29], 549)
+        self.assertEqual(list(self.bot.frames()), [])
+
+    def test_tick_delivers_frames_to_callback(self):
+        received = []
+        self.bot.stream([29, 13], received.append)
+        self.link.inject(bytes([19, 5, 29, 2, 37, 13, 0, 151]))
+
+        self.bot.tick()
+
+        self.assertEqual(len(received), 1)
+
+    def test_pause_and_resume_stream(self):
+        self.bot.stream([29, 13])
+        self.link.tx.clear()
+        self.bot.pause_stream()
+        self.bot.resume_stream()
+
+        self.assertEqual(self.link.tx, b"\x96\x00\x96\x01")
+
+    def test_frames_without_stream(self):
+        with self.assertRaises(RuntimeError):
+            list(self.bot.frames())
+
+
+class Test_roomba_sensor_query(unittest.TestCase):
+    def setUp(self) -> None:
+        self.link = transport.LoopbackTransport()
+        self.bot = roomba.Commands(transport=self.link)
+        self.bot.start()
+        self.link.tx.clear()
+
+    def test_sensors_sends_query_list(self):
+        self.link.inject(b"\x01")
+
+        self.assertEqual(self.bot.sensors(35), 1)
+        self.assertEqual(self.link.tx, bytes([149, 1, 35]))
+
+    def test_tick_flushes_pending_reads(self):
+        self.link.inject(b"\x0b\xb8\x02")
+        self.bot.query.want(25)
+        self.bot.query.want(35)
+
+        self.bot.tick()
+
+        self.assertEqual(self.link.tx, bytes([149, 2, 25, 35]))
+        self.assertEqual(self.bot.sensors(35), 2)
+
+    def test_missing_response_times_out(self):
+        self.bot.query.timeout = 0.01
+
+        with self.assertRaises(RuntimeError):
+            self.bot.sensors(35)
+
+
+class Test_roomba_mode_tracking(unittest.TestCase):
+    """
+    The tracked mode follows what the simulated Roomba reports or does on
+    its own.
+    """
+
+    def setUp(self) -> None:
+        self.link = transport.LoopbackTransport()
+        self.robot = simulator.SimulatedRoomba(self.link)
+        self.bot = roomba.Commands(transport=self.link)
+        self.bot.start()
+        self.bot.safe()
+
+    def test_mode_packet_from_query(self):
+        self.robot.mode = 3
+        self.robot.set_sensor(35, 3)
+
+        self.assertEqual(self.bot.sensors(35), 3)
+        self.assertEqual(self.bot.operating_mode, "full")
+
+    def test_stale_frames_wait_for_confirmation(self):
+        self.bot.start()
+        self.bot.stream([35])
+        self.robot.advance(0.045)
+        self.bot.safe()
+
+        list(self.bot.frames())
+        self.assertEqual(self.bot.operating_mode, "safe")
+
+        self.robot.advance(0.03)
+        list(self.bot.frames())
+        self.assertEqual(self.bot._settle_until, 0)
+
+        self.robot.set_sensor(7, 0x08)
+        self.robot.advance(0.03)
+        list(self.bot.frames())
+        self.assertEqual(self.robot.mode, 1)
+        self.assertEqual(self.bot.operating_mode, "passive")
+
+    def test_wheel_drop_reverts_to_passive(self):
+        self.bot.stream([7])
+        self.bot._settle_until = 0
+        self.robot.set_sensor(7, 0x04)
+        self.robot.advance(0.03)
+        list(self.bot.frames())
+
+        self.assertEqual(self.bot.operating_mode, "passive")
+        with self.assertRaises(RuntimeError):
+            self.bot.drive(100)
+
+    def test_cliff_only_stops_a_driving_roomba(self):
+        self.bot.stream([9])
+        self.bot._settle_until = 0
+        self.robot.set_sensor(9, 1)
+        self.robot.advance(0.03)
+        list(self.bot.frames())
+
+        self.assertEqual(self.robot.mode, 2)
+        self.assertEqual(self.bot.operating_mode, "safe")
+
+        # backing straight away from the cliff is allowed
+        self.bot.drive(-100)
+        self.robot.advance(0.03)
+        list(self.bot.frames())
+        self.assertEqual(self.bot.operating_mode, "safe")
+
+        self.bot.drive(100)
+        self.robot.advance(0.03)
+        list(self.bot.frames())
+        self.assertEqual(self.robot.mode, 1)
+        self.assertEqual(self.bot.operating_mode, "passive")
+
+    def test_batched_drive_arms_the_cliff_guard(self):
+        with self.bot.batch():
+            self.bot.drive_direct(100, -100)
+
+        self.assertTrue(self.bot._cliff_guard)
+
+    def test_cliff_guard(self):
+        guarded = interface._cliff_guarded
+        drive = opcode.DRIVE[0]
+        direct = opcode.DRIVE_DIRECT[0]
+
+        self.assertTrue(guarded(drive, b"\x89\x00\x64\x7f\xff"))
+        self.assertFalse(guarded(drive, b"\x89\xff\x9c\x7f\xff"))
+        self.assertTrue(guarded(drive, b"\x89\xff\x9c\x00\x64"))
+        self.assertTrue(guarded(drive, b"\x89\xff\x9c\xff\xff"))
+        self.assertFalse(guarded(drive, b"\x89\x00\x00\x00\x01"))
+        self.assertTrue(guarded(direct, b"\x91\x00\x64\xff\x9c"))
+        self.assertFalse(guarded(direct, b"\x91\xff\x9c\xff\x9c"))
+        self.assertFalse(guarded(direct, b"\x91\xff\x9c\xff\x00"))
+
+
+class Test_roomba_wake_up(unittest.TestCase):
+    def setUp(self) -> None:
+        self.link = transport.LoopbackTransport()
+        self.robot = simulator.SimulatedRoomba(self.link)
+        self.bot = roomba.Commands(transport=self.link, brc_pin=self.robot.brc)
+        self.pulses = []
+        changed = self.robot._brc_changed
+
+        def record(level):
+            self.pulses.append(level)
+            changed(level)
+
+        self.robot._brc_changed = record
+
+    def test_awake_robot_is_only_asked_for_its_mode(self):
+        self.bot.start()
+        self.bot.safe()
+        self.link.tx.clear()
+
+        self.assertEqual(self.bot.wake_up(sleep=self.robot.advance), "safe")
+        self.assertEqual(self.pulses, [])
+        self.assertEqual(self.robot.clock(), 0)
+
+    def test_sleeping_robot_is_woken(self):
+        self.bot.start()
+        self.robot.advance(simulator.SLEEP_TIMEOUT + 1)
+        self.assertTrue(self.robot.asleep)
+        self.bot.operating_mode = "full"
+
+        self.assertEqual(self.bot.wake_up(sleep=self.robot.advance), "passive")
+        self.assertFalse(self.robot.asleep)
+        self.assertEqual(self.pulses, [False, True])
+        self.assertEqual(self.bot.operating_mode, "passive")
+
+    def test_wake_pulse_does_not_change_baud_rate(self):
+        for i in range(3):
+            self.robot.asleep = True
+            self.bot.wake_up(sleep=self.robot.advance)
+
+        self.assertEqual(self.robot.baud_rate, 115200)
+
+    def test_start_is_sent_when_oi_is_off(self):
+        self.assertEqual(self.robot.mode, opcode.MODE_OFF)
+
+        self.assertEqual(self.bot.wake_up(sleep=self.robot.advance), "passive")
+        self.assertEqual(self.robot.mode, opcode.MODE_PASSIVE)
+
+    def test_stream_is_paused_for_the_probe(self):
+        self.bot.start()
+        self.bot.stream([7])
+        self.robot.advance(0.1)
+
+        self.assertEqual(self.bot.wake_up(sleep=self.robot.advance), "passive")
+        self.robot.advance(0.05)
+        self.assertTrue(list(self.bot.frames()))
+        self.assertEqual(self.bot._stream.checksum_errors, 0)
+
+    def test_no_answer_raises_after_retries(self):
+        bot = roomba.Commands(transport=transport.LoopbackTransport())
+        waits = []
+
+        with self.assertRaises(RuntimeError):
+            bot.wake_up(attempts=3, timeout=0.001, sleep=waits.append)
+        pulse = interface.WAKE_PULSE
+        self.assertEqual(waits, [pulse, 0.05, pulse, 0.1, pulse, 0.2])
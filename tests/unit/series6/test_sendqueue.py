@@ -0,0 +1,128 @@
+import unittest
+from circuitroomba.series6 import interface, opcode, roomba, sendqueue, transport
+
+DRIVE = b"\x00\x64\x7f\xff"
+
+
+class Test_send_queue(unittest.TestCase):
+    def setUp(self) -> None:
+        self.link = transport.LoopbackTransport()
+        self.oi = interface.OpenInterface(transport=self.link)
+        self.queue = sendqueue.SendQueue(self.oi, burst=10)
+
+    def test_validates_against_queued_modes(self):
+        self.queue.put(opcode.START)
+        self.queue.put(opcode.SAFE)
+        self.queue.put(opcode.DRIVE, DRIVE)
+
+        with self.assertRaises(RuntimeError):
+            self.queue.put(opcode.DRIVE, b"\x00")
+
+        self.assertEqual(self.queue.pump(0), 3)
+        self.assertEqual(self.oi.operating_mode, "safe")
+
+    def test_stop_skips_ahead(self):
+        self.oi.operating_mode = "safe"
+        self.queue.put(opcode.DRIVE, DRIVE)
+        self.queue.put(opcode.DRIVE, DRIVE)
+        self.queue.put(opcode.DRIVE, DRIVE)
+        self.queue.pump(0)
+
+        self.queue.put(opcode.STOP)
+        self.queue.pump(1)
+
+        self.assertEqual(self.link.tx[10:], opcode.STOP)
+        self.assertEqual(self.queue.dropped, 1)
+        self.assertEqual(len(self.queue), 0)
+
+    def test_token_bucket_limits_bytes(self):
+        self.oi.operating_mode = "safe"
+        for i in range(3):
+            self.queue.put(opcode.DRIVE, DRIVE)
+
+        self.assertEqual(self.queue.pump(0), 2)
+        delay = self.queue.wait(0)
+        self.assertAlmostEqual(delay, 5 / 11520)
+        self.assertEqual(self.queue.pump(delay / 2), 0)
+        self.assertEqual(self.queue.pump(delay), 1)
+
+    def test_baud_holds_queue(self):
+        self.oi.operating_mode = "passive"
+        self.queue.put(opcode.BAUD, 5)
+        self.queue.put(opcode.SAFE)
+
+        self.assertEqual(self.queue.pump(0), 1)
+        self.assertEqual(self.link.baudrate, 9600)
+        self.assertEqual(self.queue.pump(0.05), 0)
+        self.assertEqual(self.queue.pump(0.1), 1)
+
+    def test_lane_full(self):
+        self.oi.operating_mode = "safe"
+        queue = sendqueue.SendQueue(self.oi, lane_size=1)
+        queue.put(opcode.DRIVE, DRIVE)
+
+        with self.assertRaises(RuntimeError):
+            queue.put(opcode.DRIVE, DRIVE)
+        queue.put(opcode.STOP)
+
+    def test_commands_go_through_queue(self):
+        bot = roomba.Commands(transport=self.link)
+        queue = bot.send_queue
+        bot.start()
+        bot.baud(11)
+        bot.safe()
+
+        self.assertEqual(self.link.tx, bytes([128, 129, 11]))
+        queue.drain()
+        self.assertEqual(self.link.tx, bytes([128, 129, 11, 131]))
+
+
+class Test_send_queue_precedence(unittest.TestCase):
+    """
+    Writers other than command() keep to the queue once it exists.
+    """
+
+    def setUp(self) -> None:
+        self.link = transport.LoopbackTransport()
+        self.bot = roomba.Commands(transport=self.link)
+        self.bot.start()
+        self.bot.safe()
+        self.queue = self.bot.send_queue
+        self.queue.burst = 5
+        self.link.tx.clear()
+
+    def test_batch_goes_after_queued_motion(self):
+        self.bot.drive_direct(100, 100)
+        self.bot.drive_direct(200, 200)
+
+        with self.bot.batch():
+            self.bot.full()
+            self.bot.drive_direct(0, 0)
+
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(self.link.tx[-6:], bytes([132, 145, 0, 0, 0, 0]))
+        self.assertEqual(self.link.tx[5:10], bytes([145, 0, 200, 0, 200]))
+        self.assertEqual(self.bot.operating_mode, "full")
+
+    def test_setpoint_replaces_queued_command(self):
+        self.bot.drive_direct(100, 100)
+        self.bot.setpoint(opcode.DRIVE_DIRECT, b"\x00\x01\x00\x01")
+        self.bot.setpoint(opcode.DRIVE_DIRECT, b"\x00\x02\x00\x02")
+
+        self.assertEqual(len(self.queue), 1)
+        self.assertEqual(self.bot.setpoints_dropped, 1)
+        self.queue.drain()
+        self.assertEqual(self.link.tx[5:], bytes([145, 0, 2, 0, 2]))
+
+    def test_resync_after_mode_change_outside_queue(self):
+        self.bot.drive_direct(100, 100)
+        self.bot.drive_direct(100, 100)
+        self.queue.put(opcode.FULL)
+        self.bot.operating_mode = "passive"
+
+        self.queue.resync()
+        self.assertEqual(self.queue._mode, opcode.MODE_FULL)
+        self.queue.clear()
+        self.queue.put(opcode.START)
+        self.queue.resync()
+        self.assertEqual(self.queue._mode, opcode.MODE_PASSIVE)
@@ -0,0 +1,74 @@
+import unittest
+from circuitroomba.series6 import sensors
+
+
+class Test_sensor_packets(unittest.TestCase):
+    """
+    Group sizes from the Group Packet Sizes and Contents table of the Roomba
+    Open Interface Spec.
+    """
+
+    def test_group_sizes(self):
+        expected = {
+            0: 26,
+            1: 10,
+            2: 6,
+            3: 10,
+            4: 14,
+            5: 12,
+            6: 52,
+            100: 80,
+            101: 28,
+            106: 12,
+            107: 9,
+        }
+        for packet_id, size in expected.items():
+            self.assertEqual(sensors.packet_size(packet_id), size)
+
+    def test_decode_signed(self):
+        self.assertEqual(sensors.decode(19, b"\xff\x38"), -200)
+        self.assertEqual(sensors.decode(24, b"\xfe"), -2)
+
+    def test_decode_unsigned(self):
+        self.assertEqual(sensors.decode(22, b"\xff\x38"), 65336)
+
+    def test_unknown_packet(self):
+        with self.assertRaises(KeyError):
+            sensors.packet_size(99)
+
+
+class Test_sensor_layouts(unittest.TestCase):
+    def test_query_list_layout(self):
+        layout = sensors.layout([25, 7, 19])
+
+        self.assertEqual(layout.format, ">HBh")
+        self.assertEqual(layout.size, 5)
+        self.assertEqual(
+            layout.decode(memoryview(b"\x0b\xb8\x03\xff\x38")),
+            {25: 3000, 7: 3, 19: -200},
+        )
+
+    def test_stream_layout_skips_id_bytes(self):
+        layout = sensors.layout([29, 13], stream=True)
+        payload = bytes([29, 2, 37, 13, 0])
+
+        self.assertEqual(layout.size, 5)
+        self.assertTrue(layout.ids_match(payload))
+        self.assertEqual(layout.unpack_from(payload), (549, 0))
+
+    def test_group_layout_expands_members(self):
+        layout = sensors.layout([107])
+
+        self.assertEqual(layout.fields, (54, 55, 56, 57, 58))
+        self.assertEqual(layout.size, 9)
+
+    def test_decode_into_flat_array(self):
+        layout = sensors.layout([19, 20])
+        out = layout.new_array()
+
+        layout.decode_into(b"\x00\x10\xff\xff", out)
+
+        self.assertEqual(list(out), [16, -1])
+
+    def test_layouts_are_cached(self):
+        self.assertIs(sensors.layout([7, 8]), sensors.layout((7, 8)))
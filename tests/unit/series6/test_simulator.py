@@ -0,0 +1,112 @@
+import unittest
+from circuitroomba.series6 import roomba, simulator, stream, transport
+
+
+class Test_simulator(unittest.TestCase):
+    def setUp(self) -> None:
+        self.link = transport.LoopbackTransport()
+        self.robot = simulator.SimulatedRoomba(self.link)
+        self.bot = roomba.Commands(transport=self.link, brc_pin=self.robot.brc)
+
+    def test_modes_follow_commands(self):
+        self.bot.start()
+        self.assertEqual(self.robot.mode, 1)
+        self.bot.safe()
+        self.assertEqual(self.robot.mode, 2)
+        self.bot.full()
+        self.assertEqual(self.robot.mode, 3)
+        self.bot.stop()
+        self.assertEqual(self.robot.mode, 0)
+
+    def test_illegal_commands_are_ignored(self):
+        # The host believes the robot is in full mode, the robot is still off.
+        self.bot.operating_mode = "full"
+        self.bot.clean()
+
+        self.assertEqual(self.robot.commands_ignored, 1)
+        self.assertEqual(self.robot.mode, 0)
+
+    def test_query_returns_sensor_state(self):
+        self.robot.set_sensor(22, 14321)
+        self.bot.start()
+
+        self.assertEqual(self.bot.sensors(22), 14321)
+        self.assertEqual(self.bot.sensors(35), 1)
+
+    def test_stream_frames_follow_virtual_time(self):
+        self.robot.set_sensor(29, 549)
+        self.bot.start()
+        self.bot.stream([29, 13])
+
+        self.robot.advance(1.5)
+        frames = list(self.bot.frames())
+
+        self.assertEqual(len(frames), 100)
+        self.assertEqual(frames[-1][29], 549)
+
+    def test_stream_frames_are_valid(self):
+        parser = stream.StreamParser([6])
+        frame = self.robot.stream_frame([6])
+
+        self.assertEqual(parser.parse(frame), 1)
+        self.assertEqual(parser.checksum_errors, 0)
+
+    def test_baud_mismatch_garbles_bytes(self):
+        self.bot.start()
+        self.link.baudrate = 19200
+        self.bot.safe()
+
+        self.assertEqual(self.robot.mode, 1)
+        self.assertEqual(self.robot.garbled_bytes, 1)
+
+    def test_baud_switch(self):
+        self.bot.start()
+        self.bot.baud(5)
+        self.robot.advance(0.2)
+        self.bot.safe()
+
+        self.assertEqual(self.robot.baud_rate, 9600)
+        self.assertEqual(self.robot.mode, 2)
+
+    def test_sleeps_after_idle_passive(self):
+        self.bot.start()
+        self.robot.advance(301)
+
+        self.assertTrue(self.robot.asleep)
+        self.bot.safe()
+        self.assertEqual(self.robot.mode, 1)
+
+    def test_brc_pulse_wakes(self):
+        self.bot.start()
+        self.robot.advance(301)
+
+        self.robot.brc.value = False
+        self.robot.advance(1)
+        self.robot.brc.value = True
+        self.bot.safe()
+
+        self.assertFalse(self.robot.asleep)
+        self.assertEqual(self.robot.mode, 2)
+
+    def test_brc_pulses_switch_to_19200(self):
+        for _ in range(3):
+            self.robot.brc.value = False
+            self.robot.advance(0.25)
+            self.robot.brc.value = True
+            self.robot.advance(0.25)
+
+        self.assertEqual(self.robot.baud_rate, 19200)
+
+    def test_drive_turns_the_encoders(self):
+        self.bot.start()
+        self.bot.safe()
+        self.bot.drive(200, roomba.TURN_CLOCKWISE)
+        self.robot.advance(1)
+
+        self.assertEqual(self.robot.sensors[39], 200)
+        self.assertGreater(self.robot.sensors[43], 400)
+        self.assertEqual(self.robot.sensors[44], -self.robot.sensors[43])
+
+        self.bot.start()
+        self.robot.advance(1)
+        self.assertGreater(self.robot.sensors[43], 400)
@@ -0,0 +1,74 @@
+import unittest
+from circuitroomba.series6 import stream
+
+# Stream frame in the format from page 22 of the Roomba Open Interface Spec, left
+# cliff signal (29) is 549 (0x0225) and virtual wall (13) is 0.
+FRAME = bytes([19, 5, 29, 2, 37, 13, 0, 151])
+
+
+class Test_stream_parser(unittest.TestCase):
+    def test_parse_frame(self):
+        parser = stream.StreamParser([29, 13])
+
+        frames = list(parser.feed(FRAME))
+
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0].as_dict(), {29: 549, 13: 0})
+
+    def test_parse_frame_split_across_reads(self):
+        parser = stream.StreamParser([29, 13])
+        frames = []
+
+        for i in range(len(FRAME) * 3):
+            frames.extend(parser.feed((FRAME * 3)[i : i + 1]))
+
+        self.assertEqual(len(frames), 3)
+
+    def test_resync_after_corrupt_frame(self):
+        parser = stream.StreamParser([29, 13])
+        corrupt = bytearray(FRAME)
+        corrupt[4] ^= 0xFF
+
+        frames = list(parser.feed(b"\x00\x13\x07" + corrupt + FRAME))
+
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(parser.checksum_errors, 1)
+        self.assertGreater(parser.skipped_bytes, 0)
+
+    def test_wrong_packet_ids_are_rejected(self):
+        parser = stream.StreamParser([28, 13])
+
+        self.assertEqual(list(parser.feed(FRAME)), [])
+
+    def test_group_packets_are_expanded(self):
+        data = bytes([19, 7, 2, 0, 5, 0, 64, 255, 56])
+        data += bytes([-sum(data) & 0xFF])
+        parser = stream.StreamParser([2])
+
+        frame = next(parser.feed(data))
+
+        self.assertEqual(frame.as_dict(), {17: 0, 18: 5, 19: 64, 20: -200})
+
+    def test_callback_receives_frames(self):
+        received = []
+        parser = stream.StreamParser([29, 13], received.append)
+
+        self.assertEqual(parser.parse(FRAME + FRAME), 2)
+        self.assertEqual(len(received), 2)
+
+    def test_large_input_is_parsed_with_bounded_buffer(self):
+        parser = stream.StreamParser([29, 13])
+
+        frames = list(parser.feed(FRAME * 1000))
+
+        self.assertEqual(len(frames), 1000)
+        self.assertEqual(len(parser._buffer), 2 * stream.MAX_FRAME_SIZE)
+
+    def test_flat_mode_reuses_one_array(self):
+        parser = stream.StreamParser([29, 13], flat=True)
+
+        frames = list(parser.feed(FRAME + FRAME))
+
+        self.assertIs(frames[0], frames[1])
+        self.assertEqual(list(frames[0]), [549, 0])
+        self.assertEqual(parser.layout.fields, (29, 13))
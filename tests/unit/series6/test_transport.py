@@ -0,0 +1,77 @@
+import unittest
+from unittest import mock
+from circuitroomba.series6 import interface, transport
+
+
+class Test_loopback_transport(unittest.TestCase):
+    def test_written_bytes_are_collected(self):
+        link = transport.LoopbackTransport()
+
+        link.write(b"\x80")
+        link.write(bytearray(b"\x83"))
+
+        self.assertEqual(link.tx, b"\x80\x83")
+        self.assertEqual(link.writes, 2)
+
+    def test_writes_go_to_peer(self):
+        link = transport.LoopbackTransport()
+        link.peer = mock.Mock()
+
+        link.write(b"\x80")
+
+        self.assertEqual(bytes(link.peer.receive.call_args[0][0]), b"\x80")
+        self.assertEqual(link.tx, b"")
+
+    def test_injected_bytes_wrap_around_ring(self):
+        link = transport.LoopbackTransport(size=8)
+        buffer = bytearray(8)
+
+        link.inject(b"abcdef")
+        self.assertEqual(link.readinto(memoryview(buffer)[:4]), 4)
+        link.inject(b"ghijkl")
+
+        self.assertEqual(link.in_waiting, 8)
+        self.assertEqual(link.readinto(buffer), 8)
+        self.assertEqual(buffer, b"efghijkl")
+
+    def test_overruns_are_counted(self):
+        link = transport.LoopbackTransport(size=4)
+
+        self.assertEqual(link.inject(b"abcdef"), 4)
+        self.assertEqual(link.overruns, 2)
+
+    def test_brc_pin_is_provided(self):
+        link = transport.LoopbackTransport()
+
+        self.assertEqual(link.configure_brc(None).value, True)
+
+
+class Test_hardware_transports(unittest.TestCase):
+    def test_busio_transport(self):
+        busio = mock.MagicMock()
+        digitalio = mock.MagicMock()
+        with mock.patch.dict("sys.modules", busio=busio, digitalio=digitalio):
+            link = transport.BusioTransport("TX", "RX", 19200)
+            pin = link.configure_brc(mock.MagicMock())
+            link.baudrate = 115200
+
+        busio.UART.assert_called_once_with("TX", "RX", baudrate=19200, timeout=1)
+        self.assertEqual(pin.direction, digitalio.Direction.OUTPUT)
+        self.assertEqual(busio.UART.return_value.baudrate, 115200)
+
+    def test_busio_interface_without_brc_pin(self):
+        busio = mock.MagicMock()
+        with mock.patch.dict("sys.modules", busio=busio):
+            oi = interface.OpenInterface("TX", "RX")
+
+        self.assertIsNone(oi._brc_pin)
+
+    def test_serial_transport_drives_brc_from_control_line(self):
+        serial = mock.MagicMock()
+        with mock.patch.dict("sys.modules", serial=serial):
+            link = transport.SerialTransport("/dev/ttyUSB0", brc_line="rts")
+            pin = link.configure_brc(None)
+            pin.value = False
+
+        serial.Serial.assert_called_once_with("/dev/ttyUSB0", 115200, timeout=1)
+        self.assertEqual(serial.Serial.return_value.rts, False)